@@ -14,11 +14,14 @@ Modos de operación:
 """
 
 import time
+import asyncio
+import contextvars
 import serial
 import serial.tools.list_ports
 import subprocess
 import os
 import threading
+import itertools
 import getpass
 import json
 import argparse
@@ -28,6 +31,10 @@ import ssl
 import urllib.request
 import shutil
 import platform
+from collections import namedtuple, deque, defaultdict, Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager, asynccontextmanager
+from functools import wraps
 from datetime import datetime
 from pathlib import Path
 from rich.console import Console
@@ -56,6 +63,11 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
     from PIL import ImageGrab, Image
 
+try:
+    import pyudev  # Opcional: eventos de conexión USB en Linux (si no, el inventario de COM sondea)
+except ImportError:
+    pyudev = None
+
 try:
     import mss
 except ImportError:
@@ -74,7 +86,7 @@ console = Console()
 class Settings:
     """Configuración centralizada del rotador"""
     # Version
-    VERSION = "2.11.4"  # OPTIMIZACIÓN M35: Timeouts reducidos + verificación de señal antes de activar
+    VERSION = "2.35.0"  # Estado conocido de cada módem (ICCID/CPIN/CREG/CSQ) durante la rotación
     REPO_URL = "https://github.com/stgomoyaa/rotador-simbank.git"
     
     # Agente de Control Remoto
@@ -89,7 +101,7 @@ class Settings:
     # Tiempos (en minutos o segundos según contexto)
     INTERVALO_MINUTOS = 30
     TIEMPO_APLICAR_SLOT = 25  # OPTIMIZADO: Switches mecánicos + detección de nueva SIM
-    TIEMPO_CFUN_RESET = 90  # OPTIMIZADO PARA M35: Más rápidos que UC20 (era 120, reducido para M35)
+    TIEMPO_CFUN_RESET = 90  # OPTIMIZADO PARA M35: Más rápidos que UC20 (era 120). v2.32.0: deadline duro del reinicio
     TIEMPO_ESTABILIZACION_FINAL = 15  # OPTIMIZADO PARA M35: Registro más rápido (era 20)
     TIEMPO_ANTES_SIMCLIENT = 3  # OPTIMIZADO PARA M35: Menos tiempo requerido (era 5)
     TIEMPO_SIMCLIENT_DETECTAR = 8  # OPTIMIZADO PARA M35: Detección más rápida (era 10)
@@ -104,13 +116,116 @@ class Settings:
     CSQ_MINIMO = 10  # NUEVO: Señal mínima requerida para activación (CSQ < 10 = sin señal suficiente)
     BAUDRATE = 115200
     
+    # Pool de sesiones serial (v2.12.0)
+    USAR_POOL_SESIONES = True  # Mantener abierto el puerto de cada módem durante toda la rotación
+    POOL_REINTENTOS_REAPERTURA = 1  # Reaperturas automáticas si el handle falla a mitad de comando
+    
+    # Lector AT por código de resultado final (v2.13.0)
+    LECTOR_RESULTADO_FINAL = True  # False = comportamiento anterior (sleep(espera) + read_all)
+    TIMEOUTS_COMANDO_AT = {  # Deadline por comando (prefijo → segundos); el resto usa max(espera, TIMEOUT_SERIAL)
+        "AT+CUSD": 20,  # Algunos módems no dan OK hasta que la red responde el USSD
+        "AT+CMGL": 10,  # Listado de SMS puede ser largo
+        "AT+CMGD": 10,
+        "AT+CPBW": 5,
+        "AT+CFUN": 15,
+        "AT+COPS": 60,
+        "AT+SWIT": 1.0,  # Algunos SIM Banks no responden con OK: no esperar de más
+    }
+    
+    # Motor serial asyncio (v2.14.0)
+    MOTOR_ASYNC_MAX_CONCURRENCIA = 128  # Corrutinas de módem simultáneas como máximo
+    MOTOR_ASYNC_INTERVALO_POLL = 0.01  # Barrido del hilo Motor-E/S (solo sin add_reader) y espera del lock de un hilo sincrónico
+    
+    # Escucha de URC (v2.15.0)
+    ESCUCHA_URC = True  # Leer y publicar códigos no solicitados (+CMTI, +CUSD, +CREG, +CPIN, RDY)
+    URC_INTERVALO_ESCUCHA = 0.1  # Segundos entre barridos de los puertos abiertos sin comando en curso
+    ESPERA_TRAS_CMTI = 2  # Margen tras +CMTI por si el SMS llega en varias partes
+    
+    # Actor por puerto (v2.16.0)
+    ACTOR_POR_PUERTO = True  # Una corrutina dueña de cada puerto (loop del motor) ejecuta su cola (reset > activación > telemetría)
+    ACTOR_REINTENTOS_SIM_OCUPADA = 3  # Reintentos transparentes ante +CME ERROR: 14 (SIM busy)
+    ACTOR_ESPERA_SIM_OCUPADA = 0.3  # Segundos entre reintentos por SIM ocupada
+    
+    # Cadenas de comandos AT (v2.17.0)
+    CADENA_AT_CONCATENAR = True  # 'AT+A;+B;+C' en una línea; False = encadenados sin pausas sobre la misma sesión
+    
+    # Latencias por comando (v2.18.0)
+    REGISTRAR_LATENCIAS = True  # Histograma por (puerto, verbo, resultado), guardado al final de cada rotación
+    LATENCIAS_MAX_ROTACIONES = 200  # Rotaciones que se conservan en LATENCIAS_FILE
+    
+    # Tiempos adaptativos (v2.19.0): los TIEMPO_*/ESPERA_*/TIMEOUT_SERIAL pasan a ser el techo
+    TIEMPOS_ADAPTATIVOS = True  # Aprender las esperas por puerto y modelo a partir de lo observado
+    ADAPTATIVO_PERCENTIL = 95  # Percentil de las duraciones observadas
+    ADAPTATIVO_MARGEN = 0.25  # +25% sobre el percentil...
+    ADAPTATIVO_MARGEN_MINIMO = 0.5  # ...y al menos +0.5 s
+    ADAPTATIVO_MIN_MUESTRAS = 20  # Muestras mínimas de un ámbito (puerto, modelo, global) para usarlo
+    ADAPTATIVO_MAX_MUESTRAS = 200  # Muestras que se conservan por ámbito
+    ADAPTATIVO_INTERVALO_SONDEO = 2  # Segundos entre lecturas de ICCID mientras se aplica un slot (tope del backoff)
+    APLICAR_SLOT_SONDEO_INICIAL = 0.25  # v2.28.0: Primera lectura de ICCID tras el SWIT; luego se duplica
+    ADAPTATIVO_MINIMOS = {  # Piso de cada espera aprendida (segundos)
+        "CFUN_RESET": 5,
+        "APLICAR_SLOT": 2,
+        "SMS_ACTIVACION": 5,
+        "RESPUESTA_AT": 1.0,
+    }
+    
+    # Capacidades de módem (v2.20.0)
+    SONDEAR_CAPACIDADES = True  # Detectar modelo y dialecto de ICCID una vez por módem (caché en disco)
+    
+    # Inventario de puertos COM (v2.21.0)
+    INVENTARIO_VIGILAR = True  # Hilo que re-enumera los COM en segundo plano y avisa altas/bajas
+    INVENTARIO_INTERVALO = 3  # Segundos entre enumeraciones (sin pyudev)
+    
+    # Disyuntor por puerto (v2.22.0): umbral en UMBRAL_PUERTO_INESTABLE
+    DISYUNTOR_PUERTOS = True  # Dejar fuera de servicio los módems que no responden
+    DISYUNTOR_ENFRIAMIENTO_BASE = 60  # Segundos fuera de servicio tras la primera apertura
+    DISYUNTOR_ENFRIAMIENTO_MAX = 3600  # Tope del enfriamiento (se duplica en cada reapertura)
+    DISYUNTOR_TIMEOUT_SONDEO = 1.0  # Deadline del AT de sondeo en estado semiabierto
+    
+    # v2.25.0: Auto-test paralelo (--self-test) de controladores y módems
+    SELF_TEST_PRESUPUESTO = 5.0  # Segundos totales para sondear toda la flota
+    SELF_TEST_TIMEOUT_COMANDO = 1.0  # Deadline de cada comando (se recorta al presupuesto restante)
+    
+    # v2.26.0: Topología aprendida (pool, puerto lógico) → COM del módem
+    TOPOLOGIA_AUTO = True  # Redescubrir durante la rotación si la topología guardada ya no es válida
+    
+    # v2.27.0: Ráfaga de SWIT por controlador
+    SWIT_TIMEOUT_SIN_ACUSE = 0.15  # Deadline de cada SWIT una vez que el controlador se sabe mudo
+    SWIT_SILENCIOS_PARA_MUDO = 2  # SWIT seguidos sin respuesta para tratar al controlador como mudo
+    
+    # v2.29.0: Reintento selectivo de SWIT (solo puertos cuyo ICCID no cambió; requiere topología)
+    SWIT_REINTENTOS_PUERTO = 3  # Reintentos por puerto lógico atascado
+    SWIT_REINTENTO_ESPERA_BASE = 8  # Espera del primer reintento; se duplica (tope TIEMPO_APLICAR_SLOT + 3)
+    
+    # v2.32.0: El reinicio termina con la señal del módem (RDY / +CPIN: READY, vuelve al USB o responde AT)
+    REINICIO_POR_SENAL = True  # False: dormir TIEMPO_CFUN_RESET (o lo aprendido) como antes
+    REINICIO_ESPERA_MINIMA = 3  # Segundos antes del primer AT de sondeo (antes, un OK puede ser previo al apagado)
+    REINICIO_INTERVALO_SONDEO = 1.0  # Segundos entre AT de sondeo (y deadline de cada uno)
+    
+    # v2.33.0: Pool de hilos de la rotación (tamaño fijo) y deadlines por tarea
+    EJECUTOR_TRABAJADORES = 16  # Llamadas bloqueantes cortas (USSD, SMS, BD, reintentos de SWIT); se suma 1 por pool
+    TIMEOUT_CAMBIO_POOL = 180  # SWIT + verificación + reintento de un pool
+    TIMEOUT_FLUJO_MODEM = 900  # Un módem de reset a listo, activación incluida
+    
+    # v2.34.0: Traza por slot en formato Chrome trace (abrir en ui.perfetto.dev)
+    TRAZA_ROTACION = True  # Fases y comandos AT con su duración, una pista por módem y por controlador
+    TRAZA_MAX_TRAMOS = 200000  # Tope de tramos en memoria por ventana (el resto se cuenta como descartado)
+    
+    # v2.35.0: Estado conocido de cada módem durante la rotación (se invalida con SWIT y AT+CFUN=1,1)
+    ESTADO_MODEM_CACHE = True  # Las fases usan el ICCID/CPIN/CREG/CSQ ya leído en vez de volver a preguntar
+    ESTADO_MODEM_EDAD_CREG = 20  # Segundos que vale un registro en red conocido
+    ESTADO_MODEM_EDAD_CSQ = 10  # Segundos que vale una señal conocida
+    
+    # v2.30.0: Activación masiva con un pipeline por pool (requiere topología)
+    MODO_POOLS_INDEPENDIENTES = False  # Cada pool recorre sus slots sin esperar a los demás
+    
     # Delays mejorados (fix para CME ERROR: 14)
-    DELAY_ACCESO_SIM = 1.5  # Aumentado de 1 a 1.5 (reduce CME ERROR: 14)
+    DELAY_ACCESO_SIM = 1.5  # Aumentado de 1 a 1.5 (reduce CME ERROR: 14). Solo sin ACTOR_POR_PUERTO
     DELAY_ENTRE_COMANDOS_AT = 0.5  # Delay entre comandos AT consecutivos
     
     # Umbrales de alerta
     UMBRAL_ALERTA_SIMS = 0.70  # 70% de SIMs OK mínimo
-    UMBRAL_PUERTO_INESTABLE = 3  # Fallos consecutivos antes de marcar puerto
+    UMBRAL_PUERTO_INESTABLE = 3  # Fallos consecutivos (sin respuesta / error de puerto) que abren el disyuntor
     
     # Blacklist permanente de puertos defectuosos (fix para timeouts recurrentes)
     PUERTOS_BLACKLIST = []  # Puertos con fallas constantes (88% y 83% timeout)
@@ -121,6 +236,13 @@ class Settings:
     METRICS_FILE = "rotador_metrics.json"
     LOCK_FILE = "rotador.lock"
     ICCIDS_HISTORY_FILE = "iccids_history.json"
+    LATENCIAS_FILE = "rotador_latencias.json"
+    TIEMPOS_ADAPTATIVOS_FILE = "rotador_tiempos_adaptativos.json"
+    CAPACIDADES_MODEM_FILE = "rotador_capacidades_modem.json"
+    SELF_TEST_FILE = "rotador_self_test.json"
+    TOPOLOGIA_FILE = "rotador_topologia.json"
+    ESTADO_POOLS_FILE = "rotador_estado_pools.json"
+    TRAZAS_DIR = "trazas"  # trazas/<fecha>/traza_slotNN_iterN_<hora>.json
     
     # Flags
     MODO_DRY_RUN = False  # Cambiar a True para probar sin hardware
@@ -164,7 +286,6 @@ SIM_BANKS = {}
 # Variables globales
 puertos_mapeados = {}
 _mapeo_cargado = False
-puertos_inestables = {}  # {puerto: {"fallos": N, "ultima_vez": datetime}}
 contador_fallos_pool = {}  # {pool_name: contador}
 
 # ==================== AUTO-DETECCIÓN DE SIM BANKS ====================
@@ -363,7 +484,16 @@ def inicializar_simbanks():
 
 # ==================== DECORADORES Y UTILIDADES ====================
 def medir_tiempo(func):
-    """Decorador para medir tiempo de ejecución de funciones"""
+    """Decorador para medir tiempo de ejecución de funciones (también corrutinas)"""
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper_async(*args, **kwargs):
+            inicio = time.time()
+            resultado = await func(*args, **kwargs)
+            escribir_log(f"⏱️ {func.__name__} completado en {time.time() - inicio:.2f}s")
+            return resultado
+        return wrapper_async
+    
     def wrapper(*args, **kwargs):
         inicio = time.time()
         resultado = func(*args, **kwargs)
@@ -409,6 +539,185 @@ def guardar_snapshot(slot: int, iteracion: int, datos: dict):
     except Exception as e:
         escribir_log(f"⚠️ Error al guardar snapshot: {e}")
 
+# ==================== TRAZA DE LA ROTACIÓN (CHROME TRACE) ====================
+PISTA_ROTACION = "Rotación"  # Pista de lo que no es de un módem ni de un controlador
+_pista_en_curso = contextvars.ContextVar("pista_en_curso", default=None)  # Por hilo y por corrutina
+
+TramoTraza = namedtuple("TramoTraza", ["pista", "hilo", "nombre", "categoria", "inicio", "duracion", "args"])
+
+class TrazaRotacion:
+    """Línea de tiempo de cada slot en formato Chrome trace (se abre en ui.perfetto.dev o chrome://tracing)
+    
+    v2.34.0: Con solo el total de cada slot no se ve en qué se fue el tiempo. Cada fase
+    (@trazar o tramo()) y cada comando AT queda como un tramo con su pista: el puerto del
+    módem o del controlador. Un tramo sin pista usa la del tramo que lo contiene en el mismo
+    hilo o corrutina, así las consultas a la BD caen en el módem que las hizo. En el archivo cada
+    pista es un proceso y cada hilo o corrutina que trabajó en ella, una fila: se ven las esperas,
+    los comandos que se encolan en un mismo puerto y los módems rezagados.
+    
+    Solo se registra mientras hay una ventana abierta (abrir/cerrar): una por slot, o una por
+    pool con --pools-independientes, cada una con solo las pistas de su pool.
+    """
+    
+    def __init__(self):
+        self._tramos = []
+        self._ventanas = {}  # clave → inicio (perf_counter)
+        self._descartados = 0
+        self._lock = threading.Lock()
+    
+    def activa(self) -> bool:
+        return Settings.TRAZA_ROTACION and bool(self._ventanas)
+    
+    @staticmethod
+    def _hilo_actual() -> str:
+        """Nombre de la corrutina en curso (las del motor asyncio comparten hilo) o del hilo"""
+        try:
+            tarea = asyncio.current_task()
+        except RuntimeError:
+            tarea = None
+        return tarea.get_name() if tarea else threading.current_thread().name
+    
+    def _agregar(self, pista: str, nombre: str, categoria: str, inicio: float, duracion: float, args: dict):
+        tramo = TramoTraza(pista, self._hilo_actual(), nombre, categoria, inicio, duracion, args)
+        with self._lock:
+            if len(self._tramos) >= Settings.TRAZA_MAX_TRAMOS:
+                self._descartados += 1
+                return
+            self._tramos.append(tramo)
+    
+    @contextmanager
+    def tramo(self, nombre: str, pista: str = None, categoria: str = "fase", **args):
+        """Registra lo que corre dentro del with como un tramo de 'pista'"""
+        if not self.activa():
+            yield
+            return
+        pista = pista or _pista_en_curso.get() or PISTA_ROTACION
+        token = _pista_en_curso.set(pista)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            _pista_en_curso.reset(token)
+            self._agregar(pista, nombre, categoria, inicio, time.perf_counter() - inicio, args)
+    
+    def comando(self, puerto: str, comando: str, inicio: float, duracion: float, resultado: str):
+        """Un comando AT en la pista de su puerto (lo llama la capa de transporte)"""
+        if self.activa():
+            self._agregar(puerto, verbo_at(comando), "at", inicio, duracion,
+                          {"comando": comando, "resultado": resultado})
+    
+    def abrir(self, clave: str = PISTA_ROTACION):
+        """Empieza a registrar para 'clave' (reabrir una clave descarta su ventana anterior)"""
+        with self._lock:
+            self._ventanas[clave] = time.perf_counter()
+    
+    def cerrar(self, clave: str, slot: int, iteracion: int, pistas: set = None) -> str:
+        """Escribe los tramos de la ventana (solo los de 'pistas', si se indican) y la cierra
+        
+        Returns:
+            str: Ruta del archivo, o None si no había nada que guardar
+        """
+        with self._lock:
+            inicio = self._ventanas.pop(clave, None)
+            if inicio is None:
+                return None
+            tramos = [t for t in self._tramos if t.inicio >= inicio and (pistas is None or t.pista in pistas)]
+            # Se conservan solo los tramos que aún pueden caer en otra ventana abierta
+            desde = min(self._ventanas.values(), default=None)
+            self._tramos = [] if desde is None else [t for t in self._tramos if t.inicio >= desde]
+            descartados, self._descartados = self._descartados, 0
+        if not Settings.TRAZA_ROTACION or not tramos:
+            return None
+        
+        try:
+            directorio = os.path.join(Settings.TRAZAS_DIR, datetime.now().strftime("%Y-%m-%d"))
+            os.makedirs(directorio, exist_ok=True)
+            prefijo = "" if clave == PISTA_ROTACION else f"{clave}_"
+            filename = f"traza_{prefijo}slot{slot:02d}_iter{iteracion}_{datetime.now().strftime('%H-%M-%S')}.json"
+            filepath = os.path.join(directorio, filename)
+            with open(filepath, "w", encoding="utf-8") as f:
+                json.dump({
+                    "traceEvents": self._eventos_chrome(tramos, inicio),
+                    "displayTimeUnit": "ms",
+                    "otherData": {"slot": slot, "iteracion": iteracion, "version": Settings.VERSION,
+                                  "tramos_descartados": descartados},
+                }, f, ensure_ascii=False)
+            escribir_log(f"🧭 Traza guardada: {filename} ({len(tramos)} tramos)")
+            return filepath
+        except Exception as e:
+            escribir_log(f"⚠️ Error al guardar traza: {e}")
+            return None
+    
+    @staticmethod
+    def _nombre_pista(pista: str) -> tuple:
+        """(orden, nombre visible): rotación, luego controladores y luego módems"""
+        for pool_name, config in SIM_BANKS.items():
+            if config.get("com") == pista:
+                return 1, f"{pool_name} · controlador {pista}"
+        if pista == PISTA_ROTACION:
+            return 0, pista
+        ubicacion = topologia_pools.ubicacion(pista)
+        return 2, f"{pista} · {ubicacion[0]}/{ubicacion[1]}" if ubicacion else pista
+    
+    def _eventos_chrome(self, tramos: list, inicio: float) -> list:
+        def orden(pista):
+            # COM5 antes que COM12
+            grupo, nombre = self._nombre_pista(pista)
+            return grupo, [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", nombre)]
+        
+        pistas = sorted({t.pista for t in tramos}, key=orden)
+        pids = {pista: pid for pid, pista in enumerate(pistas, 1)}
+        eventos = []
+        for pista, pid in pids.items():
+            _, nombre = self._nombre_pista(pista)
+            eventos.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": nombre}})
+            eventos.append({"name": "process_sort_index", "ph": "M", "pid": pid, "args": {"sort_index": pid}})
+        
+        tids = {}
+        for tramo in sorted(tramos, key=lambda t: t.inicio):
+            pid = pids[tramo.pista]
+            tid = tids.get((pid, tramo.hilo))
+            if tid is None:
+                tid = tids[(pid, tramo.hilo)] = sum(1 for p, _ in tids if p == pid) + 1
+                eventos.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                                "args": {"name": tramo.hilo}})
+            eventos.append({
+                "name": tramo.nombre, "cat": tramo.categoria, "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((tramo.inicio - inicio) * 1e6, 1), "dur": round(tramo.duracion * 1e6, 1),
+                "args": tramo.args,
+            })
+        return eventos
+
+traza_rotacion = TrazaRotacion()
+
+def _pista_puerto(*args, **kwargs):
+    return args[0] if args else kwargs.get("puerto")
+
+def trazar(nombre: str = None, pista=None, categoria: str = "fase"):
+    """Decorador: cada llamada queda como un tramo de traza_rotacion
+    
+    'pista' recibe los argumentos de la llamada y retorna la pista (p. ej. _pista_puerto);
+    sin ella el tramo va en la pista del llamador.
+    """
+    def decorador(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper_async(*args, **kwargs):
+                if not traza_rotacion.activa():
+                    return await func(*args, **kwargs)
+                with traza_rotacion.tramo(nombre or func.__name__, pista(*args, **kwargs) if pista else None, categoria):
+                    return await func(*args, **kwargs)
+            return wrapper_async
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not traza_rotacion.activa():
+                return func(*args, **kwargs)
+            with traza_rotacion.tramo(nombre or func.__name__, pista(*args, **kwargs) if pista else None, categoria):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorador
+
 # ==================== FUNCIONES DE LOCK (ANTI-DOBLE INSTANCIA) ====================
 def crear_lock():
     """Crea archivo lock para evitar múltiples instancias"""
@@ -548,8 +857,11 @@ def actualizar_metricas(slot: int, iteracion: int, sims_listas: int, total_modem
     except Exception as e:
         escribir_log(f"⚠️ Error al actualizar métricas: {e}")
 
-def guardar_historial_iccids(slot: int, iteracion: int, iccids_verificados: dict):
-    """Guarda historial de ICCIDs detectados por rotación"""
+def guardar_historial_iccids(slot: int, iteracion: int, iccids_verificados: dict, pool: str = None):
+    """Guarda historial de ICCIDs detectados por rotación
+    
+    v2.30.0: Con 'pool' la entrada es de ese pool solo (pipelines independientes por pool)
+    """
     try:
         # Cargar historial existente
         historial = {}
@@ -563,6 +875,8 @@ def guardar_historial_iccids(slot: int, iteracion: int, iccids_verificados: dict
         # Agregar entrada actual
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         clave_rotacion = f"slot_{slot:02d}_iter_{iteracion}"
+        if pool:
+            clave_rotacion = f"{pool}_{clave_rotacion}"
         
         historial[clave_rotacion] = {
             "timestamp": timestamp,
@@ -571,10 +885,12 @@ def guardar_historial_iccids(slot: int, iteracion: int, iccids_verificados: dict
             "iccids_por_puerto": iccids_verificados,
             "total_unicos": len(set(iccids_verificados.values()))
         }
+        if pool:
+            historial[clave_rotacion]["pool"] = pool
         
         # Mantener solo las últimas 100 rotaciones
         if len(historial) > 100:
-            claves_ordenadas = sorted(historial.keys())
+            claves_ordenadas = sorted(historial, key=lambda clave: historial[clave].get("timestamp", ""))
             for clave in claves_ordenadas[:-100]:
                 del historial[clave]
         
@@ -593,7 +909,6 @@ def obtener_version_remota() -> tuple:
     try:
         # Extraer usuario y repo de REPO_URL
         # Formato: https://github.com/USUARIO/REPO.git
-        import re
         match = re.search(r'github\.com/([^/]+)/([^/]+)\.git', Settings.REPO_URL)
         if not match:
             return False, Settings.VERSION, ""
@@ -855,6 +1170,7 @@ def crear_tabla_db():
     except Exception as e:
         escribir_log(f"⚠️ Error al crear tabla en base de datos: {e}")
 
+@trazar(categoria="db")
 def verificar_iccid_ya_activado(iccid: str) -> tuple:
     """Verifica si un ICCID ya fue activado previamente en la base de datos.
     Retorna: (ya_activado: bool, numero_existente: str)
@@ -889,6 +1205,7 @@ def verificar_iccid_ya_activado(iccid: str) -> tuple:
         log_activacion(f"⚠️ Error verificando ICCID en BD: {e}")
         return False, None
 
+@trazar(categoria="db")
 def guardar_numero_db(iccid: str, numero: str, puerto: str) -> bool:
     """Guarda o actualiza un número en la base de datos PostgreSQL.
     Retorna True si se guardó correctamente.
@@ -1025,6 +1342,103 @@ def limpiar_listado(path: str = "listadonumeros_claro.txt") -> bool:
         console.print(f"[red]❌ Error al limpiar archivo: {e}[/red]")
         return False
 
+# ==================== INVENTARIO DE PUERTOS COM ====================
+# Eventos de inventario (se publican en bus_urc junto con los URC del puerto)
+PUERTO_AGREGADO = "PUERTO_AGREGADO"
+PUERTO_QUITADO = "PUERTO_QUITADO"
+
+class InventarioPuertos:
+    """Lista de puertos COM en memoria, mantenida al día por un hilo vigilante
+    
+    v2.21.0: serial.tools.list_ports.comports() es lento con 40+ dispositivos USB serial
+    y se llamaba en cada rotación. Ahora se enumera en segundo plano (sondeo cada
+    INVENTARIO_INTERVALO segundos, o eventos de udev con pyudev en Linux) y las rotaciones
+    leen la copia en memoria. Cada diferencia se publica como PUERTO_AGREGADO/PUERTO_QUITADO.
+    """
+    
+    def __init__(self):
+        self._puertos = {}  # device → ListPortInfo
+        self._enumerado = False
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+        self._observador_udev = None
+    
+    def refrescar(self) -> tuple:
+        """Vuelve a enumerar y publica las diferencias. Retorna (agregados, quitados)"""
+        actuales = {info.device: info for info in serial.tools.list_ports.comports()}
+        with self._lock:
+            anteriores = self._puertos
+            self._puertos = actuales
+            primera_vez = not self._enumerado
+            self._enumerado = True
+        
+        if primera_vez:
+            escribir_log(f"🔍 Puertos detectados: {list(actuales)}")
+            return list(actuales), []
+        
+        agregados = [p for p in actuales if p not in anteriores]
+        quitados = [p for p in anteriores if p not in actuales]
+        for puerto in quitados:
+            escribir_log(f"🔌 [{puerto}] Puerto desconectado del USB")
+            pool_sesiones.invalidar(puerto)  # El handle ya no sirve: que el próximo uso falle rápido
+            bus_urc.publicar(EventoURC(puerto, PUERTO_QUITADO, {}, "", time.time()))
+        for puerto in agregados:
+            escribir_log(f"🔌 [{puerto}] Puerto conectado ({actuales[puerto].description})")
+            bus_urc.publicar(EventoURC(puerto, PUERTO_AGREGADO, {"serie_usb": actuales[puerto].serial_number}, "", time.time()))
+        return agregados, quitados
+    
+    def puertos(self) -> list:
+        """Puertos presentes según la última enumeración (enumera la primera vez)"""
+        if not self._enumerado:
+            self.refrescar()
+        self.iniciar_vigilancia()
+        with self._lock:
+            return list(self._puertos)
+    
+    def info(self, puerto: str):
+        """ListPortInfo del puerto (None si no está presente)"""
+        if not self._enumerado:
+            self.refrescar()
+        with self._lock:
+            return self._puertos.get(puerto)
+    
+    def iniciar_vigilancia(self):
+        if not Settings.INVENTARIO_VIGILAR:
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            if pyudev is not None and sys.platform.startswith("linux") and self._observador_udev is None:
+                try:
+                    monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+                    monitor.filter_by(subsystem="tty")
+                    self._observador_udev = pyudev.MonitorObserver(monitor, lambda accion, dispositivo: self.refrescar())
+                    self._observador_udev.start()
+                except Exception as e:
+                    escribir_log(f"⚠️ udev no disponible, se usará sondeo: {e}")
+                    self._observador_udev = None
+            self._hilo = threading.Thread(target=self._ciclo, name="InventarioPuertos", daemon=True)
+            self._hilo.start()
+    
+    def detener_vigilancia(self):
+        self._detener.set()
+        if self._observador_udev is not None:
+            self._observador_udev.stop()
+            self._observador_udev = None
+    
+    def _ciclo(self):
+        # Con udev el sondeo queda como respaldo lento (por si se pierde un evento)
+        intervalo = Settings.INVENTARIO_INTERVALO * (10 if self._observador_udev else 1)
+        while not self._detener.wait(intervalo):
+            try:
+                self.refrescar()
+            except Exception as e:
+                escribir_log(f"⚠️ Error al enumerar puertos COM: {e}")
+
+inventario_puertos = InventarioPuertos()
+
 # ==================== FUNCIONES DE MAPEO DE PUERTOS ====================
 def cargar_mapeo_puertos():
     """Lee 'ports.txt' desde SimClient y retorna dict {COMx: numero_logico}."""
@@ -1057,11 +1471,11 @@ def cargar_mapeo_puertos():
     return port_map
 
 def listar_puertos_disponibles():
-    """Lista todos los puertos COM disponibles"""
-    puertos = serial.tools.list_ports.comports()
-    lista_puertos = [puerto.device for puerto in puertos]
-    escribir_log(f"🔍 Puertos detectados: {lista_puertos}")
-    return lista_puertos
+    """Lista todos los puertos COM disponibles
+    
+    v2.21.0: Lee el inventario en memoria (el hilo vigilante registra los cambios en el log)
+    """
+    return inventario_puertos.puertos()
 
 def obtener_puerto_numerado(puerto_real):
     """Obtiene el número lógico de un puerto COM"""
@@ -1071,6 +1485,34 @@ def obtener_puerto_numerado(puerto_real):
         else puerto_real
     )
 
+def ubicar_modems(modems: list) -> dict:
+    """Ubica cada módem en su pool y puerto lógico: {COMx: (pool, "01".."08")}
+    
+    Usa la topología descubierta (topologia_pools) si está vigente. Si no, supone que HeroSMS
+    numera los módems en ports.txt pool por pool, en el orden de SIM_BANKS: el número lógico n
+    cae en el pool (n-1) // puertos_por_pool en el puerto (n-1) % puertos_por_pool + 1.
+    Los módems sin número lógico (o fuera de rango) no se incluyen.
+    """
+    pools = list(SIM_BANKS.items())
+    ubicacion = {}
+    vigente = topologia_pools.vigente()
+    for puerto in modems:
+        if vigente and topologia_pools.ubicacion(puerto):
+            ubicacion[puerto] = topologia_pools.ubicacion(puerto)
+            continue
+        try:
+            numero = int(puertos_mapeados[puerto])
+        except (KeyError, ValueError):
+            continue
+        inicio = 0
+        for pool_name, config in pools:
+            puertos_pool = config["puertos"]
+            if inicio < numero <= inicio + len(puertos_pool):
+                ubicacion[puerto] = (pool_name, puertos_pool[numero - inicio - 1])
+                break
+            inicio += len(puertos_pool)
+    return ubicacion
+
 # ==================== FUNCIONES DE ACTIVACIÓN DE SIMS ====================
 def obtener_operador(iccid: str) -> str:
     """Detecta el operador según el ICCID"""
@@ -1091,6 +1533,7 @@ def log_activacion(mensaje: str):
         pass
     escribir_log(mensaje)
 
+@trazar(pista=_pista_puerto)
 def borrar_mensajes_modem(puerto: str) -> bool:
     """Borra todos los SMS del módem (memoria del módem y SIM)"""
     if Settings.MODO_DRY_RUN:
@@ -1110,6 +1553,7 @@ def borrar_mensajes_modem(puerto: str) -> bool:
         log_activacion(f"❌ [{puerto}] Error al borrar mensajes: {e}")
         return False
 
+@trazar(pista=_pista_puerto)
 def leer_contacto_myphone(puerto: str) -> str:
     """Lee el contacto 'myphone' guardado en la SIM para verificar si ya está activada"""
     if Settings.MODO_DRY_RUN:
@@ -1117,27 +1561,24 @@ def leer_contacto_myphone(puerto: str) -> str:
     
     try:
         # Delay antes de acceder a SIM (fix para CME ERROR: 14 - SIM busy)
-        time.sleep(Settings.DELAY_ACCESO_SIM)
+        # v2.16.0: Con el actor por puerto no hace falta (serializa y reintenta el SIM busy)
+        if not Settings.ACTOR_POR_PUERTO:
+            time.sleep(Settings.DELAY_ACCESO_SIM)
         
-        # Seleccionar memoria de la SIM
-        enviar_comando(puerto, 'AT+CPBS="SM"', espera=0.5)
-        
-        # Leer el contacto en posición 1 (donde guardamos 'myphone')
-        respuesta = enviar_comando(puerto, 'AT+CPBR=1', espera=1)
+        # Seleccionar memoria de la SIM y leer el contacto en posición 1 (donde guardamos 'myphone')
+        seleccion, lectura = enviar_cadena(puerto, ['AT+CPBS="SM"', 'AT+CPBR=1'])
+        respuesta = lectura.respuesta
         
         if not respuesta:
             return None
         
         # Buscar el número en la respuesta
         # Formato: +CPBR: 1,"56999123456",129,"myphone"
-        match = re.search(r'\+CPBR:\s*1,"(\+?569\d{8})"', respuesta)
-        if match:
-            numero = match.group(1)
-            # Asegurar formato 569XXXXXXXX
-            if numero.startswith('+'):
-                numero = numero[1:]
-            log_activacion(f"📱 [{puerto}] Ya tiene número guardado: {numero}")
-            return numero
+        for entrada in parsear_cpbr(respuesta):
+            numero = entrada.numero.lstrip("+")  # Asegurar formato 569XXXXXXXX
+            if entrada.indice == 1 and len(numero) == 11 and numero.startswith("569") and numero.isdigit():
+                log_activacion(f"📱 [{puerto}] Ya tiene número guardado: {numero}")
+                return numero
         
         return None
         
@@ -1145,6 +1586,7 @@ def leer_contacto_myphone(puerto: str) -> str:
         log_activacion(f"❌ [{puerto}] Error leyendo contacto myphone: {e}")
         return None
 
+@trazar(pista=_pista_puerto)
 def activar_sim_claro(puerto: str, iccid: str) -> bool:
     """Activa una SIM Claro enviando USSD *103# con retry para error de red"""
     if Settings.MODO_DRY_RUN:
@@ -1161,6 +1603,7 @@ def activar_sim_claro(puerto: str, iccid: str) -> bool:
         
         # Retry para CME ERROR: 30 (No network service)
         for intento_red in range(3):
+            inicio_ussd = time.time()
             respuesta = enviar_comando_resiliente(puerto, 'AT+CUSD=1,"*103#",15', intentos=2)
             
             # Si hay error de red, esperar y reintentar
@@ -1173,8 +1616,8 @@ def activar_sim_claro(puerto: str, iccid: str) -> bool:
                     log_activacion(f"❌ [{puerto}] Sin servicio de red tras 3 intentos")
                     return False
             
-            # Esperar respuesta USSD
-            time.sleep(3)
+            # Esperar respuesta USSD (hasta 3s; termina antes si llega el +CUSD)
+            bus_urc.esperar(puerto, (URC_USSD,), timeout=3, desde=inicio_ussd)
             
             if "OK" in respuesta or respuesta:
                 log_activacion(f"✅ [{puerto}] Comando de activación enviado")
@@ -1187,6 +1630,7 @@ def activar_sim_claro(puerto: str, iccid: str) -> bool:
         log_activacion(f"❌ [{puerto}] Error en activación: {e}")
         return False
 
+@trazar(pista=_pista_puerto)
 def leer_numero_sms(puerto: str, iccid: str) -> str:
     """Lee SMS para obtener el número de teléfono"""
     if Settings.MODO_DRY_RUN:
@@ -1197,46 +1641,26 @@ def leer_numero_sms(puerto: str, iccid: str) -> str:
         return None
     
     try:
-        # Configurar modo texto
-        enviar_comando(puerto, "AT+CMGF=1", espera=0.5)
-        
-        # Patrones para detectar números
-        patrones_numeros = [
-            r"Tu numero es (\d+)",
-            r"\b(\d{9})\b",
-            r"\+569 ?(\d{4} ?\d{4})",
-            r"569 ?(\d{4} ?\d{4})",
-            r"\+569(\d{8})",
-            r"569(\d{8})",
-            r"\b(?:tu\s*n[uú]mero\s*es)\s*([\d\s]+)",
-        ]
-        
         # Leer SMS de diferentes memorias
         memorias = ["SM", "ME"]
         numero = None
         
         for memoria in memorias:
-            enviar_comando(puerto, f'AT+CPMS="{memoria}"', espera=0.5)
-            respuesta = enviar_comando(puerto, 'AT+CMGL="ALL"', espera=2)
+            # Modo texto + memoria + listado en una sola ida y vuelta
+            *_, listado = enviar_cadena(puerto, ["AT+CMGF=1", f'AT+CPMS="{memoria}"', 'AT+CMGL="ALL"'])
+            respuesta = listado.respuesta
             
             if not respuesta:
                 continue
             
-            # Buscar número en SMS
-            for patron in patrones_numeros:
-                match = re.search(patron, respuesta, re.IGNORECASE)
-                if match:
-                    numero_extraido = match.group(1).replace(" ", "")
-                    numero = f"569{numero_extraido[-8:]}"
+            # Buscar número en el cuerpo de cada SMS (v2.24.0: no en los encabezados +CMGL,
+            # donde el remitente también puede parecer un número 569XXXXXXXX)
+            mensajes = parsear_cmgl(respuesta) or [MensajeSms(0, "", "", "", "\n".join(lineas_informacion_at(respuesta)))]
+            for mensaje in mensajes:
+                numero = extraer_numero_sms(mensaje.texto)
+                if numero:
                     log_activacion(f"📱 [{puerto}] Número encontrado: {numero}")
                     return numero
-            
-            # Buscar en URL de Claro
-            match_url = re.search(r"https://fif\.clarovtrcloud\.com/aod/form\?t=(\d+)", respuesta)
-            if match_url:
-                numero = f"569{match_url.group(1)[-8:]}"
-                log_activacion(f"📱 [{puerto}] Número encontrado en URL: {numero}")
-                return numero
         
         return None
         
@@ -1244,6 +1668,7 @@ def leer_numero_sms(puerto: str, iccid: str) -> str:
         log_activacion(f"❌ [{puerto}] Error leyendo SMS: {e}")
         return None
 
+@trazar(pista=_pista_puerto)
 def guardar_numero_en_sim(puerto: str, numero: str, iccid: str) -> bool:
     """Guarda el número en la SIM, en archivo local y en base de datos PostgreSQL"""
     if Settings.MODO_DRY_RUN:
@@ -1258,12 +1683,11 @@ def guardar_numero_en_sim(puerto: str, numero: str, iccid: str) -> bool:
         
         # 2. Guardar en la SIM como "myphone"
         log_activacion(f"📲 [{puerto}] Guardando {numero} en la SIM...")
-        enviar_comando(puerto, 'AT+CPBS="SM"', espera=0.5)
         comando_guardar = f'AT+CPBW=1,"{numero}",129,"myphone"'
-        respuesta = enviar_comando(puerto, comando_guardar, espera=1)
+        seleccion, escritura = enviar_cadena(puerto, ['AT+CPBS="SM"', comando_guardar])
         
         sim_ok = False
-        if "OK" in respuesta or respuesta:
+        if escritura.ok:
             log_activacion(f"✅ [{puerto}] Número guardado en SIM como 'myphone'")
             sim_ok = True
         else:
@@ -1282,14 +1706,20 @@ def guardar_numero_en_sim(puerto: str, numero: str, iccid: str) -> bool:
         return False
 
 @medir_tiempo
-def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
+@trazar("procesar_activacion_sim", pista=_pista_puerto)
+async def procesar_activacion_sim_async(puerto: str, iccid_anterior: str = None, iccid: str = None,
+                                        red_verificada: bool = False) -> dict:
     """Proceso completo de activación de una SIM
     
     NUEVO: Verifica que el ICCID cambió antes de activar (previene activar misma SIM)
+    v2.31.0: Corre en el motor asyncio como un estado de FlujoModem: las esperas (SMS, entre
+    intentos) ceden el loop y cada paso bloqueante corto (AT, BD) va a ejecutor_rotacion.
     
     Args:
         puerto: Puerto COM del módem
         iccid_anterior: ICCID antes del cambio de slot (para verificar que cambió)
+        iccid: v2.31.0: ICCID ya leído por la máquina de estados del módem (no se vuelve a leer)
+        red_verificada: v2.31.0: Registro y señal ya verificados (no se vuelven a esperar)
     """
     resultado = {
         "puerto": puerto,
@@ -1301,7 +1731,7 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
     
     try:
         # 1. Obtener ICCID ACTUAL (después de AT+CFUN=1,1 que ya se ejecutó en cambiar_slot_simbank)
-        iccid = obtener_iccid_modem(puerto)
+        iccid = iccid or await obtener_iccid_async(puerto, usar_estado=True)
         if not iccid:
             log_activacion(f"❌ [{puerto}] No se pudo obtener ICCID")
             return resultado
@@ -1327,7 +1757,7 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
             return resultado
         
         # 2. VERIFICAR SI ESTE ICCID YA FUE ACTIVADO EN LA BASE DE DATOS
-        ya_activado, numero_bd = verificar_iccid_ya_activado(iccid)
+        ya_activado, numero_bd = await ejecutor_rotacion.en_hilo(verificar_iccid_ya_activado, iccid)
         if ya_activado:
             log_activacion(f"✅ [{puerto}] ICCID {iccid} YA ACTIVADO en BD con número: {numero_bd}")
             log_activacion(f"⏭️  [{puerto}] Saltando activación (ya procesado anteriormente)")
@@ -1336,24 +1766,23 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
             resultado["intentos"] = 0
             
             # Guardar en "myphone" si no lo tiene
-            numero_en_sim = leer_contacto_myphone(puerto)
+            numero_en_sim = await ejecutor_rotacion.en_hilo(leer_contacto_myphone, puerto)
             if not numero_en_sim:
                 log_activacion(f"📲 [{puerto}] Guardando número {numero_bd} en SIM (myphone)...")
                 try:
-                    enviar_comando(puerto, 'AT+CPBS="SM"', espera=0.5)
                     comando_guardar = f'AT+CPBW=1,"{numero_bd}",129,"myphone"'
-                    enviar_comando(puerto, comando_guardar, espera=1)
+                    await ejecutor_rotacion.en_hilo(enviar_cadena, puerto, ['AT+CPBS="SM"', comando_guardar])
                 except Exception as e:
                     log_activacion(f"⚠️ [{puerto}] Error guardando en SIM: {e}")
             
             return resultado
         
         # 3. VERIFICAR SI YA TIENE NÚMERO GUARDADO EN "myphone"
-        numero_existente = leer_contacto_myphone(puerto)
+        numero_existente = await ejecutor_rotacion.en_hilo(leer_contacto_myphone, puerto)
         if numero_existente:
             log_activacion(f"✅ [{puerto}] SIM ya activada con número: {numero_existente}")
             # Guardar en BD por si no estaba
-            guardar_numero_db(iccid, numero_existente, puerto)
+            await ejecutor_rotacion.en_hilo(guardar_numero_db, iccid, numero_existente, puerto)
             resultado["numero"] = numero_existente
             resultado["activado"] = True
             resultado["intentos"] = 0  # No necesitó intentos, ya estaba activada
@@ -1364,22 +1793,26 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
         
         # 5. BORRAR MENSAJES DEL MÓDEM (ahora que SIM está confirmada como lista)
         # Esto previene leer SMS de la SIM anterior
-        borrar_mensajes_modem(puerto)
+        await ejecutor_rotacion.en_hilo(borrar_mensajes_modem, puerto)
         
-        # 6. VERIFICAR REGISTRO EN RED (CRÍTICO para activación exitosa)
-        log_activacion(f"🔍 [{puerto}] Esperando registro en red antes de activar...")
-        if not esperar_registro_red(puerto, max_intentos=15):
-            log_activacion(f"❌ [{puerto}] No se pudo registrar en red - Saltando activación")
-            resultado["intentos"] = 0
-            return resultado
+        # 5.5 Habilitar avisos no solicitados (+CREG, +CMTI) para esperar por evento
+        await ejecutor_rotacion.en_hilo(habilitar_urc, puerto)
         
-        # 7. VERIFICAR SEÑAL ANTES DE ACTIVAR (nuevo: evita intentos en SIMs sin señal)
-        señal_ok, csq = verificar_intensidad_senal(puerto)
-        if not señal_ok:
-            log_activacion(f"❌ [{puerto}] Señal insuficiente (CSQ={csq}) - Saltando activación")
-            log_activacion(f"⚠️ [{puerto}] Se requiere CSQ >= {Settings.CSQ_MINIMO} para activar")
-            resultado["intentos"] = 0
-            return resultado
+        if not red_verificada:
+            # 6. VERIFICAR REGISTRO EN RED (CRÍTICO para activación exitosa)
+            log_activacion(f"🔍 [{puerto}] Esperando registro en red antes de activar...")
+            if not await esperar_registro_red_async(puerto, max_intentos=15):
+                log_activacion(f"❌ [{puerto}] No se pudo registrar en red - Saltando activación")
+                resultado["intentos"] = 0
+                return resultado
+            
+            # 7. VERIFICAR SEÑAL ANTES DE ACTIVAR (nuevo: evita intentos en SIMs sin señal)
+            señal_ok, csq = await verificar_intensidad_senal_async(puerto)
+            if not señal_ok:
+                log_activacion(f"❌ [{puerto}] Señal insuficiente (CSQ={csq}) - Saltando activación")
+                log_activacion(f"⚠️ [{puerto}] Se requiere CSQ >= {Settings.CSQ_MINIMO} para activar")
+                resultado["intentos"] = 0
+                return resultado
         
         # 8. Intentar activación
         for intento in range(Settings.INTENTOS_ACTIVACION):
@@ -1387,29 +1820,40 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
             log_activacion(f"🔄 [{puerto}] Intento {intento + 1}/{Settings.INTENTOS_ACTIVACION}")
             
             # Activar SIM
-            if not activar_sim_claro(puerto, iccid):
-                time.sleep(Settings.ESPERA_ENTRE_INTENTOS)
+            inicio_activacion = time.time()
+            if not await ejecutor_rotacion.en_hilo(activar_sim_claro, puerto, iccid):
+                await asyncio.sleep(Settings.ESPERA_ENTRE_INTENTOS)
                 continue
             
-            # Esperar a que llegue SMS (aumentado para dar más tiempo)
-            log_activacion(f"⏳ [{puerto}] Esperando {Settings.ESPERA_DESPUES_ACTIVACION}s para recibir SMS...")
-            time.sleep(Settings.ESPERA_DESPUES_ACTIVACION)
+            # Esperar a que llegue SMS (v2.15.0: termina apenas el módem avisa con +CMTI)
+            espera_sms = espera_adaptativa(ESPERA_SMS_ACTIVACION, Settings.ESPERA_DESPUES_ACTIVACION, [puerto])
+            log_activacion(f"⏳ [{puerto}] Esperando hasta {espera_sms}s para recibir SMS...")
+            with traza_rotacion.tramo("esperar_sms", puerto, intento=intento + 1):
+                evento_sms = await bus_urc.esperar_async(puerto, (URC_SMS_RECIBIDO,), timeout=espera_sms,
+                                                         desde=inicio_activacion)
+            if evento_sms:
+                log_activacion(f"📩 [{puerto}] SMS recibido tras {time.time() - inicio_activacion:.1f}s ({evento_sms.linea})")
+                tiempos_adaptativos.observar(ESPERA_SMS_ACTIVACION, evento_sms.momento - inicio_activacion, puerto)
+                await asyncio.sleep(Settings.ESPERA_TRAS_CMTI)
+            else:
+                # Muestra censurada: cuenta como el techo para que la espera no se acorte de más
+                tiempos_adaptativos.observar(ESPERA_SMS_ACTIVACION, Settings.ESPERA_DESPUES_ACTIVACION, puerto)
             
             # Leer número
-            numero = leer_numero_sms(puerto, iccid)
+            numero = await ejecutor_rotacion.en_hilo(leer_numero_sms, puerto, iccid)
             if numero:
                 resultado["numero"] = numero
                 resultado["activado"] = True
                 
                 # Guardar número
-                guardar_numero_en_sim(puerto, numero, iccid)
+                await ejecutor_rotacion.en_hilo(guardar_numero_en_sim, puerto, numero, iccid)
                 log_activacion(f"🎉 [{puerto}] Activación exitosa: {numero}")
                 return resultado
             
             # Si no se obtuvo número, reintentar
             if intento < Settings.INTENTOS_ACTIVACION - 1:
                 log_activacion(f"⏳ [{puerto}] Esperando {Settings.ESPERA_ENTRE_INTENTOS}s antes de reintentar...")
-                time.sleep(Settings.ESPERA_ENTRE_INTENTOS)
+                await asyncio.sleep(Settings.ESPERA_ENTRE_INTENTOS)
         
         log_activacion(f"❌ [{puerto}] No se obtuvo número tras {Settings.INTENTOS_ACTIVACION} intentos")
         return resultado
@@ -1418,325 +1862,2469 @@ def procesar_activacion_sim(puerto: str, iccid_anterior: str = None) -> dict:
         log_activacion(f"❌ [{puerto}] Error en proceso de activación: {e}")
         return resultado
 
-# ==================== FUNCIONES DE PUERTO SERIAL ====================
-def cerrar_puertos_serial():
-    """Cierra todos los puertos serial abiertos usando hilos"""
-    console.print("[yellow]🔒 Cerrando todos los puertos serial...[/yellow]")
+# ==================== POOL DE SESIONES SERIAL ====================
+class SesionModem:
+    """Handle serial persistente de un puerto COM (uno por módem o controlador)"""
+    
+    def __init__(self, puerto: str):
+        self.puerto = puerto
+        self.ser = None
+        self.lock = threading.RLock()  # Un solo comando a la vez por puerto
+        self.aperturas = 0
+        self.errores = 0
+        self.ultimo_uso = 0.0
+    
+    def abrir(self, timeout: float = None):
+        """Abre (o reabre) el puerto con la configuración estándar del rotador"""
+        self.cerrar()
+        self.ser = serial.Serial(
+            self.puerto,
+            baudrate=Settings.BAUDRATE,
+            timeout=timeout if timeout is not None else Settings.TIMEOUT_SERIAL
+        )
+        self.aperturas += 1
     
-    def cerrar_puerto(puerto):
+    def esta_sana(self) -> bool:
+        """Health check barato: el handle existe, está abierto y el driver responde"""
+        if self.ser is None or not self.ser.is_open:
+            return False
         try:
-            ser = serial.Serial(puerto)
-            if ser.is_open:
-                ser.close()
-                escribir_log(f"✅ Puerto cerrado: {puerto}")
-        except:
-            pass
-    
-    hilos = []
-    for p in serial.tools.list_ports.comports():
-        hilo = threading.Thread(target=cerrar_puerto, args=(p.device,))
-        hilo.start()
-        hilos.append(hilo)
-    
-    for h in hilos:
-        h.join()
+            self.ser.in_waiting  # Lanza excepción si el módem se desconectó del USB
+            return True
+        except (serial.SerialException, OSError):
+            return False
     
-    console.print("[green]✅ Puertos cerrados[/green]")
-    time.sleep(2)
+    def cerrar(self):
+        """Cierra el handle sin propagar errores"""
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+        self.ser = None
 
-def enviar_comando(puerto: str, comando: str, espera: float = 1) -> str:
-    """Envía un comando AT al puerto especificado y devuelve la respuesta cruda.
+class PoolSesionesSerial:
+    """Pool de sesiones serial indexado por puerto COM
     
-    OPTIMIZADO PARA HEROSMS JAVA: Line terminator \r (no \r\n)
-    Según análisis de sim/simbank/f.java línea 32: writeString("\r")
+    v2.12.0: Antes cada comando AT abría y cerraba su propio serial.Serial (decenas de
+    aperturas por activación). Ahora cada puerto se abre una vez y se reutiliza durante
+    toda la rotación; se reabre solo si el health check falla o el handle da error,
+    y se libera explícitamente antes de abrir HeroSMS-Partners.
     """
-    if Settings.MODO_DRY_RUN:
-        escribir_log(f"[DRY RUN] {puerto} ← {comando}")
-        return "OK"
     
-    try:
-        with serial.Serial(puerto, baudrate=Settings.BAUDRATE, timeout=Settings.TIMEOUT_SERIAL) as ser:
-            # Limpiar buffer antes de enviar
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            
-            # Enviar comando con line terminator compatible con HeroSMS Java (\r solamente)
-            ser.write((comando + "\r").encode())
-            time.sleep(espera)
-            
-            # Leer respuesta
-            respuesta = ser.read_all().decode(errors="ignore").strip()
-            
-            # Log más informativo
-            if respuesta:
-                if "OK" in respuesta:
-                    escribir_log(f"✅ [{puerto}] {comando} → OK")
-                elif "ERROR" in respuesta:
-                    escribir_log(f"⚠️ [{puerto}] {comando} → ERROR: {respuesta[:80]}")
-                else:
-                    escribir_log(f"📝 [{puerto}] {comando} → {respuesta[:80]}")
-            else:
-                escribir_log(f"⚠️ [{puerto}] {comando} → Sin respuesta")
-            
-            return respuesta
-    except Exception as e:
-        escribir_log(f"❌ [{puerto}] Error en {comando}: {e}")
-        return ""
+    def __init__(self):
+        self._sesiones = {}
+        self._lock = threading.Lock()
+    
+    def _obtener_sesion(self, puerto: str) -> SesionModem:
+        with self._lock:
+            sesion = self._sesiones.get(puerto)
+            if sesion is None:
+                sesion = SesionModem(puerto)
+                self._sesiones[puerto] = sesion
+        if Settings.ESCUCHA_URC:
+            escucha_urc.iniciar()
+        return sesion
+    
+    def sesiones_abiertas(self) -> list:
+        """Sesiones con handle abierto (las que puede leer la escucha de URC)"""
+        with self._lock:
+            return [sesion for sesion in self._sesiones.values() if sesion.ser is not None]
+    
+    @contextmanager
+    def usar(self, puerto: str, timeout: float = None):
+        """Entrega el serial.Serial del puerto con acceso exclusivo durante el bloque
+        
+        Si el bloque lanza un error de puerto, la sesión se descarta para que
+        el próximo uso la reabra.
+        """
+        if not Settings.USAR_POOL_SESIONES:
+            # Comportamiento anterior: abrir/cerrar en cada comando
+            with serial.Serial(puerto, baudrate=Settings.BAUDRATE,
+                               timeout=timeout if timeout is not None else Settings.TIMEOUT_SERIAL) as ser:
+                yield ser
+            return
+        
+        sesion = self._obtener_sesion(puerto)
+        with sesion.lock:
+            if not sesion.esta_sana():
+                try:
+                    sesion.abrir(timeout)
+                except (serial.SerialException, OSError) as e:
+                    propiedad_puertos.reportar_fallo_apertura(puerto, e)
+                    raise
+            elif timeout is not None:
+                sesion.ser.timeout = timeout
+            try:
+                yield sesion.ser
+            except (serial.SerialException, OSError):
+                sesion.errores += 1
+                sesion.cerrar()
+                raise
+            finally:
+                sesion.ultimo_uso = time.time()
+    
+    def invalidar(self, puerto: str):
+        """Cierra la sesión de un puerto (p.ej. tras AT+CFUN=1,1, que reinicia el módem)"""
+        with self._lock:
+            sesion = self._sesiones.get(puerto)
+        if sesion is not None:
+            with sesion.lock:
+                sesion.cerrar()
+    
+    def liberar_todas(self) -> int:
+        """Cierra todas las sesiones abiertas. Retorna cuántos handles se liberaron"""
+        with self._lock:
+            sesiones = list(self._sesiones.values())
+            self._sesiones = {}
+        
+        liberadas = 0
+        for sesion in sesiones:
+            with sesion.lock:
+                if sesion.ser is not None:
+                    liberadas += 1
+                sesion.cerrar()
+        return liberadas
+    
+    def estadisticas(self) -> dict:
+        """Resumen de aperturas/errores por puerto (para snapshots)"""
+        with self._lock:
+            return {
+                puerto: {"aperturas": sesion.aperturas, "errores": sesion.errores}
+                for puerto, sesion in self._sesiones.items()
+            }
 
-def enviar_comando_resiliente(puerto: str, comando: str, intentos: int = None) -> str:
-    """Envía comando AT con reintentos automáticos (backoff exponencial)"""
-    if intentos is None:
-        intentos = Settings.MAX_INTENTOS_COMANDO_AT
-    
-    for i in range(intentos):
-        respuesta = enviar_comando(puerto, comando)
-        if respuesta and ("OK" in respuesta or respuesta):  # Considera válida cualquier respuesta
-            return respuesta
-        if i < intentos - 1:  # No esperar en el último intento
-            espera = 1.5 * (i + 1)  # Backoff exponencial
-            escribir_log(f"🔄 [{puerto}] Reintento {i+2}/{intentos} en {espera:.1f}s...")
-            time.sleep(espera)
-    
-    escribir_log(f"❌ [{puerto}] Comando falló tras {intentos} intentos: {comando}")
-    return respuesta if 'respuesta' in locals() else ""
+pool_sesiones = PoolSesionesSerial()
 
-def revisar_puerto(puerto):
-    """Verifica si un puerto responde al comando AT y lo reinicia
+def transaccion_serial(puerto: str, operacion, timeout: float = None):
+    """Ejecuta operacion(ser) sobre la sesión persistente del puerto
     
-    OPTIMIZADO PARA HEROSMS JAVA: Line terminator \r (compatible con dq.java)
+    Si el handle falla (módem reiniciado, USB reconectado) se reabre y se
+    reintenta hasta POOL_REINTENTOS_REAPERTURA veces antes de propagar el error.
     """
-    try:
-        with serial.Serial(puerto, baudrate=115200, timeout=2) as ser:
-            ser.write(b"AT\r")
-            time.sleep(1)
-            respuesta = ser.read_all().decode(errors="ignore").strip()
-            
-            if "OK" in respuesta:
-                escribir_log(f"✅ [{puerto}] Módem responde OK")
-                # Reiniciar módem con AT+CFUN=1,1 (como en dq.java línea 29)
-                ser.write(b"AT+CFUN=1,1\r")
-                escribir_log(f"🔄 [{puerto}] Módem reiniciado con AT+CFUN=1,1")
-                return True
-            else:
-                escribir_log(f"⚠️ [{puerto}] No respondió al comando AT")
-                return False
-    except Exception as e:
-        escribir_log(f"❌ [{puerto}] Error al validar: {e}")
-        return False
+    for intento in range(Settings.POOL_REINTENTOS_REAPERTURA + 1):
+        try:
+            with pool_sesiones.usar(puerto, timeout) as ser:
+                return operacion(ser)
+        except (serial.SerialException, OSError):
+            if intento >= Settings.POOL_REINTENTOS_REAPERTURA:
+                disyuntores.registrar(puerto, RESULTADO_EXCEPCION)
+                raise
 
-def esperar_sim_lista(puerto, max_intentos=25):
-    """Espera hasta que la SIM esté lista y detectada correctamente
-    
-    OPTIMIZADO PARA UC20: max_intentos aumentado a 25 (era 20)
-    UC20 tarda más en detectar SIMs después de cambiar slot que M35
-    Line terminator \r compatible con HeroSMS Java (dv.java)
+# ==================== DISYUNTOR POR PUERTO ====================
+DISYUNTOR_CERRADO = "cerrado"  # Normal: los comandos pasan
+DISYUNTOR_ABIERTO = "abierto"  # Puerto fuera de servicio hasta que venza el enfriamiento
+DISYUNTOR_SEMIABIERTO = "semiabierto"  # Enfriamiento vencido: un solo AT de sondeo decide
+
+class PuertoFueraDeServicio(serial.SerialException):
+    """El disyuntor del puerto está abierto: el comando no se envía"""
+
+class EstadoDisyuntor:
+    def __init__(self):
+        self.estado = DISYUNTOR_CERRADO
+        self.fallos = 0  # Fallos consecutivos
+        self.aperturas = 0  # Aperturas seguidas sin un éxito entre medio (define el enfriamiento)
+        self.reabrir_en = 0
+        self.gracia_hasta = 0  # Tras AT+CFUN=1,1 el silencio del módem no cuenta como fallo
+
+class DisyuntoresPuerto:
+    """Disyuntor (circuit breaker) por puerto de módem, alimentado por la capa de transporte
+    
+    v2.22.0: Reemplaza puertos_inestables, que nadie alimentaba. Cada transacción serial
+    informa su resultado: sin respuesta o excepción cuenta como fallo y cualquier código
+    final (OK, ERROR, +CME ERROR) como éxito. Con UMBRAL_PUERTO_INESTABLE fallos seguidos
+    el puerto se abre por DISYUNTOR_ENFRIAMIENTO_BASE segundos, duplicando en cada
+    reapertura hasta DISYUNTOR_ENFRIAMIENTO_MAX. Vencido el enfriamiento, el primer uso
+    del puerto manda un solo AT de sondeo que lo cierra o lo vuelve a abrir. La gracia de
+    reinicio (en_reinicio) solo perdona fallos con el puerto cerrado, nunca el del sondeo.
+    Los controladores de SIM Bank no pasan por el disyuntor (algunos no responden al SWIT).
     """
-    escribir_log(f"⏳ [{puerto}] Esperando detección de SIM...")
     
-    for intento in range(max_intentos):
+    def __init__(self, sondeo=None):
+        self._estados = {}
+        self._lock = threading.Lock()
+        self._sondeo = sondeo or self._sondeo_at  # sondeo(puerto): su resultado llega por registrar()
+    
+    @staticmethod
+    def _sondeo_at(puerto: str):
         try:
-            with serial.Serial(puerto, baudrate=115200, timeout=2) as ser:
-                # Verificar estado de SIM (como en dv.java - AT+CPIN?)
-                ser.write(b"AT+CPIN?\r")
-                time.sleep(0.8)
-                respuesta = ser.read_all().decode(errors="ignore").strip()
-                
-                if "+CPIN: READY" in respuesta:
-                    escribir_log(f"✅ [{puerto}] SIM lista (intento {intento + 1})")
-                    return True
-                elif "+CPIN:" in respuesta:
-                    escribir_log(f"⏳ [{puerto}] SIM detectada pero no lista: {respuesta[:50]}")
-                else:
-                    # Solo loguear cada 3 intentos para no saturar el log
-                    if intento % 3 == 0:
-                        escribir_log(f"⏳ [{puerto}] Esperando SIM... (intento {intento + 1}/{max_intentos})")
-                
-                time.sleep(1.5)
-        except Exception as e:
-            escribir_log(f"⚠️ [{puerto}] Error al verificar SIM: {e}")
-            time.sleep(1.5)
+            transaccion_serial(puerto, lambda ser: _escribir_y_leer(ser, "AT", 0.3, timeout=Settings.DISYUNTOR_TIMEOUT_SONDEO))
+        except (serial.SerialException, OSError):
+            pass  # transaccion_serial ya registró el fallo
     
-    escribir_log(f"❌ [{puerto}] Timeout esperando SIM después de {max_intentos} intentos")
-    return False
-
-def obtener_iccid_modem(puerto):
-    """Obtiene el ICCID del módem para verificar que cambió
+    def _aplica(self, puerto: str) -> bool:
+        return Settings.DISYUNTOR_PUERTOS and puerto not in {config["com"] for config in SIM_BANKS.values()}
     
-    OPTIMIZADO PARA HEROSMS JAVA: AT+QCCID con line terminator \r
-    Según m.java línea 221: return "AT+QCCID" para Quectel UC20
-    """
-    try:
-        with serial.Serial(puerto, baudrate=115200, timeout=2) as ser:
-            ser.write(b"AT+QCCID\r")
-            time.sleep(1)
-            respuesta = ser.read_all().decode(errors="ignore").strip()
-            
-            # Buscar el ICCID en la respuesta (19-20 dígitos)
-            import re
-            match = re.search(r'\d{19,20}', respuesta)
-            if match:
-                iccid = match.group(0)
-                escribir_log(f"📱 [{puerto}] ICCID detectado: {iccid}")
-                return iccid
-            else:
-                escribir_log(f"⚠️ [{puerto}] No se pudo extraer ICCID: {respuesta[:50]}")
-                return None
-    except Exception as e:
-        escribir_log(f"❌ [{puerto}] Error al obtener ICCID: {e}")
-        return None
-
-def obtener_iccid_modem_rapido(puerto, timeout=1.5):
-    """Obtiene el ICCID del módem de forma rápida (sin log) para verificación
+    def _estado(self, puerto: str) -> EstadoDisyuntor:
+        if puerto not in self._estados:
+            self._estados[puerto] = EstadoDisyuntor()
+        return self._estados[puerto]
     
-    OPTIMIZADO PARA HEROSMS JAVA: AT+QCCID con line terminator \r
-    """
-    try:
-        with serial.Serial(puerto, baudrate=115200, timeout=timeout) as ser:
-            ser.write(b"AT+QCCID\r")
-            time.sleep(0.8)
-            respuesta = ser.read_all().decode(errors="ignore").strip()
-            
-            # Buscar el ICCID en la respuesta (19-20 dígitos)
-            match = re.search(r'\d{19,20}', respuesta)
-            if match:
-                return match.group(0)
-            return None
-    except Exception:
-        return None
-
-def esperar_registro_red(puerto: str, max_intentos: int = 30) -> bool:
-    """Espera hasta que el módem esté registrado en red antes de enviar USSD
+    def registrar(self, puerto: str, resultado: str):
+        """Resultado de una transacción (RESULTADO_* de las latencias)"""
+        if not self._aplica(puerto):
+            return
+        if resultado in (RESULTADO_SIN_RESPUESTA, RESULTADO_EXCEPCION):
+            self._fallo(puerto)
+        else:
+            self._exito(puerto)
+    
+    def _exito(self, puerto: str):
+        with self._lock:
+            estado = self._estado(puerto)
+            rehabilitado = estado.estado != DISYUNTOR_CERRADO
+            estado.estado = DISYUNTOR_CERRADO
+            estado.fallos = 0
+            estado.aperturas = 0
+        if rehabilitado:
+            escribir_log(f"✅ Puerto {puerto} rehabilitado (respondió al sondeo)")
+    
+    def _fallo(self, puerto: str):
+        with self._lock:
+            estado = self._estado(puerto)
+            # La gracia solo cubre al puerto sano: un sondeo semiabierto fallido siempre lo reabre
+            if estado.estado == DISYUNTOR_CERRADO and time.time() < estado.gracia_hasta:
+                return
+            estado.fallos += 1
+            if estado.estado == DISYUNTOR_CERRADO and estado.fallos < Settings.UMBRAL_PUERTO_INESTABLE:
+                return
+            estado.aperturas += 1
+            enfriamiento = min(Settings.DISYUNTOR_ENFRIAMIENTO_BASE * 2 ** (estado.aperturas - 1),
+                               Settings.DISYUNTOR_ENFRIAMIENTO_MAX)
+            estado.estado = DISYUNTOR_ABIERTO
+            estado.reabrir_en = time.time() + enfriamiento
+            fallos = estado.fallos
+        escribir_log(f"⚠️ Puerto {puerto} marcado como INESTABLE ({fallos} fallos): fuera de servicio por {enfriamiento:.0f}s")
+    
+    def en_reinicio(self, puerto: str, segundos: float):
+        """El módem se está reiniciando: no contar su silencio como fallo durante 'segundos'"""
+        with self._lock:
+            self._estado(puerto).gracia_hasta = time.time() + segundos
+    
+    def disponible(self, puerto: str) -> bool:
+        """False si el puerto está abierto y todavía no venció su enfriamiento"""
+        if not self._aplica(puerto):
+            return True
+        with self._lock:
+            estado = self._estados.get(puerto)
+            return estado is None or estado.estado == DISYUNTOR_CERRADO or time.time() >= estado.reabrir_en
     
-    OPTIMIZADO PARA UC20: max_intentos aumentado a 30 (era 15)
-    UC20 tarda más en registrarse que M35, especialmente en ubicación con señal débil
-    """
-    if Settings.MODO_DRY_RUN:
-        return True
+    def abierto(self, puerto: str) -> bool:
+        with self._lock:
+            estado = self._estados.get(puerto)
+            return estado is not None and estado.estado != DISYUNTOR_CERRADO
     
-    log_activacion(f"📡 [{puerto}] Verificando registro en red...")
+    def abiertos(self) -> list:
+        with self._lock:
+            return [puerto for puerto, estado in self._estados.items() if estado.estado != DISYUNTOR_CERRADO]
     
-    for intento in range(max_intentos):
-        try:
-            respuesta = enviar_comando(puerto, "AT+CREG?", espera=0.5)
-            
-            # Parsear respuesta: +CREG: n,stat
-            # stat: 0=no registrado, 1=registrado (home), 2=buscando, 3=denegado, 5=registrado (roaming)
-            if "+CREG:" in respuesta:
-                # Buscar el segundo número (estado de registro)
-                match = re.search(r'\+CREG:\s*\d+,(\d+)', respuesta)
-                if match:
-                    estado = match.group(1)
-                    if estado == "1":
-                        log_activacion(f"✅ [{puerto}] Registrado en red local (intento {intento + 1})")
-                        return True
-                    elif estado == "5":
-                        log_activacion(f"✅ [{puerto}] Registrado en roaming (intento {intento + 1})")
-                        return True
-                    elif estado == "2":
-                        if intento % 3 == 0:  # Log cada 3 intentos
-                            log_activacion(f"🔍 [{puerto}] Buscando red... (intento {intento + 1}/{max_intentos})")
-                    elif estado == "3":
-                        log_activacion(f"❌ [{puerto}] Registro denegado por la red")
-                        return False
-                    else:
-                        if intento % 3 == 0:
-                            log_activacion(f"⏳ [{puerto}] No registrado (estado={estado}, intento {intento + 1}/{max_intentos})")
-            
-            time.sleep(2)  # Esperar 2 segundos entre intentos
-            
-        except Exception as e:
-            log_activacion(f"⚠️ [{puerto}] Error verificando registro: {e}")
-            time.sleep(2)
+    def permitir(self, puerto: str):
+        """Deja pasar un comando o lanza PuertoFueraDeServicio
+        
+        Si el enfriamiento venció, este llamado hace el sondeo AT (los demás hilos que
+        lleguen mientras tanto reciben PuertoFueraDeServicio).
+        """
+        if not self._aplica(puerto):
+            return
+        with self._lock:
+            estado = self._estados.get(puerto)
+            if estado is None or estado.estado == DISYUNTOR_CERRADO:
+                return
+            ahora = time.time()
+            if estado.estado == DISYUNTOR_SEMIABIERTO or ahora < estado.reabrir_en:
+                raise PuertoFueraDeServicio(
+                    f"Puerto {puerto} fuera de servicio (reintento en {max(0, estado.reabrir_en - ahora):.0f}s)")
+            estado.estado = DISYUNTOR_SEMIABIERTO
+        
+        self._sondeo(puerto)
+        
+        if self.abierto(puerto):
+            raise PuertoFueraDeServicio(f"Puerto {puerto} sigue sin responder al sondeo AT")
     
-    log_activacion(f"❌ [{puerto}] Timeout esperando registro en red ({max_intentos * 2}s)")
-    return False
+    def necesita_permiso(self, puerto: str) -> bool:
+        """Atajo sin sondeo para el motor asyncio: True si permitir() tiene algo que hacer"""
+        return self._aplica(puerto) and self.abierto(puerto)
+
+disyuntores = DisyuntoresPuerto()
 
-def verificar_registro_modems_global(modems_activos: list) -> tuple:
-    """Verifica el registro en red de TODOS los módems en paralelo
+# ==================== LECTOR AT POR CÓDIGO DE RESULTADO FINAL ====================
+# Códigos que cierran la respuesta de un comando AT (3GPP TS 27.007 / V.250)
+RESULTADOS_FINALES_AT = ("OK", "ERROR", "NO CARRIER", "BUSY", "NO ANSWER", "NO DIALTONE")
+PREFIJOS_ERROR_EXTENDIDO_AT = ("+CME ERROR:", "+CMS ERROR:")
+
+def es_resultado_final(linea: str) -> bool:
+    """True si la línea es un código de resultado final (OK, ERROR, +CME/+CMS ERROR...)"""
+    linea = linea.strip()
+    return linea in RESULTADOS_FINALES_AT or linea.startswith(PREFIJOS_ERROR_EXTENDIDO_AT)
+
+def respuesta_at_completa(texto: str, terminadores: tuple = ()) -> bool:
+    """Indica si el texto acumulado ya contiene el final de la respuesta
     
-    NUEVO: Compatible con flujo de HeroSMS Java (dv.java)
-    Retorna: (registrados, sin_registrar)
+    Args:
+        texto: Bytes recibidos hasta ahora (decodificados)
+        terminadores: Terminadores adicionales propios del comando (p.ej. el prompt '>'
+                      de AT+CMGS), que cierran la respuesta aunque no haya OK
     """
-    if Settings.MODO_DRY_RUN:
-        return len(modems_activos), 0
+    for terminador in terminadores:
+        if texto.rstrip().endswith(terminador):
+            return True
     
-    registrados = 0
-    sin_registrar = 0
-    registrados_lock = threading.Lock()
+    lineas = texto.replace("\r", "\n").split("\n")
+    # La última línea puede estar incompleta: "+CME ERROR:" sin el código todavía
+    ultima = lineas.pop()
+    if ultima.strip() in RESULTADOS_FINALES_AT:
+        return True
+    return any(es_resultado_final(linea) for linea in lineas if linea.strip())
+
+def timeout_propio_comando(comando: str) -> float:
+    """Deadline fijo del comando en TIMEOUTS_COMANDO_AT (None si usa el genérico)"""
+    for prefijo, segundos in Settings.TIMEOUTS_COMANDO_AT.items():
+        if comando.upper().startswith(prefijo):
+            return segundos
+    return None
+
+def timeout_para_comando(comando: str, espera: float = 0, puerto: str = None) -> float:
+    """Deadline de lectura para un comando: tabla TIMEOUTS_COMANDO_AT o max(espera, TIMEOUT_SERIAL)
     
-    def verificar_uno(puerto):
-        nonlocal registrados, sin_registrar
-        try:
-            respuesta = enviar_comando(puerto, "AT+CREG?", espera=0.5)
-            if "+CREG:" in respuesta:
-                match = re.search(r'\+CREG:\s*\d+,(\d+)', respuesta)
-                if match:
-                    estado = match.group(1)
-                    with registrados_lock:
-                        if estado in ["1", "5"]:  # 1=home, 5=roaming
-                            registrados += 1
-                        else:
-                            sin_registrar += 1
-        except:
-            with registrados_lock:
-                sin_registrar += 1
+    v2.19.0: Con TIEMPOS_ADAPTATIVOS, TIMEOUT_SERIAL se reemplaza por lo que suele tardar el puerto
+    """
+    propio = timeout_propio_comando(comando)
+    if propio is not None:
+        return propio
+    return max(espera, tiempos_adaptativos.valor(ESPERA_RESPUESTA_AT, Settings.TIMEOUT_SERIAL,
+                                                 [puerto] if puerto else None))
+
+def leer_respuesta_at(ser, timeout: float, terminadores: tuple = ()) -> str:
+    """Lee en streaming hasta ver un código de resultado final o vencer el deadline
     
-    hilos = []
-    for puerto in modems_activos:
-        hilo = threading.Thread(target=verificar_uno, args=(puerto,))
-        hilo.start()
-        hilos.append(hilo)
+    v2.13.0: Reemplaza sleep(espera) + read_all(). Un comando que responde en 40 ms
+    retorna en 40 ms, y uno lento ya no se trunca si tarda más que 'espera'.
+    """
+    limite = time.monotonic() + timeout
+    timeout_original = ser.timeout
+    recibido = b""
     
-    for hilo in hilos:
-        hilo.join()
+    try:
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            
+            # read(1) bloquea solo hasta que llega el primer byte (o vence el deadline)
+            ser.timeout = restante
+            bloque = ser.read(1)
+            if not bloque:
+                break
+            bloque += ser.read(ser.in_waiting)
+            recibido += bloque
+            
+            if respuesta_at_completa(recibido.decode(errors="ignore"), terminadores):
+                break
+    finally:
+        ser.timeout = timeout_original
     
-    return registrados, sin_registrar
+    return recibido.decode(errors="ignore").strip()
 
-def verificar_intensidad_senal(puerto: str) -> tuple:
-    """Verifica la intensidad de señal del módem y si es suficiente para activación
+def _escribir_y_leer(ser, comando: str, espera: float, timeout: float = None, terminadores: tuple = ()) -> str:
+    """Envía un comando AT (terminador \r) y lee su respuesta
     
-    Returns:
-        tuple: (señal_ok: bool, rssi: int)
-        - señal_ok: True si CSQ >= CSQ_MINIMO y != 99
-        - rssi: valor CSQ (0-31, 99=desconocido)
+    Con LECTOR_RESULTADO_FINAL la lectura termina en cuanto llega el código de
+    resultado final; 'espera' solo se usa como deadline mínimo.
     """
-    if Settings.MODO_DRY_RUN:
-        return True, 20
+    # Limpiar buffer antes de enviar (los URC pendientes se publican, no se pierden)
+    drenar_urc(ser)
+    ser.reset_output_buffer()
     
+    inicio = time.perf_counter()
     try:
-        respuesta = enviar_comando(puerto, "AT+CSQ", espera=0.5)
+        ser.write((comando + "\r").encode())
         
-        # Parsear: +CSQ: rssi,ber
-        # rssi: 0-31 (0=-113dBm o menos, 31=-51dBm o mayor, 99=desconocido)
-        match = re.search(r'\+CSQ:\s*(\d+),', respuesta)
+        if not Settings.LECTOR_RESULTADO_FINAL:
+            time.sleep(espera)
+            respuesta = ser.read_all().decode(errors="ignore").strip()
+        else:
+            if timeout is None:
+                timeout = timeout_para_comando(comando, espera, ser.port)
+            respuesta = leer_respuesta_at(ser, timeout, terminadores)
+    except (serial.SerialException, OSError):
+        anotar_excepcion_at(ser.port, comando, inicio)
+        raise
+    return anotar_respuesta_at(ser.port, comando, respuesta, inicio)
+
+def anotar_excepcion_at(puerto: str, comando: str, inicio: float):
+    """Latencia y traza de un comando que terminó en error de puerto (común a ambos transportes)"""
+    registro_latencias.registrar(puerto, comando, time.perf_counter() - inicio, RESULTADO_EXCEPCION)
+    traza_rotacion.comando(puerto, comando, inicio, time.perf_counter() - inicio, RESULTADO_EXCEPCION)
+
+def anotar_respuesta_at(puerto: str, comando: str, respuesta: str, inicio: float) -> str:
+    """Latencias, traza, estado del módem, disyuntor, tiempos adaptativos y URC de una respuesta"""
+    duracion = time.perf_counter() - inicio
+    resultado = resultado_respuesta_at(respuesta)
+    registro_latencias.registrar(puerto, comando, duracion, resultado)
+    traza_rotacion.comando(puerto, comando, inicio, duracion, resultado)
+    estado_modems.observar_respuesta(puerto, comando, respuesta, time.time() - duracion)
+    disyuntores.registrar(puerto, resultado)
+    if resultado == RESULTADO_OK and timeout_propio_comando(comando) is None:
+        tiempos_adaptativos.observar(ESPERA_RESPUESTA_AT, duracion, puerto)
+    
+    bus_urc.alimentar(puerto, respuesta + "\n")
+    return respuesta
+
+# ==================== CADENAS DE COMANDOS AT ====================
+# Resultado de un comando dentro de una cadena. ok: True/False, o None si no se ejecutó
+# porque un comando anterior falló (fail fast)
+ResultadoAT = namedtuple("ResultadoAT", ["comando", "ok", "respuesta", "lineas"])
+
+def prefijo_respuesta_at(comando: str) -> str:
+    """Prefijo de las líneas de información de un comando: 'AT+CPBR=1' → '+CPBR'"""
+    match = re.match(r'^AT([+&%$#][A-Z0-9]+)', comando.strip().upper())
+    return match.group(1) if match else None
+
+def lineas_informacion_at(respuesta: str) -> list:
+    """Líneas de la respuesta sin eco, líneas vacías ni código de resultado final"""
+    return [
+        linea.strip() for linea in respuesta.replace("\r", "\n").split("\n")
+        if linea.strip() and not es_resultado_final(linea) and not linea.strip().upper().startswith("AT")
+    ]
+
+def lineas_finales_at(respuesta: str) -> list:
+    """Códigos de resultado final presentes en la respuesta"""
+    return [linea.strip() for linea in respuesta.replace("\r", "\n").split("\n") if es_resultado_final(linea)]
+
+def repartir_respuesta_concatenada(comandos: list, respuesta: str) -> list:
+    """Asigna a cada comando de 'AT+A;+B;+C' las líneas que empiezan con su prefijo
+    
+    Las líneas sin prefijo (p.ej. el texto de un SMS tras '+CMGL: ...') quedan con el
+    último comando que respondió.
+    """
+    prefijos = [prefijo_respuesta_at(comando) for comando in comandos]
+    lineas_por_comando = [[] for _ in comandos]
+    actual = None
+    
+    for linea in lineas_informacion_at(respuesta):
+        for indice, prefijo in enumerate(prefijos):
+            if prefijo and linea.upper().startswith(prefijo + ":"):
+                actual = indice
+                break
+        if actual is not None:
+            lineas_por_comando[actual].append(linea)
+    
+    return [
+        ResultadoAT(comando, True, "\n".join(lineas + ["OK"]), lineas)
+        for comando, lineas in zip(comandos, lineas_por_comando)
+    ]
+
+def _pasos_cadena(comandos: list, concatenar: bool):
+    """Reglas de la cadena: produce (línea, espera, timeout), recibe la respuesta y retorna los ResultadoAT
+    
+    Concatenada: una sola línea 'AT+A;+B;+C' (V.250) y una sola respuesta. Si termina en
+    error no se sabe cuál comando falló, así que se repite en modo encadenado.
+    Encadenada: cada comando sale apenas llega el código final del anterior, sin soltar
+    el puerto ni dormir entre medio; se corta en el primer error.
+    """
+    if concatenar and len(comandos) > 1 and all(c.strip().upper().startswith("AT") for c in comandos):
+        linea = comandos[0].strip() + "".join(";" + c.strip()[2:] for c in comandos[1:])
+        timeout = sum(timeout_para_comando(c, 0.5) for c in comandos)
+        respuesta = yield linea, 0.5, timeout
+        if "OK" in lineas_finales_at(respuesta):
+            return repartir_respuesta_concatenada(comandos, respuesta)
+    
+    resultados = []
+    for comando in comandos:
+        if resultados and not resultados[-1].ok:
+            resultados.append(ResultadoAT(comando, None, "", []))
+            continue
+        respuesta = yield comando, 0.5, None
+        ok = "OK" in lineas_finales_at(respuesta)
+        resultados.append(ResultadoAT(comando, ok, respuesta, lineas_informacion_at(respuesta)))
+    return resultados
+
+def _ejecutar_cadena(ser, comandos: list, concatenar: bool) -> list:
+    """Ejecuta la cadena (ver _pasos_cadena) sobre un serial ya tomado; un ResultadoAT por comando"""
+    pasos = _pasos_cadena(comandos, concatenar)
+    try:
+        paso = next(pasos)
+        while True:
+            paso = pasos.send(_escribir_y_leer(ser, *paso))
+    except StopIteration as fin:
+        return fin.value
+
+async def _ejecutar_cadena_async(ser, comandos: list, concatenar: bool, escribir_y_leer) -> list:
+    """Versión para el motor asyncio: escribir_y_leer(ser, comando, espera, timeout) es una corrutina"""
+    pasos = _pasos_cadena(comandos, concatenar)
+    try:
+        paso = next(pasos)
+        while True:
+            paso = pasos.send(await escribir_y_leer(ser, *paso))
+    except StopIteration as fin:
+        return fin.value
+
+# ==================== PARSER DE RESPUESTAS AT ====================
+# v2.24.0: Un solo lugar para convertir respuestas crudas en resultados tipados, con los
+# patrones compilados una vez. Cada función recibe la respuesta completa (eco, URC y código
+# final incluidos) y retorna None si no encuentra lo que busca: nunca lanza excepción.
+
+class EstadoCreg(namedtuple("EstadoCreg", ["n", "stat", "lac", "ci"])):
+    """+CREG: n,stat[,lac,ci]  (stat: 0 no registrado, 1 local, 2 buscando, 3 denegado, 5 roaming)"""
+    __slots__ = ()
+    
+    @property
+    def registrado(self) -> bool:
+        return self.stat in (1, 5)
+
+class Csq(namedtuple("Csq", ["rssi", "ber"])):
+    """+CSQ: rssi,ber  (rssi 0-31, 99 = desconocido)"""
+    __slots__ = ()
+    
+    @property
+    def desconocida(self) -> bool:
+        return self.rssi == 99
+    
+    @property
+    def dbm(self) -> int:
+        return None if self.desconocida else -113 + 2 * self.rssi
+
+class Iccid(namedtuple("Iccid", ["valor", "luhn_valido"])):
+    """ICCID (E.118): 19-20 dígitos que empiezan con 89; luhn_valido informa el dígito verificador"""
+    __slots__ = ()
+
+EntradaAgenda = namedtuple("EntradaAgenda", ["indice", "numero", "tipo", "nombre"])  # +CPBR
+MensajeSms = namedtuple("MensajeSms", ["indice", "estado", "remitente", "fecha", "texto"])  # +CMGL (modo texto)
+RespuestaUssd = namedtuple("RespuestaUssd", ["estado", "texto", "dcs"])  # +CUSD
+
+_PATRON_CREG = re.compile(r'^\+CREG:\s*(\d+)\s*,\s*(\d+)(?:\s*,\s*"?([0-9A-Fa-f]+)"?\s*,\s*"?([0-9A-Fa-f]+)"?)?', re.M)
+_PATRON_CSQ = re.compile(r'^\+CSQ:\s*(\d+)\s*,\s*(\d+)', re.M)
+# La línea entera debe ser el ICCID (con o sin prefijo/comillas): un número largo en otra
+# línea (IMEI, fecha de un SMS, basura del puerto) no se confunde con un ICCID
+_PATRON_ICCID = re.compile(r'^(?:\+(?:Q|I)?CCID:\s*)?"?(89\d{17,18})[Ff]?"?[ \t]*$', re.M)
+_PATRON_CPBR = re.compile(r'^\+CPBR:\s*(\d+)\s*,\s*"([^"]*)"\s*,\s*(\d+)\s*,\s*"([^"]*)"', re.M)
+_PATRON_CMGL = re.compile(r'^\+CMGL:\s*(\d+)\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\s*(?:,\s*(?:"[^"]*")?\s*(?:,\s*"([^"]*)")?)?')
+_PATRON_CUSD = re.compile(r'^\+CUSD:\s*(\d)(?:\s*,\s*"([^"]*)"(?:\s*,\s*(\d+))?)?', re.M)
+_PATRONES_NUMERO_SMS = [re.compile(patron, re.IGNORECASE) for patron in (
+    r"Tu numero es (\d+)",
+    r"\b(\d{9})\b",
+    r"\+569 ?(\d{4} ?\d{4})",
+    r"569 ?(\d{4} ?\d{4})",
+    r"\+569(\d{8})",
+    r"569(\d{8})",
+    r"\b(?:tu\s*n[uú]mero\s*es)\s*([\d\s]+)",
+)]
+_PATRON_URL_CLARO = re.compile(r"https://fif\.clarovtrcloud\.com/aod/form\?t=(\d+)")
+
+def _normalizar(respuesta: str) -> str:
+    return respuesta.replace("\r", "\n") if respuesta else ""
+
+def luhn_valido(digitos: str) -> bool:
+    total = 0
+    for posicion, digito in enumerate(reversed(digitos)):
+        valor = int(digito)
+        if posicion % 2:
+            valor = valor * 2 - 9 if valor > 4 else valor * 2
+        total += valor
+    return total % 10 == 0
+
+def parsear_creg(respuesta: str) -> EstadoCreg:
+    match = _PATRON_CREG.search(_normalizar(respuesta))
+    if not match:
+        return None
+    return EstadoCreg(int(match.group(1)), int(match.group(2)), match.group(3), match.group(4))
+
+def parsear_csq(respuesta: str) -> Csq:
+    match = _PATRON_CSQ.search(_normalizar(respuesta))
+    return Csq(int(match.group(1)), int(match.group(2))) if match else None
+
+def parsear_iccid(respuesta: str) -> Iccid:
+    match = _PATRON_ICCID.search(_normalizar(respuesta))
+    return Iccid(match.group(1), luhn_valido(match.group(1))) if match else None
+
+def parsear_cpbr(respuesta: str) -> list:
+    """Entradas de agenda de una respuesta AT+CPBR"""
+    return [
+        EntradaAgenda(int(indice), numero, int(tipo), nombre)
+        for indice, numero, tipo, nombre in _PATRON_CPBR.findall(_normalizar(respuesta))
+    ]
+
+def parsear_cmgl(respuesta: str) -> list:
+    """Mensajes de una respuesta AT+CMGL en modo texto (el texto puede ocupar varias líneas)"""
+    mensajes = []
+    actual = None
+    texto = []
+    for linea in lineas_informacion_at(respuesta or ""):
+        match = _PATRON_CMGL.match(linea)
+        if match:
+            if actual:
+                mensajes.append(actual._replace(texto="\n".join(texto)))
+            actual = MensajeSms(int(match.group(1)), match.group(2), match.group(3), match.group(4) or "", "")
+            texto = []
+        elif actual:
+            texto.append(linea)
+    if actual:
+        mensajes.append(actual._replace(texto="\n".join(texto)))
+    return mensajes
+
+def parsear_cusd(respuesta: str) -> RespuestaUssd:
+    match = _PATRON_CUSD.search(_normalizar(respuesta))
+    if not match:
+        return None
+    return RespuestaUssd(int(match.group(1)), match.group(2) or "", int(match.group(3)) if match.group(3) else None)
+
+def extraer_numero_sms(texto: str) -> str:
+    """Número Claro (569XXXXXXXX) en el cuerpo de un SMS, o None"""
+    for patron in _PATRONES_NUMERO_SMS:
+        match = patron.search(texto)
         if match:
-            rssi = int(match.group(1))
-            
-            # Verificar si es señal válida y suficiente
-            señal_ok = (rssi >= Settings.CSQ_MINIMO and rssi != 99)
-            
-            if rssi == 99:
-                log_activacion(f"📶 [{puerto}] Señal desconocida (CSQ=99) - ❌ INSUFICIENTE")
-            elif rssi >= 20:
-                log_activacion(f"📶 [{puerto}] Señal excelente ({rssi}/31) - ✅ OK")
-            elif rssi >= 15:
-                log_activacion(f"📶 [{puerto}] Señal buena ({rssi}/31) - ✅ OK")
-            elif rssi >= Settings.CSQ_MINIMO:
-                log_activacion(f"📶 [{puerto}] Señal regular ({rssi}/31) - ⚠️ MÍNIMA pero aceptable")
+            return f"569{match.group(1).replace(' ', '')[-8:]}"
+    match = _PATRON_URL_CLARO.search(texto)
+    return f"569{match.group(1)[-8:]}" if match else None
+
+# ==================== LATENCIAS POR COMANDO AT ====================
+# Límites superiores (ms) de los buckets del histograma; el último es "más que eso"
+LIMITES_HISTOGRAMA_MS = (5, 10, 20, 50, 100, 200, 350, 500, 750, 1000, 1500, 2000, 3000, 5000,
+                         7500, 10000, 15000, 20000, 30000, 60000)
+
+RESULTADO_OK = "ok"
+RESULTADO_ERROR = "error"  # ERROR / +CME ERROR / +CMS ERROR / NO CARRIER...
+RESULTADO_SIN_RESPUESTA = "sin_respuesta"  # Venció el deadline sin código final
+RESULTADO_EXCEPCION = "excepcion"  # Error del puerto (USB desconectado, handle inválido)
+
+def verbo_at(comando: str) -> str:
+    """Verbo de un comando sin argumentos: 'AT+CPBW=1,...' → 'AT+CPBW', 'AT+SWIT01-0003' → 'AT+SWIT'"""
+    verbos = []
+    for parte in comando.strip().upper().split(";"):
+        parte = parte.strip()
+        match = re.match(r'^([+&%$#][A-Z]+|[A-Z]+)', parte[2:] if parte.startswith("AT") else parte)
+        verbo = match.group(1) if match else ""
+        verbos.append(("AT" if parte.startswith("AT") else "") + verbo)
+    return ";".join(verbos)
+
+def resultado_respuesta_at(respuesta: str) -> str:
+    """Clasifica una respuesta para el histograma: ok, error o sin_respuesta"""
+    finales = lineas_finales_at(respuesta)
+    if not finales:
+        return RESULTADO_SIN_RESPUESTA
+    return RESULTADO_OK if finales[-1] == "OK" else RESULTADO_ERROR
+
+class HistogramaLatencia:
+    """Histograma de buckets fijos (ms) con conteo, mínimo, máximo y percentiles aproximados"""
+    
+    def __init__(self, buckets: list = None):
+        self.buckets = list(buckets) if buckets else [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)
+        self.cantidad = sum(self.buckets)
+        self.suma_ms = 0.0
+        self.minimo_ms = None
+        self.maximo_ms = None
+    
+    def registrar(self, ms: float):
+        indice = len(LIMITES_HISTOGRAMA_MS)
+        for i, limite in enumerate(LIMITES_HISTOGRAMA_MS):
+            if ms <= limite:
+                indice = i
+                break
+        self.buckets[indice] += 1
+        self.cantidad += 1
+        self.suma_ms += ms
+        self.minimo_ms = ms if self.minimo_ms is None else min(self.minimo_ms, ms)
+        self.maximo_ms = ms if self.maximo_ms is None else max(self.maximo_ms, ms)
+    
+    def combinar(self, otro: "HistogramaLatencia"):
+        self.buckets = [a + b for a, b in zip(self.buckets, otro.buckets)]
+        self.cantidad += otro.cantidad
+        self.suma_ms += otro.suma_ms
+        for valor in (otro.minimo_ms, otro.maximo_ms):
+            if valor is not None:
+                self.minimo_ms = valor if self.minimo_ms is None else min(self.minimo_ms, valor)
+                self.maximo_ms = valor if self.maximo_ms is None else max(self.maximo_ms, valor)
+    
+    def percentil(self, p: float) -> float:
+        """Percentil p (0-100) interpolando dentro del bucket; acotado por mínimo y máximo reales"""
+        if not self.cantidad:
+            return None
+        objetivo = self.cantidad * p / 100
+        acumulado = 0
+        for i, conteo in enumerate(self.buckets):
+            if conteo and acumulado + conteo >= objetivo:
+                inferior = LIMITES_HISTOGRAMA_MS[i - 1] if i > 0 else 0
+                superior = LIMITES_HISTOGRAMA_MS[i] if i < len(LIMITES_HISTOGRAMA_MS) else self.maximo_ms
+                valor = inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+                return round(min(max(valor, self.minimo_ms), self.maximo_ms), 1)
+            acumulado += conteo
+        return self.maximo_ms
+    
+    def a_dict(self) -> dict:
+        return {
+            "cantidad": self.cantidad,
+            "p50_ms": self.percentil(50),
+            "p95_ms": self.percentil(95),
+            "p99_ms": self.percentil(99),
+            "promedio_ms": round(self.suma_ms / self.cantidad, 1) if self.cantidad else None,
+            "min_ms": round(self.minimo_ms, 1) if self.minimo_ms is not None else None,
+            "max_ms": round(self.maximo_ms, 1) if self.maximo_ms is not None else None,
+            "buckets": self.buckets,
+        }
+    
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "HistogramaLatencia":
+        histograma = cls(datos.get("buckets"))
+        histograma.cantidad = datos.get("cantidad", histograma.cantidad)
+        histograma.suma_ms = (datos.get("promedio_ms") or 0) * histograma.cantidad
+        histograma.minimo_ms = datos.get("min_ms")
+        histograma.maximo_ms = datos.get("max_ms")
+        return histograma
+
+class RegistroLatencias:
+    """Histogramas por (puerto, verbo, resultado) de la rotación en curso
+    
+    v2.18.0: Lo alimenta la capa de transporte (cada comando que espera respuesta),
+    se guarda al terminar cada rotación en LATENCIAS_FILE y se consulta con --latencias.
+    """
+    
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+    
+    def registrar(self, puerto: str, comando: str, segundos: float, resultado: str):
+        if not Settings.REGISTRAR_LATENCIAS:
+            return
+        clave = (puerto, verbo_at(comando), resultado)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = HistogramaLatencia()
+            histograma.registrar(segundos * 1000)
+    
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas = {}
+    
+    def resumen(self) -> list:
+        with self._lock:
+            return [
+                {"puerto": puerto, "verbo": verbo, "resultado": resultado, **histograma.a_dict()}
+                for (puerto, verbo, resultado), histograma in sorted(self._histogramas.items())
+            ]
+    
+    def guardar(self, slot: int, iteracion: int):
+        """Agrega los histogramas de esta rotación al archivo y empieza de cero"""
+        entradas = self.resumen()
+        if not entradas:
+            return
+        try:
+            historial = []
+            if os.path.exists(Settings.LATENCIAS_FILE):
+                with open(Settings.LATENCIAS_FILE, "r", encoding="utf-8") as f:
+                    historial = json.load(f).get("rotaciones", [])
+            historial.append({
+                "slot": slot,
+                "iteracion": iteracion,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "version": Settings.VERSION,
+                "latencias": entradas,
+            })
+            historial = historial[-Settings.LATENCIAS_MAX_ROTACIONES:]
+            with open(Settings.LATENCIAS_FILE, "w", encoding="utf-8") as f:
+                json.dump({"limites_ms": list(LIMITES_HISTOGRAMA_MS), "rotaciones": historial}, f, ensure_ascii=False)
+            escribir_log(f"⏱️ Latencias AT guardadas: {len(entradas)} series ({Settings.LATENCIAS_FILE})")
+        except Exception as e:
+            escribir_log(f"⚠️ Error al guardar latencias: {e}")
+        self.reiniciar()
+
+registro_latencias = RegistroLatencias()
+
+def cargar_latencias_historicas(ultimas: int = None, por_puerto: bool = True) -> dict:
+    """Combina los histogramas guardados de las últimas N rotaciones
+    
+    Returns:
+        dict: {(puerto o '*', verbo, resultado): HistogramaLatencia}
+    """
+    if not os.path.exists(Settings.LATENCIAS_FILE):
+        return {}
+    with open(Settings.LATENCIAS_FILE, "r", encoding="utf-8") as f:
+        rotaciones = json.load(f).get("rotaciones", [])
+    if ultimas:
+        rotaciones = rotaciones[-ultimas:]
+    
+    combinados = {}
+    for rotacion in rotaciones:
+        for entrada in rotacion["latencias"]:
+            clave = (entrada["puerto"] if por_puerto else "*", entrada["verbo"], entrada["resultado"])
+            histograma = HistogramaLatencia.desde_dict(entrada)
+            if clave in combinados:
+                combinados[clave].combinar(histograma)
+            else:
+                combinados[clave] = histograma
+    return combinados
+
+def mostrar_latencias(ultimas: int = None, filtro: str = None):
+    """Tabla de latencias por puerto/verbo/resultado (flag --latencias)"""
+    por_puerto = filtro != "global"
+    combinados = cargar_latencias_historicas(ultimas, por_puerto=por_puerto)
+    if not combinados:
+        console.print(f"[yellow]⚠️ No hay latencias registradas en {Settings.LATENCIAS_FILE}[/yellow]")
+        return
+    
+    tabla = Table(title=f"⏱️ Latencias AT ({'últimas ' + str(ultimas) if ultimas else 'todas las'} rotaciones)")
+    for columna in ("Puerto", "Verbo", "Resultado", "N", "p50 ms", "p95 ms", "p99 ms", "máx ms"):
+        tabla.add_column(columna, justify="right" if columna.endswith(("ms", "N")) else "left")
+    
+    filas = sorted(combinados.items(), key=lambda kv: -(kv[1].percentil(95) or 0))
+    for (puerto, verbo, resultado), histograma in filas:
+        if filtro and filtro != "global" and filtro.upper() not in (puerto.upper(), verbo.upper()):
+            continue
+        datos = histograma.a_dict()
+        color = "green" if resultado == RESULTADO_OK else "yellow" if resultado == RESULTADO_ERROR else "red"
+        tabla.add_row(puerto, verbo, f"[{color}]{resultado}[/{color}]", str(datos["cantidad"]),
+                      str(datos["p50_ms"]), str(datos["p95_ms"]), str(datos["p99_ms"]), str(datos["max_ms"]))
+    console.print(tabla)
+
+# ==================== ESCUCHA DE URC (CÓDIGOS NO SOLICITADOS) ====================
+# Tipos de evento publicados por el bus
+URC_SMS_RECIBIDO = "SMS_RECIBIDO"  # +CMTI: "SM",3
+URC_USSD = "USSD"  # +CUSD: 0,"texto",15
+URC_REGISTRO_RED = "REGISTRO_RED"  # +CREG: 1  (forma no solicitada, habilitada con AT+CREG=1)
+URC_SIM_LISTA = "SIM_LISTA"  # +CPIN: READY, +QIND: SMS DONE / PB DONE (UC20), SMS Ready / Call Ready (M35)
+URC_MODEM_INICIADO = "MODEM_INICIADO"  # RDY (fin del arranque tras AT+CFUN=1,1)
+
+EventoURC = namedtuple("EventoURC", ["puerto", "tipo", "datos", "linea", "momento"])
+
+_PATRON_URC_CMTI = re.compile(r'^\+CMTI:\s*"([^"]*)"\s*,\s*(\d+)')
+_PATRON_URC_CREG = re.compile(r'^\+CREG:\s*(\d)\s*(?:,\s*"|$)')  # '+CREG: n,stat' es respuesta, no URC
+_LINEAS_SIM_LISTA = ("+CPIN: READY", "+QIND: SMS DONE", "+QIND: PB DONE", "SMS READY", "CALL READY")
+
+def parsear_urc(linea: str):
+    """Convierte una línea en (tipo, datos) si es un URC conocido; None si no lo es"""
+    linea = linea.strip()
+    if not linea:
+        return None
+    
+    match = _PATRON_URC_CMTI.match(linea)
+    if match:
+        return URC_SMS_RECIBIDO, {"memoria": match.group(1), "indice": int(match.group(2))}
+    
+    ussd = parsear_cusd(linea) if linea.startswith("+CUSD:") else None
+    if ussd:
+        return URC_USSD, ussd._asdict()
+    
+    match = _PATRON_URC_CREG.match(linea)
+    if match:
+        return URC_REGISTRO_RED, {"estado": match.group(1)}
+    
+    if linea.upper() in _LINEAS_SIM_LISTA:
+        return URC_SIM_LISTA, {"origen": linea}
+    
+    if linea == "RDY":
+        return URC_MODEM_INICIADO, {}
+    
+    return None
+
+class BusEventosURC:
+    """Publica los URC de cada puerto a los suscriptores y permite esperarlos
+    
+    v2.15.0: Guarda un historial corto por puerto para que una espera que empieza
+    un poco después del evento (parámetro 'desde') no lo pierda.
+    """
+    
+    HISTORIAL_POR_PUERTO = 50
+    
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._historial = {}  # puerto → deque de EventoURC
+        self._parciales = {}  # puerto → línea incompleta pendiente
+        self._suscriptores = []  # (tipo o None, puerto o None, callback)
+    
+    def suscribir(self, callback, tipo: str = None, puerto: str = None):
+        """Registra callback(evento) para un tipo y/o puerto (None = todos)"""
+        with self._condicion:
+            self._suscriptores.append((tipo, puerto, callback))
+    
+    def desuscribir(self, callback):
+        with self._condicion:
+            self._suscriptores = [s for s in self._suscriptores if s[2] is not callback]
+    
+    def alimentar(self, puerto: str, texto: str):
+        """Recibe texto crudo del puerto, separa líneas completas y publica los URC"""
+        if not texto:
+            return
+        with self._condicion:
+            texto = self._parciales.pop(puerto, "") + texto
+            lineas = texto.replace("\r", "\n").split("\n")
+            pendiente = lineas.pop()
+            if pendiente:
+                self._parciales[puerto] = pendiente
+        
+        for linea in lineas:
+            urc = parsear_urc(linea)
+            if urc:
+                self.publicar(EventoURC(puerto, urc[0], urc[1], linea.strip(), time.time()))
+    
+    def publicar(self, evento: EventoURC):
+        with self._condicion:
+            historial = self._historial.setdefault(evento.puerto, deque(maxlen=self.HISTORIAL_POR_PUERTO))
+            historial.append(evento)
+            suscriptores = [cb for tipo, puerto, cb in self._suscriptores
+                            if (tipo is None or tipo == evento.tipo) and (puerto is None or puerto == evento.puerto)]
+            self._condicion.notify_all()
+        
+        for callback in suscriptores:
+            try:
+                callback(evento)
+            except Exception as e:
+                escribir_log(f"⚠️ [{evento.puerto}] Error en suscriptor URC: {e}")
+    
+    def ultimo(self, puerto: str, tipos: tuple, desde: float = 0, predicado=None):
+        """Último evento del puerto de alguno de los tipos, posterior a 'desde' (o None)"""
+        with self._condicion:
+            for evento in reversed(self._historial.get(puerto, ())):
+                if evento.momento < desde:
+                    break
+                if evento.tipo in tipos and (predicado is None or predicado(evento)):
+                    return evento
+        return None
+    
+    def esperar(self, puerto: str, tipos: tuple, timeout: float, desde: float = None, predicado=None):
+        """Bloquea hasta que llegue un evento del tipo pedido o venza el timeout
+        
+        Returns:
+            EventoURC o None si venció el timeout
+        """
+        desde = time.time() if desde is None else desde
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            while True:
+                evento = self.ultimo(puerto, tipos, desde, predicado)
+                restante = limite - time.monotonic()
+                if evento or restante <= 0:
+                    return evento
+                self._condicion.wait(restante)
+    
+    def esperar_alguno(self, puertos: list, tipos: tuple, timeout: float, desde: float = None):
+        """Como esperar(), pero retorna con el primer evento de cualquiera de los puertos"""
+        desde = time.time() if desde is None else desde
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            while True:
+                for puerto in puertos:
+                    evento = self.ultimo(puerto, tipos, desde)
+                    if evento:
+                        return evento
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return None
+                self._condicion.wait(restante)
+    
+    async def esperar_async(self, puerto: str, tipos: tuple, timeout: float, desde: float = None, predicado=None):
+        """Versión para el motor asyncio (consulta el historial sin bloquear el loop)"""
+        desde = time.time() if desde is None else desde
+        limite = time.monotonic() + timeout
+        while True:
+            evento = self.ultimo(puerto, tipos, desde, predicado)
+            if evento or time.monotonic() >= limite:
+                return evento
+            await asyncio.sleep(min(Settings.URC_INTERVALO_ESCUCHA, max(0, limite - time.monotonic())))
+
+bus_urc = BusEventosURC()
+
+def drenar_urc(ser):
+    """Lee lo que esté pendiente en el buffer de entrada y lo publica como URC"""
+    pendiente = ser.in_waiting
+    if pendiente:
+        bus_urc.alimentar(ser.port, ser.read(pendiente).decode(errors="ignore"))
+
+class EscuchaURC:
+    """Hilo de fondo que lee los puertos abiertos mientras no hay un comando en curso
+    
+    Un solo hilo barre todas las sesiones del pool (no un hilo por módem); un puerto
+    ocupado por un comando se salta, porque esa transacción ya publica sus URC.
+    """
+    
+    def __init__(self):
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+    
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="EscuchaURC", daemon=True)
+            self._hilo.start()
+    
+    def detener(self):
+        self._detener.set()
+    
+    def _ciclo(self):
+        while not self._detener.is_set():
+            for sesion in pool_sesiones.sesiones_abiertas():
+                if not sesion.lock.acquire(blocking=False):
+                    continue  # Comando en curso: la transacción publica sus propios URC
+                try:
+                    if sesion.ser is not None and sesion.ser.is_open:
+                        drenar_urc(sesion.ser)
+                except (serial.SerialException, OSError):
+                    sesion.cerrar()  # Módem desconectado o reiniciándose: se reabre al próximo uso
+                finally:
+                    sesion.lock.release()
+            self._detener.wait(Settings.URC_INTERVALO_ESCUCHA)
+
+escucha_urc = EscuchaURC()
+
+@trazar(pista=_pista_puerto)
+def habilitar_urc(puerto: str) -> bool:
+    """Habilita los URC de registro (+CREG: stat) y aviso de SMS nuevo (+CMTI)
+    
+    Se debe llamar después de cada AT+CFUN=1,1 porque el reinicio restaura la configuración.
+    """
+    if Settings.MODO_DRY_RUN or not Settings.ESCUCHA_URC:
+        return False
+    ok_creg = "OK" in enviar_comando(puerto, "AT+CREG=1", espera=0.5)
+    ok_cnmi = "OK" in enviar_comando(puerto, "AT+CNMI=2,1,0,0,0", espera=0.5)
+    return ok_creg and ok_cnmi
+
+
+# ==================== ESTADO CONOCIDO DE CADA MÓDEM ====================
+CAMPO_ICCID = "iccid"
+CAMPO_CPIN = "cpin"
+CAMPO_CREG = "creg"
+CAMPO_CSQ = "csq"
+CAMPOS_MODEM = (CAMPO_ICCID, CAMPO_CPIN, CAMPO_CREG, CAMPO_CSQ)
+CAMPOS_REINICIO = (CAMPO_CPIN, CAMPO_CREG, CAMPO_CSQ)  # AT+CFUN=1,1 no cambia la SIM: el ICCID sigue valiendo
+
+LecturaModem = namedtuple("LecturaModem", ["valor", "momento"])
+
+_PATRON_CPIN = re.compile(r'\+CPIN:\s*([A-Z][A-Z0-9 ]*)')
+
+class EstadoModems:
+    """Último ICCID, CPIN, CREG y CSQ conocido de cada módem durante la rotación
+    
+    v2.35.0: En un slot el mismo dato se pedía varias veces al hardware: el ICCID que
+    esperar_aplicacion_slot ya vio cambiar se volvía a leer tras el reset, y el +CPIN: READY
+    que liberó al módem del reinicio se volvía a consultar en esperar_sim_lista. Ahora la capa
+    de transporte anota cada respuesta de AT+QCCID/CCID, AT+CPIN?, AT+CREG? y AT+CSQ con su
+    momento, y las fases consultan aquí antes de ir al módem.
+    
+    Una lectura vale solo si empezó después de la última invalidación de su campo: el SWIT
+    invalida todo el módem (sin topología, toda la flota), AT+CFUN=1,1 invalida CPIN, CREG y
+    CSQ, y cada rotación empieza de cero. CREG y CSQ además vencen (ESTADO_MODEM_EDAD_*).
+    """
+    
+    def __init__(self):
+        self._lecturas = defaultdict(dict)  # puerto → {campo: LecturaModem}
+        self._invalidado = defaultdict(dict)  # puerto → {campo: momento}
+        self._invalidado_todos = 0.0
+        self._lock = threading.Lock()
+        self.aciertos = Counter()  # campo → lecturas al módem evitadas
+    
+    def _vigente_desde(self, puerto: str, campo: str) -> float:
+        return max(self._invalidado_todos, self._invalidado[puerto].get(campo, 0.0))
+    
+    def anotar(self, puerto: str, campo: str, valor, momento: float = None):
+        """Guarda una lectura (se ignora si empezó antes de la última invalidación)"""
+        momento = time.time() if momento is None else momento
+        with self._lock:
+            if momento < self._vigente_desde(puerto, campo):
+                return
+            actual = self._lecturas[puerto].get(campo)
+            if actual is None or momento >= actual.momento:
+                self._lecturas[puerto][campo] = LecturaModem(valor, momento)
+    
+    def observar_respuesta(self, puerto: str, comando: str, respuesta: str, momento: float):
+        """Anota lo que traiga la respuesta de una consulta (lo llama la capa de transporte)"""
+        if not Settings.ESTADO_MODEM_CACHE or not respuesta:
+            return
+        comando = comando.upper()
+        if "CCID" in comando:
+            iccid = extraer_iccid(respuesta)
+            if iccid:
+                self.anotar(puerto, CAMPO_ICCID, iccid, momento)
+        if "+CPIN?" in comando:
+            match = _PATRON_CPIN.search(respuesta)
+            if match:
+                self.anotar(puerto, CAMPO_CPIN, match.group(1).strip(), momento)
+        if "+CREG?" in comando:
+            creg = parsear_creg(respuesta)
+            if creg:
+                self.anotar(puerto, CAMPO_CREG, str(creg.stat), momento)
+        if "+CSQ" in comando:
+            csq = parsear_csq(respuesta)
+            if csq:
+                self.anotar(puerto, CAMPO_CSQ, csq.rssi, momento)
+    
+    def leer(self, puerto: str, campo: str, edad_maxima: float = None):
+        """Valor vigente del campo, o None si hay que preguntarle al módem"""
+        if not Settings.ESTADO_MODEM_CACHE:
+            return None
+        with self._lock:
+            lectura = self._lecturas.get(puerto, {}).get(campo)
+            if lectura is None or lectura.momento < self._vigente_desde(puerto, campo):
+                return None
+            if edad_maxima is not None and time.time() - lectura.momento > edad_maxima:
+                return None
+            self.aciertos[campo] += 1
+            return lectura.valor
+    
+    def _desde_urc(self, puerto: str, campo: str, tipos: tuple, valor, edad_maxima: float = None,
+                   predicado=None) -> bool:
+        """Anota 'valor' si el bus de URC trae un evento vigente de 'tipos'"""
+        if not Settings.ESTADO_MODEM_CACHE:
+            return False
+        with self._lock:
+            desde = self._vigente_desde(puerto, campo)
+        if edad_maxima is not None:
+            desde = max(desde, time.time() - edad_maxima)
+        evento = bus_urc.ultimo(puerto, tipos, desde=desde, predicado=predicado)
+        if not evento:
+            return False
+        self.anotar(puerto, campo, valor, evento.momento)
+        with self._lock:
+            self.aciertos[campo] += 1
+        return True
+    
+    def iccid(self, puerto: str) -> str:
+        return self.leer(puerto, CAMPO_ICCID)
+    
+    def sim_lista(self, puerto: str) -> bool:
+        """True si ya se sabe que la SIM está lista (AT+CPIN? o URC posterior al último reset)"""
+        return (self.leer(puerto, CAMPO_CPIN) == "READY"
+                or self._desde_urc(puerto, CAMPO_CPIN, (URC_SIM_LISTA,), "READY"))
+    
+    def registrado(self, puerto: str) -> bool:
+        """True si hay un registro en red (local o roaming) reciente"""
+        edad = Settings.ESTADO_MODEM_EDAD_CREG
+        return (self.leer(puerto, CAMPO_CREG, edad) in ("1", "5")
+                or self._desde_urc(puerto, CAMPO_CREG, (URC_REGISTRO_RED,), "1", edad,
+                                   predicado=lambda ev: ev.datos["estado"] in ("1", "5")))
+    
+    def csq(self, puerto: str) -> int:
+        return self.leer(puerto, CAMPO_CSQ, Settings.ESTADO_MODEM_EDAD_CSQ)
+    
+    def invalidar(self, puertos: list, campos: tuple = CAMPOS_MODEM):
+        momento = time.time()
+        with self._lock:
+            for puerto in puertos:
+                for campo in campos:
+                    self._invalidado[puerto][campo] = momento
+    
+    def invalidar_swit(self, controlador: str, puertos_logicos: list):
+        """Olvida lo conocido de los módems que recibirán otra SIM (sin topología, de todos)"""
+        pool_name = next((nombre for nombre, config in SIM_BANKS.items() if config.get("com") == controlador), None)
+        modems = [topologia_pools.modem(pool_name, puerto_logico) for puerto_logico in puertos_logicos] if pool_name else []
+        if modems and all(modems):
+            self.invalidar(modems)
+        else:
+            with self._lock:
+                self._invalidado_todos = time.time()
+    
+    def reiniciar(self, modems: list = None):
+        """Empieza una rotación: de todos los módems, o solo de 'modems' (pipeline de un pool)"""
+        if modems is None:
+            with self._lock:
+                self._invalidado_todos = time.time()
+                self._lecturas.clear()
+                self._invalidado.clear()
+                self.aciertos = Counter()
+            return
+        self.invalidar(modems)
+
+estado_modems = EstadoModems()
+
+# ==================== TIEMPOS ADAPTATIVOS ====================
+# Esperas que se aprenden: nombre → atributo de Settings que actúa como techo
+ESPERA_CFUN_RESET = "CFUN_RESET"  # AT+CFUN=1,1 → SIM lista
+ESPERA_APLICAR_SLOT = "APLICAR_SLOT"  # AT+SWIT → ICCID nuevo visible en el módem
+ESPERA_SMS_ACTIVACION = "SMS_ACTIVACION"  # *103# → +CMTI
+ESPERA_RESPUESTA_AT = "RESPUESTA_AT"  # Comando AT sin deadline propio → código final
+ESPERA_REINICIO_MODEM = "REINICIO_MODEM"  # AT+CFUN=1,1 → RDY / USB / AT (v2.32.0: solo se registra, el deadline es fijo)
+
+class TiemposAdaptativos:
+    """Aprende cada espera por puerto y por modelo a partir de lo que tardó de verdad
+    
+    v2.19.0: Los TIEMPO_* de Settings se afinaban a mano con cada cambio de módem
+    (UC20 → M35). Ahora cada espera observada se guarda por puerto, por modelo y global;
+    la espera usada es el percentil ADAPTATIVO_PERCENTIL más un margen, tomando el ámbito
+    más específico con suficientes muestras, y nunca supera el valor estático de Settings.
+    """
+    
+    def __init__(self):
+        self._muestras = {}  # nombre → {ámbito → deque de segundos}
+        self._cache = {}  # (nombre, ámbito) → valor aprendido
+        self._inicios = {}  # (nombre, puerto) → momento de inicio de una espera en curso
+        self.modelos = {}  # puerto → modelo (lo completa el sondeo de capacidades)
+        self._lock = threading.Lock()
+        self._cargado = False
+    
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+        try:
+            if os.path.exists(Settings.TIEMPOS_ADAPTATIVOS_FILE):
+                with open(Settings.TIEMPOS_ADAPTATIVOS_FILE, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                for nombre, ambitos in datos.get("muestras", {}).items():
+                    self._muestras[nombre] = {
+                        ambito: deque(valores, maxlen=Settings.ADAPTATIVO_MAX_MUESTRAS)
+                        for ambito, valores in ambitos.items()
+                    }
+                self.modelos.update(datos.get("modelos", {}))
+        except Exception as e:
+            escribir_log(f"⚠️ Error al cargar tiempos adaptativos: {e}")
+    
+    def guardar(self):
+        with self._lock:
+            if not self._muestras:
+                return
+            datos = {
+                "version": Settings.VERSION,
+                "actualizado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "modelos": dict(self.modelos),
+                "muestras": {
+                    nombre: {ambito: list(valores) for ambito, valores in ambitos.items()}
+                    for nombre, ambitos in self._muestras.items()
+                },
+            }
+        try:
+            with open(Settings.TIEMPOS_ADAPTATIVOS_FILE, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+        except Exception as e:
+            escribir_log(f"⚠️ Error al guardar tiempos adaptativos: {e}")
+    
+    def asignar_modelo(self, puerto: str, modelo: str):
+        with self._lock:
+            self.modelos[puerto] = modelo
+    
+    def _ambitos(self, puerto: str = None) -> list:
+        """Ámbitos de más a menos específico"""
+        ambitos = []
+        if puerto:
+            ambitos.append(f"puerto:{puerto}")
+            if self.modelos.get(puerto):
+                ambitos.append(f"modelo:{self.modelos[puerto]}")
+        ambitos.append("global")
+        return ambitos
+    
+    def observar(self, nombre: str, segundos: float, puerto: str = None):
+        """Registra cuánto tardó una espera"""
+        with self._lock:
+            self._cargar()
+            por_ambito = self._muestras.setdefault(nombre, {})
+            for ambito in self._ambitos(puerto):
+                por_ambito.setdefault(ambito, deque(maxlen=Settings.ADAPTATIVO_MAX_MUESTRAS)).append(round(segundos, 3))
+                self._cache.pop((nombre, ambito), None)
+    
+    def iniciar(self, nombre: str, puerto: str):
+        """Marca el comienzo de una espera cuyo fin se detecta después (URC, sondeo)"""
+        with self._lock:
+            self._inicios[(nombre, puerto)] = time.time()
+    
+    def completar(self, nombre: str, puerto: str, momento: float = None) -> float:
+        """Cierra una espera iniciada y la registra. Retorna la duración (o None si no había)"""
+        with self._lock:
+            inicio = self._inicios.pop((nombre, puerto), None)
+        if inicio is None:
+            return None
+        duracion = (momento or time.time()) - inicio
+        if duracion >= 0:
+            self.observar(nombre, duracion, puerto)
+        return duracion
+    
+    def descartar(self, nombre: str, puertos: list = None):
+        """Olvida esperas iniciadas que no terminaron (no son una muestra válida)"""
+        with self._lock:
+            for clave in [c for c in self._inicios if c[0] == nombre and (puertos is None or c[1] in puertos)]:
+                del self._inicios[clave]
+    
+    def _aprendido(self, nombre: str, ambito: str):
+        clave = (nombre, ambito)
+        if clave in self._cache:
+            return self._cache[clave]
+        valores = self._muestras.get(nombre, {}).get(ambito)
+        valor = None
+        if valores and len(valores) >= Settings.ADAPTATIVO_MIN_MUESTRAS:
+            ordenados = sorted(valores)
+            percentil = ordenados[min(len(ordenados) - 1, int(len(ordenados) * Settings.ADAPTATIVO_PERCENTIL / 100))]
+            valor = max(percentil * (1 + Settings.ADAPTATIVO_MARGEN), percentil + Settings.ADAPTATIVO_MARGEN_MINIMO)
+        self._cache[clave] = valor
+        return valor
+    
+    def valor(self, nombre: str, estatico: float, puertos: list = None) -> float:
+        """Espera a usar: la aprendida (máximo entre los puertos) con el valor estático como techo"""
+        if not Settings.TIEMPOS_ADAPTATIVOS:
+            return estatico
+        with self._lock:
+            self._cargar()
+            aprendidos = []
+            for puerto in (puertos or [None]):
+                for ambito in self._ambitos(puerto):
+                    valor = self._aprendido(nombre, ambito)
+                    if valor is not None:
+                        aprendidos.append(valor)
+                        break
+                else:
+                    return estatico  # Un puerto sin historia obliga a usar el valor estático
+        minimo = Settings.ADAPTATIVO_MINIMOS.get(nombre, 0)
+        return round(min(estatico, max(max(aprendidos), minimo)), 2)
+    
+    def resumen(self) -> dict:
+        """Valores aprendidos globales y por modelo (para logs y --latencias)"""
+        with self._lock:
+            self._cargar()
+            return {
+                nombre: {
+                    ambito: {"muestras": len(valores), "valor": self._aprendido(nombre, ambito)}
+                    for ambito, valores in ambitos.items() if not ambito.startswith("puerto:")
+                }
+                for nombre, ambitos in self._muestras.items()
+            }
+
+tiempos_adaptativos = TiemposAdaptativos()
+
+# El reinicio termina cuando el módem avisa que la SIM está lista (si alguien lo estaba midiendo)
+bus_urc.suscribir(
+    lambda evento: tiempos_adaptativos.completar(ESPERA_CFUN_RESET, evento.puerto, evento.momento),
+    tipo=URC_SIM_LISTA
+)
+
+def espera_adaptativa(nombre: str, estatico: float, puertos: list = None) -> float:
+    """Atajo para tiempos_adaptativos.valor() que además deja en el log cuando se acorta una espera"""
+    valor = tiempos_adaptativos.valor(nombre, estatico, puertos)
+    if valor < estatico and nombre != ESPERA_RESPUESTA_AT:
+        escribir_log(f"⏱️ Espera adaptativa {nombre}: {valor:.1f}s (estático {estatico}s)")
+    return valor
+
+# ==================== ACTOR POR PUERTO ====================
+# Prioridades de la cola de cada puerto (menor = antes)
+PRIORIDAD_RESET = 0  # AT / AT+CFUN=1,1 y verificaciones tras el cambio de slot
+PRIORIDAD_ACTIVACION = 1  # USSD, SMS, agenda de la SIM
+PRIORIDAD_TELEMETRIA = 2  # Muestreos de ICCID, CREG, CSQ
+
+# Consultas sin efecto secundario: si ya hay una igual en cola, se reutiliza su resultado
+COMANDOS_CONSULTA_AT = ("AT", "AT+CSQ", "AT+QCCID", "AT+CCID", "ATI", "AT+GMM", "AT+GMR")
+CME_SIM_OCUPADA = "+CME ERROR: 14"
+
+def es_consulta_at(comando: str) -> bool:
+    """True si el comando solo lee estado (AT+XXX? o una consulta conocida)"""
+    comando = comando.strip().upper()
+    return comando.endswith("?") or comando in COMANDOS_CONSULTA_AT
+
+class TrabajoAT:
+    """Comando AT encolado en el actor de un puerto; el resultado llega por 'futuro' (del loop del motor)"""
+    
+    def __init__(self, comando: str, espera: float, timeout: float, terminadores: tuple,
+                 solo_escritura: bool, prioridad: int, clave: tuple = None, cadena: list = None,
+                 concatenar: bool = False):
+        self.comando = comando
+        self.espera = espera
+        self.timeout = timeout
+        self.terminadores = terminadores
+        self.solo_escritura = solo_escritura
+        self.prioridad = prioridad
+        self.clave = clave  # Clave de coalescencia: (comando, espera, timeout, terminadores); None = no se comparte
+        self.cadena = cadena  # Lista de comandos (v2.17.0): el resultado es una lista de ResultadoAT
+        self.concatenar = concatenar
+        self.futuro = asyncio.get_running_loop().create_future()
+        self.iniciado = False
+
+class ActorPuerto:
+    """Corrutina dueña de un puerto COM que ejecuta sus comandos de a uno
+    
+    v2.16.0: Activación, verificación de registro y muestreo del pool podían hablar
+    con el mismo módem a la vez y recibir +CME ERROR: 14 (SIM busy), lo que obligaba
+    a dormir DELAY_ACCESO_SIM antes de cada acceso. Ahora todo pasa por una cola con
+    prioridad (reset > activación > telemetría); una consulta idéntica que ya está en
+    cola se comparte en vez de repetirse, y si aun así la SIM responde ocupada el
+    actor reintenta sin que el llamador pierda el intento.
+    
+    Cada actor es una tarea del loop de motor_serial (no un hilo por puerto) y hace la E/S
+    con el transporte del motor. Su estado solo se toca desde ese loop, así que no lleva
+    locks: los hilos sincrónicos le llegan por motor_serial.ejecutar().
+    """
+    
+    def __init__(self, puerto: str):
+        self.puerto = puerto
+        self._cola = asyncio.PriorityQueue()
+        self._secuencia = itertools.count()
+        self._pendientes = {}  # clave → TrabajoAT aún no iniciado
+        self.detenido = False
+        self.ejecutados = 0
+        self.coalescidos = 0
+        self.reintentos_sim_ocupada = 0
+        self._tarea = asyncio.get_running_loop().create_task(self._ciclo(), name=f"Actor-{puerto}")
+    
+    def enviar(self, comando: str, espera: float = 1, timeout: float = None, terminadores: tuple = (),
+               prioridad: int = PRIORIDAD_ACTIVACION, solo_escritura: bool = False) -> asyncio.Future:
+        """Encola un comando y retorna el Future con su respuesta"""
+        if self.detenido:
+            raise RuntimeError(f"Actor de {self.puerto} detenido")
+        # Solo se comparte entre consultas que esperan lo mismo (deadline y terminadores incluidos)
+        clave = None if solo_escritura or not es_consulta_at(comando) else (
+            comando.strip().upper(), espera, timeout, tuple(terminadores))
+        
+        trabajo = self._pendientes.get(clave) if clave else None
+        if trabajo is not None:
+            self.coalescidos += 1
+            if prioridad < trabajo.prioridad:
+                # Se vuelve a encolar con la prioridad nueva; la entrada vieja se descarta al salir
+                trabajo.prioridad = prioridad
+                self._cola.put_nowait((prioridad, next(self._secuencia), trabajo))
+            return trabajo.futuro
+        
+        trabajo = TrabajoAT(comando, espera, timeout, terminadores, solo_escritura, prioridad, clave)
+        if clave:
+            self._pendientes[clave] = trabajo
+        self._cola.put_nowait((prioridad, next(self._secuencia), trabajo))
+        return trabajo.futuro
+    
+    def enviar_cadena(self, comandos: list, prioridad: int = PRIORIDAD_ACTIVACION,
+                      concatenar: bool = False) -> asyncio.Future:
+        """Encola una cadena de comandos como un solo trabajo (nadie se intercala entre ellos)"""
+        if self.detenido:
+            raise RuntimeError(f"Actor de {self.puerto} detenido")
+        trabajo = TrabajoAT(" ; ".join(comandos), 0.5, None, (), False, prioridad,
+                            cadena=list(comandos), concatenar=concatenar)
+        self._cola.put_nowait((prioridad, next(self._secuencia), trabajo))
+        return trabajo.futuro
+    
+    def detener(self):
+        """Termina la corrutina; los comandos que seguían en cola se cancelan"""
+        if self.detenido:
+            return
+        self.detenido = True
+        self._cola.put_nowait((PRIORIDAD_RESET - 1, next(self._secuencia), None))
+    
+    def _tomar(self, trabajo: TrabajoAT) -> bool:
+        if trabajo.iniciado:
+            return False
+        trabajo.iniciado = True
+        if trabajo.clave and self._pendientes.get(trabajo.clave) is trabajo:
+            del self._pendientes[trabajo.clave]
+        return not trabajo.futuro.done()
+    
+    async def _ciclo(self):
+        while True:
+            _, _, trabajo = await self._cola.get()
+            if trabajo is None:
+                break
+            if not self._tomar(trabajo):
+                continue
+            try:
+                resultado = await self._ejecutar(trabajo)
+            except Exception as e:
+                trabajo.futuro.set_exception(e)
             else:
-                log_activacion(f"📶 [{puerto}] Señal débil ({rssi}/31) - ❌ INSUFICIENTE (< {Settings.CSQ_MINIMO})")
+                trabajo.futuro.set_result(resultado)
+        
+        while not self._cola.empty():
+            _, _, trabajo = self._cola.get_nowait()
+            if trabajo is not None:
+                trabajo.futuro.cancel()
+    
+    async def _ejecutar(self, trabajo: TrabajoAT):
+        self.ejecutados += 1
+        if trabajo.solo_escritura:
+            return await motor_serial.transaccion(self.puerto, lambda ser: motor_serial.solo_escribir(ser, trabajo.comando))
+        if trabajo.cadena:
+            return await motor_serial.transaccion(
+                self.puerto,
+                lambda ser: _ejecutar_cadena_async(ser, trabajo.cadena, trabajo.concatenar, self._escribir_y_leer)
+            )
+        return await motor_serial.transaccion(
+            self.puerto,
+            lambda ser: self._escribir_y_leer(ser, trabajo.comando, trabajo.espera, trabajo.timeout, trabajo.terminadores)
+        )
+    
+    async def _escribir_y_leer(self, ser, comando: str, espera: float, timeout: float = None,
+                               terminadores: tuple = ()) -> str:
+        """escribir_y_leer del motor con reintento transparente ante +CME ERROR: 14 (SIM busy)"""
+        for intento in range(Settings.ACTOR_REINTENTOS_SIM_OCUPADA + 1):
+            respuesta = await motor_serial.escribir_y_leer(ser, comando, espera, timeout, terminadores)
+            if CME_SIM_OCUPADA not in respuesta or intento >= Settings.ACTOR_REINTENTOS_SIM_OCUPADA:
+                break
+            self.reintentos_sim_ocupada += 1
+            await asyncio.sleep(Settings.ACTOR_ESPERA_SIM_OCUPADA)
+        return respuesta
+
+class GestorActores:
+    """Crea bajo demanda un ActorPuerto por puerto COM, todos en el loop de motor_serial"""
+    
+    def __init__(self):
+        self._actores = {}  # Solo se modifica desde el loop del motor
+    
+    def actor(self, puerto: str) -> ActorPuerto:
+        actor = self._actores.get(puerto)
+        if actor is None or actor.detenido:
+            actor = ActorPuerto(puerto)
+            self._actores[puerto] = actor
+        return actor
+    
+    async def comando(self, puerto: str, comando: str, espera: float = 1, timeout: float = None,
+                      terminadores: tuple = (), prioridad: int = PRIORIDAD_ACTIVACION,
+                      solo_escritura: bool = False) -> str:
+        """Encola en el actor del puerto y espera la respuesta (desde una corrutina del motor)"""
+        # shield: si el llamador se cancela, la consulta sigue para los que la comparten
+        return await asyncio.shield(
+            self.actor(puerto).enviar(comando, espera, timeout, terminadores, prioridad, solo_escritura))
+    
+    async def cadena(self, puerto: str, comandos: list, prioridad: int = PRIORIDAD_ACTIVACION,
+                     concatenar: bool = False) -> list:
+        return await asyncio.shield(self.actor(puerto).enviar_cadena(comandos, prioridad, concatenar))
+    
+    def ejecutar(self, puerto: str, comando: str, espera: float = 1, timeout: float = None,
+                 terminadores: tuple = (), prioridad: int = PRIORIDAD_ACTIVACION,
+                 solo_escritura: bool = False) -> str:
+        """Desde un hilo: encola y espera (los errores de puerto se propagan como en transaccion_serial)"""
+        return motor_serial.ejecutar(self.comando(puerto, comando, espera, timeout, terminadores, prioridad, solo_escritura))
+    
+    def ejecutar_cadena(self, puerto: str, comandos: list, prioridad: int = PRIORIDAD_ACTIVACION,
+                        concatenar: bool = False) -> list:
+        return motor_serial.ejecutar(self.cadena(puerto, comandos, prioridad, concatenar))
+    
+    async def _detener_todos(self) -> int:
+        actores = list(self._actores.values())
+        self._actores = {}
+        for actor in actores:
+            actor.detener()
+        return len(actores)
+    
+    def detener_todos(self) -> int:
+        """Detiene todos los actores (antes de liberar los puertos). Retorna cuántos había"""
+        if not self._actores:
+            return 0
+        return motor_serial.ejecutar(self._detener_todos())
+    
+    def estadisticas(self) -> dict:
+        return {
+            puerto: {"ejecutados": actor.ejecutados, "coalescidos": actor.coalescidos,
+                     "reintentos_sim_ocupada": actor.reintentos_sim_ocupada}
+            for puerto, actor in list(self._actores.items())
+        }
+
+actores_puerto = GestorActores()
+
+def ejecutar_at(puerto: str, comando: str, espera: float = 1, timeout: float = None, terminadores: tuple = (),
+                prioridad: int = PRIORIDAD_ACTIVACION, solo_escritura: bool = False) -> str:
+    """Ejecuta un comando AT en el puerto (vía su actor si ACTOR_POR_PUERTO está activo)
+    
+    Lanza serial.SerialException/OSError si el puerto no se pudo usar, y
+    PuertoFueraDeServicio si su disyuntor está abierto.
+    """
+    disyuntores.permitir(puerto)
+    if Settings.ACTOR_POR_PUERTO:
+        return actores_puerto.ejecutar(puerto, comando, espera, timeout, terminadores, prioridad, solo_escritura)
+    if solo_escritura:
+        transaccion_serial(puerto, lambda ser: ser.write((comando + "\r").encode()))
+        return ""
+    return transaccion_serial(puerto, lambda ser: _escribir_y_leer(ser, comando, espera, timeout, terminadores))
+
+def ejecutar_cadena_at(puerto: str, comandos: list, prioridad: int = PRIORIDAD_ACTIVACION,
+                       concatenar: bool = None) -> list:
+    """Ejecuta varios comandos AT seguidos en el puerto (ver _pasos_cadena)
+    
+    Returns:
+        list: Un ResultadoAT por comando, en el mismo orden
+    """
+    if concatenar is None:
+        concatenar = Settings.CADENA_AT_CONCATENAR
+    disyuntores.permitir(puerto)
+    if Settings.ACTOR_POR_PUERTO:
+        return actores_puerto.ejecutar_cadena(puerto, comandos, prioridad, concatenar)
+    return transaccion_serial(puerto, lambda ser: _ejecutar_cadena(ser, comandos, concatenar))
+
+# ==================== CAPACIDADES DE MÓDEM ====================
+COMANDOS_ICCID = ("AT+QCCID", "AT+CCID")  # Dialectos conocidos, en orden de preferencia
+
+class CapacidadesModem:
+    """Modelo y comandos soportados por cada módem, sondeados una vez y guardados en disco
+    
+    v2.20.0: En un rack mixto M35/UC20 probar el dialecto equivocado de ICCID costaba un
+    round trip más un timeout cada vez. El sondeo (AT+GMM/AT+GMR o ATI, y QCCID/CCID) se
+    hace la primera vez que se usa el puerto y queda en CAPACIDADES_MODEM_FILE con clave
+    puerto + número de serie USB, así un módem reemplazado en el mismo COM se vuelve a sondear.
+    """
+    
+    def __init__(self):
+        self._entradas = {}  # "COMx|serie" → dict de capacidades
+        self._fallidos = set()  # Puertos que no respondieron al sondeo en esta ejecución
+        self._locks_sondeo = defaultdict(threading.Lock)  # Un solo sondeo a la vez por puerto
+        self._lock = threading.Lock()
+        self._cargado = False
+    
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+        try:
+            if os.path.exists(Settings.CAPACIDADES_MODEM_FILE):
+                with open(Settings.CAPACIDADES_MODEM_FILE, "r", encoding="utf-8") as f:
+                    self._entradas = json.load(f)
+        except Exception as e:
+            escribir_log(f"⚠️ Error al cargar capacidades de módems: {e}")
+    
+    def _guardar(self):
+        try:
+            with open(Settings.CAPACIDADES_MODEM_FILE, "w", encoding="utf-8") as f:
+                json.dump(self._entradas, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            escribir_log(f"⚠️ Error al guardar capacidades de módems: {e}")
+    
+    def _serie_usb(self, puerto: str) -> str:
+        info = inventario_puertos.info(puerto)
+        return (info.serial_number or "") if info else ""
+    
+    def _clave(self, puerto: str) -> str:
+        return f"{puerto}|{self._serie_usb(puerto)}"
+    
+    def cacheadas(self, puerto: str) -> dict:
+        """Capacidades ya conocidas del puerto (None si nunca se sondeó), sin tocar el módem"""
+        with self._lock:
+            self._cargar()
+            return self._entradas.get(self._clave(puerto))
+    
+    def obtener(self, puerto: str) -> dict:
+        """Capacidades del puerto, sondeándolo si es la primera vez"""
+        capacidades = self.cacheadas(puerto)
+        if capacidades or not self._debe_sondear(puerto):
+            return capacidades
+        with self._lock:
+            lock_sondeo = self._locks_sondeo[puerto]
+        with lock_sondeo:
+            # Otro hilo pudo haber sondeado el puerto mientras se esperaba el lock
+            capacidades = self.cacheadas(puerto)
+            if capacidades or not self._debe_sondear(puerto):
+                return capacidades
+            return self._sondear(puerto)
+    
+    def _sondear(self, puerto: str) -> dict:
+        respuestas = {}
+        
+        def consultar(comando):
+            if comando not in respuestas:
+                try:
+                    respuestas[comando] = ejecutar_at(puerto, comando, 0.5, timeout=2, prioridad=PRIORIDAD_TELEMETRIA)
+                except (serial.SerialException, OSError):
+                    respuestas[comando] = ""
+            return respuestas[comando]
+        
+        return self._registrar(puerto, interpretar_sondeo_modem(consultar))
+    
+    async def obtener_async(self, puerto: str) -> dict:
+        """Versión para el motor asyncio"""
+        capacidades = self.cacheadas(puerto)
+        if capacidades or not self._debe_sondear(puerto):
+            return capacidades
+        # El sondeo es una vez por módem: se delega a un hilo para no bloquear el loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.obtener, puerto)
+    
+    def _debe_sondear(self, puerto: str) -> bool:
+        return Settings.SONDEAR_CAPACIDADES and not Settings.MODO_DRY_RUN and puerto not in self._fallidos
+    
+    def _registrar(self, puerto: str, capacidades: dict) -> dict:
+        if not capacidades:
+            self._fallidos.add(puerto)
+            escribir_log(f"⚠️ [{puerto}] Sin respuesta al sondeo de modelo, se usará {COMANDOS_ICCID[0]}")
+            return None
+        capacidades["puerto"] = puerto
+        capacidades["serie_usb"] = self._serie_usb(puerto)
+        capacidades["sondeado"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._entradas[self._clave(puerto)] = capacidades
+            self._guardar()
+        tiempos_adaptativos.asignar_modelo(puerto, capacidades["modelo"])
+        escribir_log(f"🔎 [{puerto}] Módem {capacidades['modelo']} ({capacidades['revision'] or 's/rev'}) → ICCID con {capacidades['comando_iccid']}")
+        return capacidades
+    
+    def comando_iccid(self, puerto: str) -> str:
+        capacidades = self.obtener(puerto)
+        return capacidades["comando_iccid"] if capacidades else COMANDOS_ICCID[0]
+    
+    async def comando_iccid_async(self, puerto: str) -> str:
+        capacidades = await self.obtener_async(puerto)
+        return capacidades["comando_iccid"] if capacidades else COMANDOS_ICCID[0]
+
+capacidades_modem = CapacidadesModem()
+
+def interpretar_sondeo_modem(consultar) -> dict:
+    """Arma las capacidades de un módem a partir de consultar(comando) → respuesta
+    
+    Modelo y revisión salen de AT+GMM/AT+GMR (o de ATI si el módem no los soporta). Un
+    dialecto de ICCID está soportado si no responde un ERROR genérico: '+CME ERROR: 10'
+    (SIM no insertada) significa que el comando existe aunque ahora no haya SIM.
+    """
+    modelo = revision = fabricante = None
+    gmm = consultar("AT+GMM")
+    if gmm and "OK" in gmm and lineas_informacion_at(gmm):
+        modelo = lineas_informacion_at(gmm)[0]
+        gmr = consultar("AT+GMR")
+        if gmr and "OK" in gmr and lineas_informacion_at(gmr):
+            revision = lineas_informacion_at(gmr)[0]
+    else:
+        ati = consultar("ATI")
+        lineas = lineas_informacion_at(ati) if ati and "OK" in ati else []
+        if not lineas:
+            return None
+        fabricante = lineas[0] if len(lineas) > 1 else None
+        modelo = lineas[1] if len(lineas) > 1 else lineas[0]
+        revision = next((linea for linea in lineas if linea.upper().startswith("REVISION")), None)
+    if revision and ":" in revision:
+        revision = revision.split(":", 1)[1].strip()
+    
+    comandos = {}
+    comando_iccid = None
+    for comando in COMANDOS_ICCID:
+        respuesta = consultar(comando) or ""
+        comandos[comando] = bool(respuesta) and (extraer_iccid(respuesta) is not None or "+CME ERROR" in respuesta)
+        if comandos[comando] and comando_iccid is None:
+            comando_iccid = comando
+            if extraer_iccid(respuesta):
+                break  # Ya hay un dialecto que entrega el ICCID: no hace falta probar el resto
+    
+    return {
+        "fabricante": fabricante,
+        "modelo": modelo.strip(),
+        "revision": revision,
+        "comando_iccid": comando_iccid or COMANDOS_ICCID[0],
+        "comandos": comandos,
+    }
+
+# ==================== PROPIEDAD DE PUERTOS ====================
+PROCESO_SIMCLIENT = "HeroSMS-Partners.exe"
+
+class PropiedadPuertos:
+    """Registro de los puertos COM que este proceso tiene abiertos
+    
+    v2.23.0: Reemplaza el barrido de cerrar_puertos_serial (un hilo por COM del equipo,
+    abriendo incluso puertos ajenos solo para cerrarlos, y 2 s de sleep). Los únicos handles
+    que el rotador puede liberar son los suyos, y esos los conoce el pool de sesiones: se
+    cierran todos juntos y al volver de close() el sistema operativo ya los soltó, así que
+    HeroSMS-Partners puede abrirlos de inmediato. Si al revés no se puede abrir un puerto,
+    se informa qué proceso lo tiene.
+    """
+    
+    def __init__(self):
+        self._ultimo_reporte = {}  # puerto → momento del último aviso de puerto ocupado
+        self._lock = threading.Lock()
+    
+    def propios(self) -> list:
+        """Puertos con handle abierto por este proceso"""
+        return [sesion.puerto for sesion in pool_sesiones.sesiones_abiertas()]
+    
+    def liberar_todos(self) -> int:
+        """Detiene los actores y cierra todos los handles propios. Retorna cuántos se cerraron"""
+        inicio = time.perf_counter()
+        actores_puerto.detener_todos()
+        liberados = pool_sesiones.liberar_todas()
+        if liberados:
+            escribir_log(f"🔓 Puertos del rotador liberados: {liberados} en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return liberados
+    
+    def ocupante(self, puerto: str) -> str:
+        """Describe el proceso que tiene abierto el puerto (None si no se pudo determinar)"""
+        if puerto in self.propios():
+            return f"este proceso (PID {os.getpid()})"
+        
+        # Donde el sistema expone los handles de dispositivo (Linux), buscar el proceso exacto
+        ruta = os.path.realpath(puerto) if os.path.exists(puerto) else None
+        candidatos = []
+        for proceso in psutil.process_iter(["pid", "name"]):
+            try:
+                if ruta and proceso.info["pid"] != os.getpid() and ruta in rutas_abiertas(proceso):
+                    return f"{proceso.info['name']} (PID {proceso.info['pid']})"
+                if proceso.info["name"] == PROCESO_SIMCLIENT:
+                    candidatos.append(proceso.info["pid"])
+            except (psutil.NoSuchProcess, psutil.AccessDenied, OSError):
+                continue
+        
+        # En Windows los handles de COM no son visibles: el sospechoso habitual es HeroSMS
+        if candidatos:
+            return f"probablemente {PROCESO_SIMCLIENT} (PID {', '.join(map(str, candidatos))})"
+        return None
+    
+    def reportar_fallo_apertura(self, puerto: str, error: Exception):
+        """Registra quién tiene el puerto cuando no se pudo abrir (a lo sumo una vez por minuto por puerto)"""
+        ahora = time.time()
+        with self._lock:
+            if ahora - self._ultimo_reporte.get(puerto, 0) < 60:
+                return
+            self._ultimo_reporte[puerto] = ahora
+        ocupante = self.ocupante(puerto)
+        if ocupante:
+            escribir_log(f"🔒 [{puerto}] No se pudo abrir ({error}): lo tiene {ocupante}")
+        else:
+            escribir_log(f"🔒 [{puerto}] No se pudo abrir: {error}")
+
+propiedad_puertos = PropiedadPuertos()
+
+def rutas_abiertas(proceso) -> set:
+    """Rutas reales de los archivos y dispositivos que tiene abiertos un proceso
+    
+    psutil.open_files() omite las terminales/dispositivos de caracteres; en Linux se leen
+    directamente los descriptores de /proc/<pid>/fd.
+    """
+    directorio_fd = f"/proc/{proceso.pid}/fd"
+    if os.path.isdir(directorio_fd):
+        rutas = set()
+        for fd in os.listdir(directorio_fd):
+            try:
+                rutas.add(os.path.realpath(os.readlink(os.path.join(directorio_fd, fd))))
+            except OSError:
+                continue
+        return rutas
+    return {os.path.realpath(archivo.path) for archivo in proceso.open_files()}
+
+def procesos_simclient() -> list:
+    """Procesos de HeroSMS-Partners en ejecución (psutil.Process)"""
+    procesos = []
+    for proceso in psutil.process_iter(["name"]):
+        try:
+            if proceso.info["name"] == PROCESO_SIMCLIENT:
+                procesos.append(proceso)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return procesos
+
+# ==================== FUNCIONES DE PUERTO SERIAL ====================
+def cerrar_puertos_serial(liberar_sesiones: bool = True):
+    """Libera los puertos serial que tiene abiertos el rotador
+    
+    v2.23.0: Solo cierra los handles propios (ver PropiedadPuertos); sin hilos por
+    puerto ni sleep.
+    
+    Args:
+        liberar_sesiones: Si True, cierra las sesiones persistentes del pool
+                          (obligatorio antes de abrir HeroSMS-Partners). Si False
+                          no hay nada que cerrar: los puertos ajenos no son nuestros
+    """
+    if not liberar_sesiones:
+        return 0
+    console.print("[yellow]🔒 Liberando puertos serial del rotador...[/yellow]")
+    liberados = propiedad_puertos.liberar_todos()
+    console.print(f"[green]✅ Puertos liberados ({liberados})[/green]")
+    return liberados
+
+def enviar_comando(puerto: str, comando: str, espera: float = 1, timeout: float = None,
+                   terminadores: tuple = (), prioridad: int = PRIORIDAD_ACTIVACION) -> str:
+    """Envía un comando AT al puerto especificado y devuelve la respuesta cruda.
+    
+    OPTIMIZADO PARA HEROSMS JAVA: Line terminator \r (no \r\n)
+    Según análisis de sim/simbank/f.java línea 32: writeString("\r")
+    v2.12.0: Usa la sesión persistente del pool (no abre/cierra el puerto)
+    v2.13.0: Retorna apenas llega OK/ERROR/+CME ERROR/+CMS ERROR (o un terminador
+             propio del comando); 'timeout' fija un deadline explícito
+    v2.16.0: Pasa por el actor del puerto con la prioridad indicada
+    """
+    if Settings.MODO_DRY_RUN:
+        escribir_log(f"[DRY RUN] {puerto} ← {comando}")
+        return "OK"
+    
+    try:
+        respuesta = ejecutar_at(puerto, comando, espera, timeout, terminadores, prioridad)
+        log_respuesta_comando(puerto, comando, respuesta)
+        return respuesta
+    except Exception as e:
+        escribir_log(f"❌ [{puerto}] Error en {comando}: {e}")
+        return ""
+
+def log_respuesta_comando(puerto: str, comando: str, respuesta: str):
+    """Log informativo del resultado de un comando AT (común a todos los transportes)"""
+    if respuesta:
+        if "OK" in respuesta:
+            escribir_log(f"✅ [{puerto}] {comando} → OK")
+        elif "ERROR" in respuesta:
+            escribir_log(f"⚠️ [{puerto}] {comando} → ERROR: {respuesta[:80]}")
+        else:
+            escribir_log(f"📝 [{puerto}] {comando} → {respuesta[:80]}")
+    else:
+        escribir_log(f"⚠️ [{puerto}] {comando} → Sin respuesta")
+
+def enviar_cadena(puerto: str, comandos: list, prioridad: int = PRIORIDAD_ACTIVACION,
+                  concatenar: bool = None) -> list:
+    """Envía una cadena de comandos AT en una sola ida y vuelta (o encadenados sin pausas)
+    
+    v2.17.0: Reemplaza secuencias de enviar_comando (CPBS + CPBR, CMGF + CPMS + CMGL...).
+    Se corta en el primer error: los comandos siguientes vuelven con ok=None.
+    
+    Returns:
+        list: Un ResultadoAT(comando, ok, respuesta, lineas) por comando
+    """
+    if Settings.MODO_DRY_RUN:
+        escribir_log(f"[DRY RUN] {puerto} ← {' ; '.join(comandos)}")
+        return [ResultadoAT(comando, True, "OK", []) for comando in comandos]
+    
+    try:
+        resultados = ejecutar_cadena_at(puerto, comandos, prioridad, concatenar)
+    except Exception as e:
+        escribir_log(f"❌ [{puerto}] Error en {' ; '.join(comandos)}: {e}")
+        return [ResultadoAT(comando, False if i == 0 else None, "", []) for i, comando in enumerate(comandos)]
+    
+    for resultado in resultados:
+        if resultado.ok is not None:
+            log_respuesta_comando(puerto, resultado.comando, resultado.respuesta)
+    return resultados
+
+def enviar_comando_resiliente(puerto: str, comando: str, intentos: int = None) -> str:
+    """Envía comando AT con reintentos automáticos (backoff exponencial)"""
+    if intentos is None:
+        intentos = Settings.MAX_INTENTOS_COMANDO_AT
+    
+    for i in range(intentos):
+        respuesta = enviar_comando(puerto, comando)
+        if respuesta and ("OK" in respuesta or respuesta):  # Considera válida cualquier respuesta
+            return respuesta
+        if i < intentos - 1:  # No esperar en el último intento
+            espera = 1.5 * (i + 1)  # Backoff exponencial
+            escribir_log(f"🔄 [{puerto}] Reintento {i+2}/{intentos} en {espera:.1f}s...")
+            time.sleep(espera)
+    
+    escribir_log(f"❌ [{puerto}] Comando falló tras {intentos} intentos: {comando}")
+    return respuesta if 'respuesta' in locals() else ""
+
+def obtener_iccid_modem_rapido(puerto, timeout=1.5, prioridad=PRIORIDAD_TELEMETRIA):
+    """Obtiene el ICCID del módem de forma rápida (sin log) para verificación
+    
+    OPTIMIZADO PARA HEROSMS JAVA: AT+QCCID con line terminator \r
+    """
+    try:
+        respuesta = ejecutar_at(puerto, capacidades_modem.comando_iccid(puerto), 0.8, timeout=timeout, prioridad=prioridad)
+        
+        return extraer_iccid(respuesta)
+    except Exception:
+        return None
+
+def extraer_iccid(respuesta: str) -> str:
+    """ICCID de la respuesta de AT+QCCID / AT+CCID (ver parsear_iccid)"""
+    iccid = parsear_iccid(respuesta)
+    return iccid.valor if iccid else None
+
+def extraer_estado_creg(respuesta: str) -> str:
+    """Extrae el estado de registro de '+CREG: n,stat' (None si no viene en la respuesta)"""
+    creg = parsear_creg(respuesta)
+    return str(creg.stat) if creg else None
+
+# ==================== MOTOR SERIAL ASYNCIO ====================
+class LectorCompartido:
+    """Un solo hilo de E/S (Motor-E/S) que vigila los puertos que el loop no puede registrar
+    
+    Barre in_waiting de los puertos en espera cada MOTOR_ASYNC_INTERVALO_POLL y entrega
+    los bytes al loop con call_soon_threadsafe. Duerme mientras no hay nadie esperando.
+    """
+    
+    def __init__(self):
+        self._vigilados = {}  # id → (ser, loop, llegaron, fallo)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._hilo = None
+    
+    def vigilar(self, ser, loop, llegaron, fallo):
+        clave = next(self._ids)
+        with self._lock:
+            self._vigilados[clave] = (ser, loop, llegaron, fallo)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="Motor-E/S", daemon=True)
+                self._hilo.start()
+        self._hay_trabajo.set()
+        
+        def dejar():
+            # Con el lock: al volver, el hilo ya no está leyendo este puerto
+            with self._lock:
+                self._vigilados.pop(clave, None)
+        return dejar
+    
+    def _ciclo(self):
+        while True:
+            self._hay_trabajo.wait()
+            with self._lock:
+                for clave, (ser, loop, llegaron, fallo) in list(self._vigilados.items()):
+                    try:
+                        pendiente = ser.in_waiting
+                        if pendiente:
+                            loop.call_soon_threadsafe(llegaron, ser.read(pendiente))
+                    except (serial.SerialException, OSError) as e:
+                        del self._vigilados[clave]
+                        loop.call_soon_threadsafe(fallo, e)
+                if not self._vigilados:
+                    self._hay_trabajo.clear()
+            time.sleep(Settings.MOTOR_ASYNC_INTERVALO_POLL)
+
+lector_compartido = LectorCompartido()
+
+class MotorSerialAsync:
+    """Transporte AT no bloqueante: un solo event loop maneja toda la flota de módems
+    
+    v2.14.0: Las fases revisar/CPIN/ICCID/CREG creaban un threading.Thread por módem
+    en cada slot. Con 64-128 módems eso son cientos de hilos del SO compitiendo por el
+    GIL. Aquí cada módem es una corrutina; la E/S se hace leyendo solo lo que ya está
+    en el buffer del driver (in_waiting) y cediendo el loop mientras no hay datos. El
+    loop se entera de que llegaron bytes por add_reader (o por el hilo Motor-E/S), no
+    sondeando cada puerto.
+    
+    Comparte las sesiones de pool_sesiones, así que un puerto nunca queda abierto
+    dos veces aunque el flujo sincrónico (activación) lo use al mismo tiempo.
+    v2.31.0: Cada FlujoModem de la rotación es una corrutina de este motor.
+    
+    El loop vive en un solo hilo (Motor-Serial) todo el proceso: los pipelines de cada
+    pool, los actores de cada puerto y los flujos de módem corren en él. Los hilos
+    sincrónicos entran con ejecutar(), que usa run_coroutine_threadsafe.
+    """
+    
+    def __init__(self, pool: PoolSesionesSerial):
+        self.pool = pool
+        self._locks = {}  # puerto → asyncio.Lock (serializa corrutinas del mismo puerto)
+        self._loop = None
+        self._hilo = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop del motor; se arranca en su hilo la primera vez que se usa"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                listo = threading.Event()
+                
+                def correr():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(listo.set)
+                    loop.run_forever()
+                
+                self._hilo = threading.Thread(target=correr, name="Motor-Serial", daemon=True)
+                self._hilo.start()
+                listo.wait()
+                self._loop = loop
+            return self._loop
+    
+    def ejecutar(self, corrutina):
+        """Corre la corrutina en el loop del motor y espera su resultado desde un hilo sincrónico"""
+        loop = self.loop
+        if threading.current_thread() is self._hilo:
+            corrutina.close()
+            raise RuntimeError("Llamada sincrónica desde el loop del motor: usar la versión async")
+        return asyncio.run_coroutine_threadsafe(corrutina, loop).result()
+    
+    @asynccontextmanager
+    async def sesion(self, puerto: str):
+        """Acceso exclusivo al serial del puerto sin bloquear el event loop"""
+        lock_async = self._locks.setdefault(puerto, asyncio.Lock())
+        async with lock_async:
+            sesion = self.pool._obtener_sesion(puerto)
+            # El lock del pool puede estar tomado por un hilo sincrónico: esperar cediendo el loop
+            while not sesion.lock.acquire(blocking=False):
+                await asyncio.sleep(Settings.MOTOR_ASYNC_INTERVALO_POLL)
+            try:
+                if not sesion.esta_sana():
+                    sesion.abrir()
+                try:
+                    yield sesion.ser
+                except (serial.SerialException, OSError):
+                    sesion.errores += 1
+                    sesion.cerrar()
+                    raise
+                finally:
+                    sesion.ultimo_uso = time.time()
+                    if not Settings.USAR_POOL_SESIONES:
+                        sesion.cerrar()
+            finally:
+                sesion.lock.release()
+    
+    async def transaccion(self, puerto: str, operacion):
+        """Versión asíncrona de transaccion_serial: await operacion(ser) con el puerto tomado"""
+        for intento in range(Settings.POOL_REINTENTOS_REAPERTURA + 1):
+            try:
+                async with self.sesion(puerto) as ser:
+                    return await operacion(ser)
+            except (serial.SerialException, OSError):
+                if intento >= Settings.POOL_REINTENTOS_REAPERTURA:
+                    disyuntores.registrar(puerto, RESULTADO_EXCEPCION)
+                    raise
+    
+    def _vigilar(self, ser, llegaron, fallo):
+        """Avisa al loop cuando el puerto tiene bytes; retorna la función que deja de vigilarlo
+        
+        En POSIX el descriptor se registra con add_reader y el loop despierta solo cuando
+        llegan datos. Donde no se puede (ProactorEventLoop de Windows, seriales sin
+        fileno) lo vigila el hilo único de lector_compartido.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            fd = ser.fileno()
             
-            return señal_ok, rssi
-        return False, 0
-    except Exception as e:
-        log_activacion(f"⚠️ [{puerto}] Error verificando señal: {e}")
+            def leer():
+                try:
+                    pendiente = ser.in_waiting
+                    if not pendiente:
+                        # Listo para leer pero sin datos: el dispositivo desapareció
+                        raise serial.SerialException(f"{ser.port} no entregó datos (¿desconectado?)")
+                    llegaron(ser.read(pendiente))
+                except (serial.SerialException, OSError) as e:
+                    loop.remove_reader(fd)
+                    fallo(e)
+            
+            loop.add_reader(fd, leer)
+            return lambda: loop.remove_reader(fd)
+        except (AttributeError, NotImplementedError, ValueError):
+            return lector_compartido.vigilar(ser, loop, llegaron, fallo)
+    
+    async def _leer_respuesta(self, ser, timeout: float, terminadores: tuple = ()) -> str:
+        """Versión no bloqueante de leer_respuesta_at (el loop despierta solo cuando llegan bytes)"""
+        completa = asyncio.get_running_loop().create_future()
+        recibido = bytearray()
+        
+        def llegaron(datos: bytes):
+            if completa.done():
+                return
+            recibido.extend(datos)
+            if respuesta_at_completa(recibido.decode(errors="ignore"), terminadores):
+                completa.set_result(None)
+        
+        def fallo(error: Exception):
+            if not completa.done():
+                completa.set_exception(error)
+        
+        pendiente = ser.in_waiting
+        if pendiente:
+            llegaron(ser.read(pendiente))
+        if not completa.done():
+            dejar = self._vigilar(ser, llegaron, fallo)
+            try:
+                await asyncio.wait({completa}, timeout=timeout)
+            finally:
+                dejar()
+                if not completa.done():
+                    completa.cancel()
+        if not completa.cancelled():
+            completa.result()  # Relanza el error del puerto si lo hubo
+        
+        return bytes(recibido).decode(errors="ignore").strip()
+    
+    async def escribir_y_leer(self, ser, comando: str, espera: float, timeout: float = None,
+                              terminadores: tuple = ()) -> str:
+        """Versión no bloqueante de _escribir_y_leer (mismas latencias, traza, estado y URC)"""
+        drenar_urc(ser)
+        ser.reset_output_buffer()
+        inicio = time.perf_counter()
+        try:
+            ser.write((comando + "\r").encode())
+            if not Settings.LECTOR_RESULTADO_FINAL:
+                await asyncio.sleep(espera)
+                respuesta = ser.read_all().decode(errors="ignore").strip()
+            else:
+                if timeout is None:
+                    timeout = timeout_para_comando(comando, espera, ser.port)
+                respuesta = await self._leer_respuesta(ser, timeout, terminadores)
+        except (serial.SerialException, OSError):
+            anotar_excepcion_at(ser.port, comando, inicio)
+            raise
+        return anotar_respuesta_at(ser.port, comando, respuesta, inicio)
+    
+    async def solo_escribir(self, ser, comando: str) -> str:
+        inicio = time.perf_counter()
+        ser.write((comando + "\r").encode())
+        traza_rotacion.comando(ser.port, comando, inicio, time.perf_counter() - inicio, "escrito")
+        return ""
+    
+    async def comando(self, puerto: str, comando: str, espera: float = 1, timeout: float = None,
+                      terminadores: tuple = (), log: bool = True, prioridad: int = PRIORIDAD_ACTIVACION) -> str:
+        """Equivalente asíncrono de enviar_comando (mismo deadline y mismo log)
+        
+        v2.16.0: Con ACTOR_POR_PUERTO el comando se encola en el actor del puerto (otra
+        corrutina de este loop) y se espera su respuesta sin bloquear el loop.
+        """
+        if Settings.MODO_DRY_RUN:
+            if log:
+                escribir_log(f"[DRY RUN] {puerto} ← {comando}")
+            return "OK"
+        
+        try:
+            if disyuntores.necesita_permiso(puerto):
+                await ejecutor_rotacion.en_hilo(disyuntores.permitir, puerto)
+            if Settings.ACTOR_POR_PUERTO:
+                respuesta = await actores_puerto.comando(puerto, comando, espera, timeout, terminadores, prioridad)
+            else:
+                respuesta = await self.transaccion(
+                    puerto, lambda ser: self.escribir_y_leer(ser, comando, espera, timeout, terminadores))
+        except (serial.SerialException, OSError) as e:
+            if log:
+                escribir_log(f"❌ [{puerto}] Error en {comando}: {e}")
+            return ""
+        
+        if log:
+            log_respuesta_comando(puerto, comando, respuesta)
+        return respuesta
+    
+    async def escribir(self, puerto: str, comando: str, prioridad: int = PRIORIDAD_RESET):
+        """Envía un comando sin esperar respuesta (p.ej. AT+CFUN=1,1, que reinicia el módem)"""
+        if Settings.ACTOR_POR_PUERTO:
+            await actores_puerto.comando(puerto, comando, prioridad=prioridad, solo_escritura=True)
+            return
+        await self.transaccion(puerto, lambda ser: self.solo_escribir(ser, comando))
+    
+    async def _ejecutar_todos(self, puertos: list, fabrica, al_terminar=None) -> dict:
+        limite = asyncio.Semaphore(Settings.MOTOR_ASYNC_MAX_CONCURRENCIA)
+        
+        async def uno(puerto):
+            async with limite:
+                try:
+                    resultado = await fabrica(puerto)
+                except Exception as e:
+                    escribir_log(f"❌ [{puerto}] Error en flujo asíncrono: {e}")
+                    resultado = None
+            if al_terminar:
+                al_terminar(puerto, resultado)
+            return puerto, resultado
+        
+        pares = await asyncio.gather(*(asyncio.create_task(uno(puerto), name=f"Corrutina-{puerto}")
+                                       for puerto in puertos))
+        return dict(pares)
+    
+    def ejecutar_en_flota(self, puertos: list, fabrica, al_terminar=None) -> dict:
+        """Corre fabrica(puerto) para cada módem en el loop del motor y espera a que terminen
+        
+        Args:
+            puertos: Puertos COM de los módems
+            fabrica: Función async que recibe el puerto y retorna su resultado
+            al_terminar: Callback opcional (puerto, resultado) al terminar cada módem (corre en el loop)
+        
+        Returns:
+            dict: {puerto: resultado}
+        """
+        if not puertos:
+            return {}
+        return self.ejecutar(self._ejecutar_todos(list(puertos), fabrica, al_terminar))
+
+motor_serial = MotorSerialAsync(pool_sesiones)
+
+async def obtener_iccid_async(puerto: str, rapido: bool = False, usar_estado: bool = False) -> str:
+    """Obtiene el ICCID del módem para verificar que cambió
+    
+    OPTIMIZADO PARA HEROSMS JAVA: AT+QCCID con line terminator \r
+    Según m.java línea 221: return "AT+QCCID" para Quectel UC20
+    v2.20.0: El comando (QCCID/CCID) sale de la caché de capacidades del módem
+    v2.35.0: Con usar_estado, si ya se leyó desde el último SWIT se usa ese
+    rapido=True: sin log y con prioridad de telemetría (lecturas de toda la flota)
+    """
+    iccid = estado_modems.iccid(puerto) if usar_estado else None
+    if iccid:
+        escribir_log(f"📱 [{puerto}] ICCID conocido: {iccid}")
+        return iccid
+    comando = await capacidades_modem.comando_iccid_async(puerto)
+    respuesta = await motor_serial.comando(puerto, comando, espera=0.8 if rapido else 1,
+                                           timeout=1.5 if rapido else None, log=False,
+                                           prioridad=PRIORIDAD_TELEMETRIA if rapido else PRIORIDAD_ACTIVACION)
+    iccid = extraer_iccid(respuesta)
+    
+    if not rapido:
+        if iccid:
+            escribir_log(f"📱 [{puerto}] ICCID detectado: {iccid}")
+        else:
+            escribir_log(f"⚠️ [{puerto}] No se pudo extraer ICCID: {respuesta[:50]}")
+    return iccid
+
+@trazar("revisar_puerto", pista=_pista_puerto)
+async def revisar_puerto_async(puerto: str) -> bool:
+    """Verifica si un puerto responde al comando AT y lo reinicia
+    
+    OPTIMIZADO PARA HEROSMS JAVA: Line terminator \r (compatible con dq.java)
+    v2.12.0: Usa la sesión del pool
+    v2.15.0: La sesión queda abierta durante el reinicio para que la escucha de URC
+             vea RDY / +CPIN: READY; si el handle muere, el health check lo reabre
+    v2.16.0: Ambos comandos van con PRIORIDAD_RESET (adelantan a la telemetría en cola)
+    """
+    respuesta = await motor_serial.comando(puerto, "AT", espera=1, log=False, prioridad=PRIORIDAD_RESET)
+    
+    if "OK" in respuesta:
+        escribir_log(f"✅ [{puerto}] Módem responde OK")
+        # Reiniciar módem con AT+CFUN=1,1 (como en dq.java línea 29)
+        try:
+            await motor_serial.escribir(puerto, "AT+CFUN=1,1", prioridad=PRIORIDAD_RESET)
+        except (serial.SerialException, OSError) as e:
+            escribir_log(f"❌ [{puerto}] Error al validar: {e}")
+            return False
+        estado_modems.invalidar([puerto], CAMPOS_REINICIO)
+        tiempos_adaptativos.iniciar(ESPERA_CFUN_RESET, puerto)
+        disyuntores.en_reinicio(puerto, Settings.TIEMPO_CFUN_RESET)
+        escribir_log(f"🔄 [{puerto}] Módem reiniciado con AT+CFUN=1,1")
+        return True
+    
+    escribir_log(f"⚠️ [{puerto}] No respondió al comando AT")
+    return False
+
+@trazar("esperar_modem_reiniciado", pista=_pista_puerto)
+async def esperar_modem_reiniciado_async(puerto: str, inicio: float) -> tuple:
+    """Espera a que el módem termine de arrancar tras AT+CFUN=1,1 y lo libera apenas está listo
+    
+    v2.32.0: Reemplaza la espera fija TIEMPO_CFUN_RESET, que ahora es solo el deadline duro.
+    Lo primero que llegue libera al módem: RDY o +CPIN: READY por URC, el puerto vuelve a
+    aparecer en el USB, o un AT responde OK (se sondea desde REINICIO_ESPERA_MINIMA).
+    La duración real queda en tiempos_adaptativos como REINICIO_MODEM.
+    
+    Returns:
+        tuple: (listo: bool, señal: str con lo que lo liberó)
+    """
+    limite = inicio + Settings.TIEMPO_CFUN_RESET
+    proximo_sondeo = inicio + Settings.REINICIO_ESPERA_MINIMA
+    tipos = (URC_MODEM_INICIADO, URC_SIM_LISTA, PUERTO_AGREGADO)
+    
+    while True:
+        evento = bus_urc.ultimo(puerto, tipos, desde=inicio)
+        if evento:
+            señal, momento = evento.linea or "USB", evento.momento
+            break
+        ahora = time.time()
+        if ahora >= limite:
+            # Muestra censurada: cuenta como el techo para que el registro no se vea más corto de lo real
+            tiempos_adaptativos.observar(ESPERA_REINICIO_MODEM, Settings.TIEMPO_CFUN_RESET, puerto)
+            escribir_log(f"❌ [{puerto}] Sin señal de arranque tras {Settings.TIEMPO_CFUN_RESET}s")
+            return False, "deadline"
+        if ahora >= proximo_sondeo:
+            # Si el puerto desapareció del USB mientras reinicia, el motor responde ""
+            respuesta = await motor_serial.comando(puerto, "AT", espera=0.3, timeout=Settings.REINICIO_INTERVALO_SONDEO,
+                                                   log=False, prioridad=PRIORIDAD_RESET)
+            if "OK" in respuesta:
+                señal, momento = "AT", time.time()
+                break
+            proximo_sondeo = time.time() + Settings.REINICIO_INTERVALO_SONDEO
+        await bus_urc.esperar_async(puerto, tipos, timeout=max(0, min(proximo_sondeo, limite) - time.time()),
+                                    desde=inicio)
+    
+    duracion = momento - inicio
+    tiempos_adaptativos.observar(ESPERA_REINICIO_MODEM, duracion, puerto)
+    escribir_log(f"✅ [{puerto}] Reinicio completo en {duracion:.1f}s ({señal})")
+    return True, señal
+
+@trazar("esperar_sim_lista", pista=_pista_puerto)
+async def esperar_sim_lista_async(puerto: str, max_intentos: int = 25) -> bool:
+    """Espera hasta que la SIM esté lista y detectada correctamente
+    
+    OPTIMIZADO PARA UC20: max_intentos aumentado a 25 (era 20)
+    UC20 tarda más en detectar SIMs después de cambiar slot que M35
+    Line terminator \r compatible con HeroSMS Java (dv.java)
+    """
+    # v2.35.0: Si el módem ya avisó que la SIM está lista (p. ej. el URC que lo liberó del reset) no se pregunta
+    if estado_modems.sim_lista(puerto):
+        escribir_log(f"✅ [{puerto}] SIM lista (ya informada por el módem)")
+        tiempos_adaptativos.completar(ESPERA_CFUN_RESET, puerto)
+        return True
+    
+    escribir_log(f"⏳ [{puerto}] Esperando detección de SIM...")
+    inicio = time.time()
+    
+    for intento in range(max_intentos):
+        # Verificar estado de SIM (como en dv.java - AT+CPIN?)
+        respuesta = await motor_serial.comando(puerto, "AT+CPIN?", espera=0.8, log=False, prioridad=PRIORIDAD_RESET)
+        
+        if not respuesta and disyuntores.abierto(puerto):
+            escribir_log(f"❌ [{puerto}] Puerto fuera de servicio: se deja de esperar la SIM")
+            return False
+        if "+CPIN: READY" in respuesta:
+            escribir_log(f"✅ [{puerto}] SIM lista (intento {intento + 1})")
+            tiempos_adaptativos.completar(ESPERA_CFUN_RESET, puerto)
+            return True
+        elif "+CPIN:" in respuesta:
+            escribir_log(f"⏳ [{puerto}] SIM detectada pero no lista: {respuesta[:50]}")
+        elif intento % 3 == 0:
+            # Solo loguear cada 3 intentos para no saturar el log
+            escribir_log(f"⏳ [{puerto}] Esperando SIM... (intento {intento + 1}/{max_intentos})")
+        
+        # v2.15.0: La pausa entre consultas termina apenas el módem avisa (+CPIN: READY / +QIND)
+        evento = await bus_urc.esperar_async(puerto, (URC_SIM_LISTA,), timeout=1.5, desde=inicio)
+        if evento:
+            escribir_log(f"✅ [{puerto}] SIM lista (URC {evento.linea})")
+            return True
+    
+    escribir_log(f"❌ [{puerto}] Timeout esperando SIM después de {max_intentos} intentos")
+    return False
+
+@trazar("esperar_registro_red", pista=_pista_puerto)
+async def esperar_registro_red_async(puerto: str, max_intentos: int = 30) -> bool:
+    """Espera hasta que el módem esté registrado en red antes de enviar USSD
+    
+    OPTIMIZADO PARA UC20: max_intentos aumentado a 30 (era 15)
+    UC20 tarda más en registrarse que M35, especialmente en ubicación con señal débil
+    """
+    if Settings.MODO_DRY_RUN:
+        return True
+    
+    if estado_modems.registrado(puerto):
+        log_activacion(f"✅ [{puerto}] Registrado en red (estado reciente)")
+        return True
+    
+    log_activacion(f"📡 [{puerto}] Verificando registro en red...")
+    
+    for intento in range(max_intentos):
+        respuesta = await motor_serial.comando(puerto, "AT+CREG?", espera=0.5)
+        
+        # Parsear respuesta: +CREG: n,stat
+        # stat: 0=no registrado, 1=registrado (home), 2=buscando, 3=denegado, 5=registrado (roaming)
+        estado = extraer_estado_creg(respuesta)
+        if estado == "1":
+            log_activacion(f"✅ [{puerto}] Registrado en red local (intento {intento + 1})")
+            return True
+        elif estado == "5":
+            log_activacion(f"✅ [{puerto}] Registrado en roaming (intento {intento + 1})")
+            return True
+        elif estado == "2":
+            if intento % 3 == 0:  # Log cada 3 intentos
+                log_activacion(f"🔍 [{puerto}] Buscando red... (intento {intento + 1}/{max_intentos})")
+        elif estado == "3":
+            log_activacion(f"❌ [{puerto}] Registro denegado por la red")
+            return False
+        elif estado and intento % 3 == 0:
+            log_activacion(f"⏳ [{puerto}] No registrado (estado={estado}, intento {intento + 1}/{max_intentos})")
+        
+        # Esperar hasta 2 segundos entre intentos (v2.15.0: termina antes si llega +CREG: 1/5)
+        evento = await bus_urc.esperar_async(puerto, (URC_REGISTRO_RED,), timeout=2,
+                                             predicado=lambda ev: ev.datos["estado"] in ("1", "5"))
+        if evento:
+            log_activacion(f"✅ [{puerto}] Registrado en red (URC {evento.linea})")
+            return True
+    
+    log_activacion(f"❌ [{puerto}] Timeout esperando registro en red ({max_intentos * 2}s)")
+    return False
+
+@trazar("verificar_intensidad_senal", pista=_pista_puerto)
+async def verificar_intensidad_senal_async(puerto: str) -> tuple:
+    """Verifica la intensidad de señal del módem y si es suficiente para activación
+    
+    Returns:
+        tuple: (señal_ok: bool, rssi: int)
+        - señal_ok: True si CSQ >= CSQ_MINIMO y != 99
+        - rssi: valor CSQ (0-31, 99=desconocido)
+    """
+    if Settings.MODO_DRY_RUN:
+        return True, 20
+    
+    rssi = estado_modems.csq(puerto)
+    if rssi is None:
+        respuesta = await motor_serial.comando(puerto, "AT+CSQ", espera=0.5)
+        
+        # Parsear: +CSQ: rssi,ber
+        # rssi: 0-31 (0=-113dBm o menos, 31=-51dBm o mayor, 99=desconocido)
+        csq = parsear_csq(respuesta)
+        rssi = csq.rssi if csq else None
+    if rssi is None:
         return False, 0
+    
+    # Verificar si es señal válida y suficiente
+    señal_ok = (rssi >= Settings.CSQ_MINIMO and rssi != 99)
+    
+    if rssi == 99:
+        log_activacion(f"📶 [{puerto}] Señal desconocida (CSQ=99) - ❌ INSUFICIENTE")
+    elif rssi >= 20:
+        log_activacion(f"📶 [{puerto}] Señal excelente ({rssi}/31) - ✅ OK")
+    elif rssi >= 15:
+        log_activacion(f"📶 [{puerto}] Señal buena ({rssi}/31) - ✅ OK")
+    elif rssi >= Settings.CSQ_MINIMO:
+        log_activacion(f"📶 [{puerto}] Señal regular ({rssi}/31) - ⚠️ MÍNIMA pero aceptable")
+    else:
+        log_activacion(f"📶 [{puerto}] Señal débil ({rssi}/31) - ❌ INSUFICIENTE (< {Settings.CSQ_MINIMO})")
+    
+    return señal_ok, rssi
 
 # ==================== FUNCIONES DE SIMCLIENT ====================
 def cerrar_simclient():
     """Cierra HeroSMS-Partners usando taskkill y verifica que se haya cerrado completamente"""
     try:
         console.print("[yellow]🛑 Cerrando HeroSMS-Partners...[/yellow]")
+        procesos = procesos_simclient()
         
         # Primer intento: taskkill normal
         result = subprocess.run(
@@ -1748,18 +4336,12 @@ def cerrar_simclient():
         if result.returncode == 0:
             escribir_log("✅ HeroSMS-Partners: Comando taskkill enviado")
             
-            # Verificar que realmente se cerró (esperar hasta 5 segundos)
-            for intento in range(5):
-                time.sleep(1)
-                check = subprocess.run(
-                    ["tasklist", "/FI", "IMAGENAME eq HeroSMS-Partners.exe"],
-                    capture_output=True,
-                    text=True
-                )
-                if "HeroSMS-Partners.exe" not in check.stdout:
-                    escribir_log("✅ HeroSMS-Partners cerrado completamente")
-                    time.sleep(1)  # Espera adicional para liberar puertos
-                    return True
+            # v2.23.0: Esperar la salida real del proceso (hasta 5 s) en vez de consultar
+            # tasklist cada segundo; al terminar el proceso el sistema ya soltó sus COM
+            _, vivos = psutil.wait_procs(procesos, timeout=5)
+            if not vivos:
+                escribir_log("✅ HeroSMS-Partners cerrado completamente")
+                return True
             
             # Si después de 5 segundos sigue abierto, forzar cierre adicional
             escribir_log("⚠️ HeroSMS-Partners no se cerró completamente, forzando cierre...")
@@ -1768,7 +4350,7 @@ def cerrar_simclient():
                 capture_output=True,
                 text=True
             )
-            time.sleep(2)
+            psutil.wait_procs(vivos, timeout=2)
             return True
         else:
             escribir_log("⚠️ HeroSMS-Partners no estaba ejecutándose")
@@ -1793,126 +4375,854 @@ def abrir_simclient():
             console.print("[yellow]⚠️ HeroSMS-Partners ya está abierto[/yellow]")
             return True
         
-        # Si no está abierto, proceder a abrirlo
-        user = os.environ["USERNAME"]
-        simclient_path = f"C:\\Users\\{user}\\Desktop\\HeroSMS-Partners.lnk"
+        # Si no está abierto, proceder a abrirlo
+        user = os.environ["USERNAME"]
+        simclient_path = f"C:\\Users\\{user}\\Desktop\\HeroSMS-Partners.lnk"
+        
+        if os.path.exists(simclient_path):
+            console.print("[green]🟢 Abriendo HeroSMS-Partners...[/green]")
+            os.startfile(simclient_path)
+            escribir_log("✅ HeroSMS-Partners iniciado")
+            
+            # Verificar que se haya abierto correctamente (esperar hasta 10 segundos)
+            for intento in range(10):
+                time.sleep(1)
+                check_abierto = subprocess.run(
+                    ["tasklist", "/FI", "IMAGENAME eq HeroSMS-Partners.exe"],
+                    capture_output=True,
+                    text=True
+                )
+                if "HeroSMS-Partners.exe" in check_abierto.stdout:
+                    escribir_log(f"✅ HeroSMS-Partners confirmado en ejecución (tras {intento + 1}s)")
+                    time.sleep(4)  # Espera adicional para que cargue completamente
+                    return True
+            
+            escribir_log("⚠️ No se pudo confirmar que HeroSMS-Partners se haya abierto")
+            return True  # Retornar True igual para no bloquear el flujo
+        else:
+            escribir_log(f"❌ No se encontró HeroSMS-Partners en: {simclient_path}")
+            return False
+            
+    except Exception as e:
+        escribir_log(f"❌ Error al abrir HeroSMS-Partners: {e}")
+        return False
+
+# ==================== EJECUTOR DE LA ROTACIÓN ====================
+class EjecutorRotacion:
+    """Pool de hilos acotado y compartido por todas las fases de la rotación
+    
+    v2.33.0: Cada slot creaba ~5 hilos por módem con threading.Thread y los esperaba con
+    join() sin timeout. Ahora todo (SWIT por pool, reintentos de SWIT, pipelines por pool y
+    las llamadas bloqueantes de los flujos de módem) va a un solo ThreadPoolExecutor que se
+    reutiliza entre slots.
+    
+    El tamaño no depende de la flota: los flujos de módem son corrutinas y solo ocupan un hilo
+    mientras dura una llamada corta, que si no hay trabajador libre espera en la cola. Se suma
+    un hilo por pool para las tareas largas de pool (pipeline, cambio de slot), así nunca dejan
+    sin trabajadores a las llamadas cortas de las que dependen.
+    """
+    
+    def __init__(self):
+        self._ejecutor = None
+        self._lock = threading.Lock()
+    
+    def enviar(self, funcion, *args) -> Future:
+        with self._lock:
+            if self._ejecutor is None:
+                trabajadores = Settings.EJECUTOR_TRABAJADORES + len(SIM_BANKS)
+                self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="Rotacion")
+                escribir_log(f"🧵 Ejecutor de la rotación: hasta {trabajadores} hilos")
+            return self._ejecutor.submit(funcion, *args)
+    
+    async def en_hilo(self, funcion, *args):
+        """Corre una llamada bloqueante corta (AT sincrónico, BD) sin detener el event loop
+        
+        La llamada hereda el contexto de la corrutina: sus tramos caen en la pista del módem.
+        """
+        contexto = contextvars.copy_context()
+        return await asyncio.wrap_future(self.enviar(contexto.run, funcion, *args))
+    
+    def mapear(self, funcion, elementos: list, timeout: float = None, al_terminar=None, al_vencer=None) -> dict:
+        """Ejecuta funcion(elemento) para cada elemento y retorna {elemento: resultado}
+        
+        'timeout' corre para cada tarea desde que empieza. Una tarea vencida se cancela (si no
+        había empezado) o se avisa con al_vencer(elemento) para que se detenga sola, y no
+        aparece en el resultado. Una tarea que lanza excepción queda con resultado None.
+        al_terminar(elemento, resultado) se llama desde este hilo, en orden de llegada.
+        """
+        inicios = {}
+        lock_inicios = threading.Lock()
+        
+        def tarea(elemento):
+            with lock_inicios:
+                inicios[elemento] = time.monotonic()
+            return funcion(elemento)
+        
+        futuros = {self.enviar(tarea, elemento): elemento for elemento in elementos}
+        pendientes = set(futuros)
+        resultados = {}
+        
+        while pendientes:
+            espera = timeout
+            if timeout is not None:
+                with lock_inicios:
+                    vencimientos = [inicios[futuros[f]] + timeout for f in pendientes if futuros[f] in inicios]
+                if vencimientos:
+                    espera = max(0, min(vencimientos) - time.monotonic())
+            listos, pendientes = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+            
+            for futuro in listos:
+                elemento = futuros[futuro]
+                try:
+                    resultados[elemento] = futuro.result()
+                except Exception as e:
+                    escribir_log(f"❌ Tarea {getattr(funcion, '__name__', 'tarea')}({elemento}) falló: {e}")
+                    resultados[elemento] = None
+                if al_terminar:
+                    al_terminar(elemento, resultados[elemento])
+            
+            if timeout is None:
+                continue
+            ahora = time.monotonic()
+            with lock_inicios:
+                vencidos = [f for f in pendientes if futuros[f] in inicios and ahora - inicios[futuros[f]] >= timeout]
+            for futuro in vencidos:
+                pendientes.discard(futuro)
+                futuro.cancel()
+                escribir_log(f"⏱️ Tarea {getattr(funcion, '__name__', 'tarea')}({futuros[futuro]}) vencida tras {timeout}s")
+                if al_vencer:
+                    al_vencer(futuros[futuro])
+        return resultados
+
+ejecutor_rotacion = EjecutorRotacion()
+
+# ==================== CONTROLADOR DE SIM BANK ====================
+def comando_swit(puerto_logico, slot_real: int) -> str:
+    """FORMATO JAVA: AT+SWIT%02d-%04d (puerto con 2 dígitos, slot con 4)"""
+    return f"AT+SWIT{int(puerto_logico):02d}-{slot_real:04d}"
+
+def slot_real_pool(pool_config: dict, slot_base: int) -> int:
+    """Slot real de un pool para un slot base (offset circular)"""
+    return ((slot_base - 1 + pool_config.get("offset_slot", 0)) % Settings.SLOT_MAX) + 1
+
+# Acuse de un AT+SWIT: resultado es RESULTADO_OK, RESULTADO_ERROR, RESULTADO_SIN_RESPUESTA
+# (controlador mudo: el comando se da por enviado) o RESULTADO_EXCEPCION (puerto inutilizable)
+AcuseSwit = namedtuple("AcuseSwit", ["puerto_logico", "slot", "resultado", "respuesta", "ms"])
+
+class ControladoresSimBank:
+    """Driver de los controladores de SIM Bank: todos los SWIT de un pool en una sola transacción
+    
+    v2.27.0: Antes cada SWIT era una transacción aparte seguida de un sleep(0.5). Ahora la
+    sesión del controlador se toma una vez y cada SWIT sale apenas llega el código final del
+    anterior. Algunos SIM Banks no responden al SWIT: tras SWIT_SILENCIOS_PARA_MUDO silencios
+    seguidos el controlador se trata como mudo y sus SWIT solo esperan SWIT_TIMEOUT_SIN_ACUSE.
+    Con ese deadline corto el OK de un SWIT puede llegar tarde: antes de cada SWIT se descarta
+    lo pendiente y, si el controlador hace eco, solo cuenta lo que sigue al eco del comando.
+    """
+    
+    def __init__(self):
+        self._silencios = defaultdict(int)  # COM → SWIT seguidos sin respuesta
+        self._eco = set()  # COM de los controladores que devuelven el eco del SWIT
+        self._lock = threading.Lock()
+    
+    def mudo(self, com: str) -> bool:
+        with self._lock:
+            return self._silencios[com] >= Settings.SWIT_SILENCIOS_PARA_MUDO
+    
+    def _anotar(self, com: str, resultado: str):
+        with self._lock:
+            if resultado == RESULTADO_SIN_RESPUESTA:
+                self._silencios[com] += 1
+            elif resultado in (RESULTADO_OK, RESULTADO_ERROR):
+                self._silencios[com] = 0
+    
+    def _acuse(self, ser, com: str, comando: str, timeout: float) -> str:
+        """Respuesta a este SWIT, sin el acuse tardío del anterior"""
+        limite = time.perf_counter() + timeout
+        ser.reset_input_buffer()
+        respuesta = _escribir_y_leer(ser, comando, 0, timeout)
+        # Con eco, una respuesta sin el eco de este comando es el OK/ERROR tardío del SWIT anterior
+        while com in self._eco and respuesta and comando not in respuesta:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                return ""
+            respuesta = leer_respuesta_at(ser, restante)
+        if comando in respuesta:
+            self._eco.add(com)
+            respuesta = respuesta[respuesta.index(comando):]
+        return respuesta
+    
+    def _rafaga(self, ser, com: str, asignaciones: dict) -> dict:
+        acuses = {}
+        for puerto_logico, slot in asignaciones.items():
+            comando = comando_swit(puerto_logico, slot)
+            timeout = Settings.SWIT_TIMEOUT_SIN_ACUSE if self.mudo(com) else timeout_para_comando(comando)
+            inicio = time.perf_counter()
+            respuesta = self._acuse(ser, com, comando, timeout)
+            resultado = resultado_respuesta_at(respuesta)
+            self._anotar(com, resultado)
+            acuses[puerto_logico] = AcuseSwit(puerto_logico, slot, resultado, respuesta,
+                                              round((time.perf_counter() - inicio) * 1000, 1))
+        return acuses
+    
+    @trazar("swit", pista=lambda self, com, *_args, **_kwargs: com)
+    def cambiar_puertos(self, com: str, asignaciones: dict) -> dict:
+        """Envía AT+SWIT a cada puerto lógico sin soltar el controlador
+        
+        Args:
+            com: Puerto COM del controlador
+            asignaciones: {puerto_logico: slot_real}
+        
+        Returns:
+            dict: {puerto_logico: AcuseSwit}
+        """
+        if Settings.MODO_DRY_RUN:
+            for puerto_logico, slot in asignaciones.items():
+                escribir_log(f"[DRY RUN] {com} ← {comando_swit(puerto_logico, slot)}")
+            return {p: AcuseSwit(p, slot, RESULTADO_OK, "OK", 0.0) for p, slot in asignaciones.items()}
+        
+        estado_modems.invalidar_swit(com, list(asignaciones))
+        inicio = time.perf_counter()
+        try:
+            acuses = transaccion_serial(com, lambda ser: self._rafaga(ser, com, asignaciones))
+        except (serial.SerialException, OSError) as e:
+            escribir_log(f"❌ [{com}] Error al enviar SWIT: {e}")
+            return {p: AcuseSwit(p, slot, RESULTADO_EXCEPCION, "", None) for p, slot in asignaciones.items()}
+        
+        conteo = defaultdict(int)
+        for acuse in acuses.values():
+            conteo[acuse.resultado] += 1
+            if acuse.resultado == RESULTADO_ERROR:
+                escribir_log(f"⚠️ [{com}] {comando_swit(acuse.puerto_logico, acuse.slot)} → ERROR: {acuse.respuesta[:80]}")
+        detalle = ", ".join(f"{cantidad} {resultado}" for resultado, cantidad in conteo.items())
+        escribir_log(f"📡 [{com}] {len(acuses)} SWIT en {(time.perf_counter() - inicio) * 1000:.0f} ms ({detalle})")
+        return acuses
+
+controladores_simbank = ControladoresSimBank()
+
+def swit_aceptado(acuse: AcuseSwit) -> bool:
+    """OK, o sin respuesta de un SIM Bank que no acusa el SWIT"""
+    return acuse.resultado in (RESULTADO_OK, RESULTADO_SIN_RESPUESTA)
+
+class ReintentosSwit:
+    """Reintentos de SWIT por puerto lógico, en segundo plano
+    
+    v2.29.0: Antes, si la mitad de la muestra no cambiaba de ICCID, se reenviaba el SWIT a los
+    8 puertos del pool y todo el pool esperaba TIEMPO_APLICAR_SLOT + 3. Ahora cada puerto
+    atascado tiene su propio hilo con SWIT_REINTENTOS_PUERTO intentos y backoff, y el resto
+    del pool sigue. Solo el módem del puerto atascado espera su resultado (esperar()).
+    v2.33.0: Los reintentos corren en ejecutor_rotacion.
+    """
+    
+    def __init__(self):
+        self._futuros = {}  # COM del módem → Future con el ICCID nuevo (None si se agotaron los intentos)
+        self._lock = threading.Lock()
+    
+    def reiniciar(self, modems: list = None):
+        """Olvida los reintentos de todos los módems, o solo los de 'modems' (un pool)"""
+        with self._lock:
+            if modems is None:
+                self._futuros = {}
+            else:
+                for modem in modems:
+                    self._futuros.pop(modem, None)
+    
+    def iniciar(self, pool_name: str, controlador: str, puerto_logico: str, slot_real: int,
+                modem: str, iccid_anterior: str) -> Future:
+        with self._lock:
+            futuro = ejecutor_rotacion.enviar(self._reintentar, pool_name, controlador, puerto_logico,
+                                              slot_real, modem, iccid_anterior)
+            self._futuros[modem] = futuro
+        return futuro
+    
+    @trazar("reintento_swit", pista=lambda self, pool_name, controlador, *_args, **_kwargs: controlador)
+    def _reintentar(self, pool_name: str, controlador: str, puerto_logico: str,
+                    slot_real: int, modem: str, iccid_anterior: str) -> str:
+        """Reenvía el SWIT de un puerto lógico con backoff. Retorna el ICCID nuevo (None si no cambió)"""
+        iccid_nuevo = None
+        try:
+            for intento in range(1, Settings.SWIT_REINTENTOS_PUERTO + 1):
+                acuse = controladores_simbank.cambiar_puertos(controlador, {puerto_logico: slot_real})[puerto_logico]
+                espera = min(Settings.SWIT_REINTENTO_ESPERA_BASE * 2 ** (intento - 1), Settings.TIEMPO_APLICAR_SLOT + 3)
+                if swit_aceptado(acuse):
+                    iccid_nuevo = esperar_aplicacion_slot({modem: iccid_anterior}, espera).get(modem)
+                else:
+                    time.sleep(espera)
+                if iccid_nuevo:
+                    escribir_log(f"✅ {pool_name}/{puerto_logico} [{modem}] cambió en el reintento {intento}: {iccid_nuevo}")
+                    break
+                escribir_log(f"⚠️ {pool_name}/{puerto_logico} [{modem}] sin cambio tras reintento {intento}/{Settings.SWIT_REINTENTOS_PUERTO}")
+            else:
+                escribir_log(f"❌ {pool_name}/{puerto_logico} [{modem}] atascado en {iccid_anterior}: posible falla del switch en {controlador}")
+        except Exception as e:
+            escribir_log(f"❌ {pool_name}/{puerto_logico} [{modem}] error al reintentar SWIT: {e}")
+        return iccid_nuevo
+    
+    async def esperar_async(self, modem: str) -> bool:
+        """True si el módem no tiene reintento pendiente o si su puerto terminó cambiando"""
+        with self._lock:
+            futuro = self._futuros.get(modem)
+        if futuro is None:
+            return True
+        try:
+            return await asyncio.wrap_future(futuro) is not None
+        except asyncio.CancelledError:
+            return False
+    
+    def pendientes(self) -> list:
+        with self._lock:
+            return [modem for modem, futuro in self._futuros.items() if not futuro.done()]
+
+reintentos_swit = ReintentosSwit()
+
+# ==================== TOPOLOGÍA DE POOLS ====================
+class TopologiaPools:
+    """Qué módem (COM) está conectado a cada puerto lógico de cada pool
+    
+    v2.26.0: ports.txt solo da un número lógico por COM, sin decir a qué SIM Bank pertenece.
+    La topología se descubre cambiando un puerto lógico a la vez y viendo qué módem cambia de
+    ICCID, y se guarda en TOPOLOGIA_FILE junto con el controlador de cada pool y la serie USB de
+    cada módem. Deja de ser vigente si cambia un controlador, si un módem desaparece o cambia
+    su serie USB, o si el inventario avisa que se agregó o quitó un puerto.
+    """
+    
+    def __init__(self):
+        self._pools = {}  # pool → {puerto_logico: COM}
+        self._controladores = {}  # pool → COM del controlador
+        self._series = {}  # COM → serie USB al momento del descubrimiento
+        self._invalidada = False
+        self._lock = threading.Lock()
+        self._cargado = False
+    
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+        try:
+            if os.path.exists(Settings.TOPOLOGIA_FILE):
+                with open(Settings.TOPOLOGIA_FILE, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                self._pools = datos.get("pools", {})
+                self._controladores = datos.get("controladores", {})
+                self._series = datos.get("series_usb", {})
+        except Exception as e:
+            escribir_log(f"⚠️ Error al cargar topología de pools: {e}")
+    
+    def _guardar(self):
+        try:
+            with open(Settings.TOPOLOGIA_FILE, "w", encoding="utf-8") as f:
+                json.dump({
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "controladores": self._controladores,
+                    "pools": self._pools,
+                    "series_usb": self._series,
+                }, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            escribir_log(f"⚠️ Error al guardar topología de pools: {e}")
+    
+    @staticmethod
+    def _serie_usb(puerto: str) -> str:
+        info = inventario_puertos.info(puerto)
+        return (info.serial_number or "") if info else None
+    
+    def invalidar(self, motivo: str):
+        with self._lock:
+            if not self._invalidada and self._pools:
+                escribir_log(f"🧭 Topología de pools invalidada: {motivo}")
+            self._invalidada = True
+    
+    def _al_cambiar_puerto(self, evento):
+        with self._lock:
+            self._cargar()
+            conocido = evento.puerto in self._series or evento.puerto in self._controladores.values()
+        if conocido:
+            self.invalidar(f"{evento.puerto} {'agregado' if evento.tipo == PUERTO_AGREGADO else 'quitado'}")
+    
+    def vigente(self) -> bool:
+        """True si hay topología guardada y sigue correspondiendo al hardware conectado"""
+        with self._lock:
+            self._cargar()
+            if self._invalidada or not self._pools:
+                return False
+            controladores = {pool_name: config["com"] for pool_name, config in SIM_BANKS.items()}
+            if controladores != self._controladores:
+                return False
+            series = dict(self._series)
+        return all(self._serie_usb(puerto) == serie for puerto, serie in series.items())
+    
+    def modems_de_pool(self, pool_name: str) -> list:
+        """COM de los módems del pool en orden de puerto lógico ([] si no se conoce)"""
+        if not self.vigente():
+            return []
+        with self._lock:
+            asignados = self._pools.get(pool_name, {})
+            return [asignados[p] for p in sorted(asignados)]
+    
+    def modem(self, pool_name: str, puerto_logico: str) -> str:
+        """COM del módem en (pool, puerto lógico), o None si no se conoce"""
+        if not self.vigente():
+            return None
+        with self._lock:
+            return self._pools.get(pool_name, {}).get(puerto_logico)
+    
+    def ubicacion(self, puerto: str):
+        """(pool, puerto_logico) del módem, o None"""
+        with self._lock:
+            self._cargar()
+            for pool_name, asignados in self._pools.items():
+                for puerto_logico, com in asignados.items():
+                    if com == puerto:
+                        return pool_name, puerto_logico
+        return None
+    
+    @trazar("descubrir_topologia")
+    def descubrir(self, slot_base: int, pools: list = None) -> dict:
+        """Descubre la topología cambiando un puerto lógico a la vez al slot de slot_base
+        
+        Cada puerto queda en el slot que le corresponde a slot_base, así que durante una
+        rotación el descubrimiento reemplaza el cambio de slot de esos pools. Si el ICCID de
+        ningún módem cambia (el puerto ya estaba en ese slot), se prueba el slot siguiente y
+        se vuelve al original. Los pools se recorren de a uno porque dos puertos cambiando a
+        la vez no se pueden distinguir.
+        
+        Returns:
+            dict: {pool: {puerto_logico: COM}} con lo descubierto en esta pasada
+        """
+        pools = pools or list(SIM_BANKS)
+        candidatos = obtener_modems_activos()
+        console.print(f"[bold blue]🧭 Descubriendo topología de {len(pools)} pools sobre {len(candidatos)} módems...[/bold blue]")
+        escribir_log(f"🧭 Descubrimiento de topología: pools {', '.join(pools)}, {len(candidatos)} módems candidatos")
+        inicio = time.time()
+        
+        iccids = motor_serial.ejecutar_en_flota(candidatos, lambda puerto: obtener_iccid_async(puerto, rapido=True))
+        descubiertos = {}
+        
+        for pool_name in pools:
+            config = SIM_BANKS[pool_name]
+            slot_real = slot_real_pool(config, slot_base)
+            slot_prueba = slot_real % Settings.SLOT_MAX + 1
+            descubiertos[pool_name] = {}
+            
+            for puerto_logico in config["puertos"]:
+                pendientes = [p for p in candidatos if p not in self._asignados(descubiertos)]
+                modem = self._cambiar_y_observar(config["com"], puerto_logico, slot_real, pendientes, iccids)
+                if modem is None and pendientes:
+                    # El puerto ya estaba en slot_real (o el switch ignoró el SWIT): ida y vuelta por
+                    # el slot de prueba. La vuelta también se observa: confirma que el módem regresó
+                    # y, si la ida no se vio, el cambio de la vuelta no queda para el puerto siguiente
+                    modem = self._cambiar_y_observar(config["com"], puerto_logico, slot_prueba, pendientes, iccids)
+                    vuelta = self._cambiar_y_observar(config["com"], puerto_logico, slot_real,
+                                                      [modem] if modem else pendientes, iccids)
+                    if modem is None:
+                        modem = vuelta
+                    elif vuelta is None:
+                        escribir_log(f"⚠️ {pool_name}/{puerto_logico}: no se confirmó la vuelta al slot {slot_real:02d}")
+                if modem:
+                    descubiertos[pool_name][puerto_logico] = modem
+                    escribir_log(f"🧭 {pool_name}/{puerto_logico} → {modem}")
+                else:
+                    escribir_log(f"⚠️ {pool_name}/{puerto_logico}: ningún módem cambió de ICCID (puerto vacío o módem caído)")
+        
+        with self._lock:
+            self._cargar()
+            for pool_name, asignados in descubiertos.items():
+                self._pools[pool_name] = asignados
+            self._controladores = {pool_name: config["com"] for pool_name, config in SIM_BANKS.items()}
+            self._pools = {pool_name: asignados for pool_name, asignados in self._pools.items() if pool_name in SIM_BANKS}
+            self._series = {com: self._serie_usb(com) for asignados in self._pools.values() for com in asignados.values()}
+            self._invalidada = False
+            self._guardar()
+        
+        total = sum(len(asignados) for asignados in descubiertos.values())
+        puertos_total = sum(len(SIM_BANKS[pool_name]["puertos"]) for pool_name in pools)
+        console.print(f"[green]🧭 Topología: {total}/{puertos_total} puertos lógicos ubicados en {time.time() - inicio:.1f}s[/green]")
+        escribir_log(f"🧭 Topología guardada en {Settings.TOPOLOGIA_FILE}: {total}/{puertos_total} puertos ubicados")
+        return descubiertos
+    
+    @staticmethod
+    def _asignados(descubiertos: dict) -> set:
+        return {com for asignados in descubiertos.values() for com in asignados.values()}
+    
+    def _cambiar_y_observar(self, controlador: str, puerto_logico: str, slot_real: int,
+                            pendientes: list, iccids: dict) -> str:
+        """SWIT de un puerto y sondeo de ICCID de los pendientes hasta que uno solo cambie
+        
+        iccids se actualiza con lo leído, así el siguiente puerto compara contra el estado actual.
+        """
+        def leer_pendientes():
+            disponibles = [p for p in pendientes if disyuntores.disponible(p)]
+            leidos = motor_serial.ejecutar_en_flota(disponibles, lambda puerto: obtener_iccid_async(puerto, rapido=True))
+            cambiados = [p for p, iccid in leidos.items() if iccid and iccids.get(p) and iccid != iccids[p]]
+            # Un módem sin ICCID previo (lectura fallida o slot vacío) solo toma referencia: no cuenta como cambio
+            for puerto, iccid in leidos.items():
+                if iccid:
+                    iccids[puerto] = iccid
+            return cambiados
+        
+        if Settings.MODO_DRY_RUN or not pendientes:
+            enviar_comando(controlador, comando_swit(puerto_logico, slot_real), espera=1.0)
+            return None
+        
+        # Referencia fresca: absorbe cambios tardíos del puerto anterior para no atribuírselos a este
+        leer_pendientes()
+        enviar_comando(controlador, comando_swit(puerto_logico, slot_real), espera=1.0)
+        limite = time.time() + espera_adaptativa(ESPERA_APLICAR_SLOT, Settings.TIEMPO_APLICAR_SLOT, pendientes)
+        intervalo = Settings.APLICAR_SLOT_SONDEO_INICIAL
+        while True:
+            time.sleep(min(intervalo, max(0, limite - time.time())))
+            intervalo = min(intervalo * 2, Settings.ADAPTATIVO_INTERVALO_SONDEO)
+            cambiados = leer_pendientes()
+            if len(cambiados) == 1:
+                return cambiados[0]
+            if len(cambiados) > 1:
+                # Varios módems cambiaron a la vez (SIM que tardó en aparecer): no se puede atribuir
+                escribir_log(f"⚠️ {controlador} puerto {puerto_logico}: cambiaron {len(cambiados)} módems a la vez ({', '.join(cambiados)})")
+                return None
+            if time.time() >= limite:
+                return None
+
+topologia_pools = TopologiaPools()
+bus_urc.suscribir(topologia_pools._al_cambiar_puerto, tipo=PUERTO_AGREGADO)
+bus_urc.suscribir(topologia_pools._al_cambiar_puerto, tipo=PUERTO_QUITADO)
+
+def descubrir_topologia_cli():
+    """Descubre la topología de pools (--descubrir-topologia) y deja cada pool en su slot actual"""
+    console.print("\n[bold cyan]🧭 DESCUBRIMIENTO DE TOPOLOGÍA DE POOLS[/bold cyan]")
+    console.print("="*70)
+    inicializar_simbanks()
+    cargar_mapeo_puertos()
+    simclient_abierto = bool(procesos_simclient())
+    if simclient_abierto:
+        cerrar_simclient()
+    try:
+        slot_actual, _ = cargar_estado()
+        topologia_pools.descubrir(slot_actual)
+    finally:
+        if simclient_abierto:
+            abrir_simclient()
+    
+    table = Table(title="Topología de pools")
+    table.add_column("Pool", style="cyan")
+    table.add_column("Controlador")
+    puertos_logicos = sorted({p for config in SIM_BANKS.values() for p in config["puertos"]})
+    for puerto_logico in puertos_logicos:
+        table.add_column(puerto_logico, justify="center")
+    for pool_name, config in SIM_BANKS.items():
+        ubicados = dict(zip(config["puertos"], [None] * len(config["puertos"])))
+        for com in topologia_pools.modems_de_pool(pool_name):
+            ubicados[topologia_pools.ubicacion(com)[1]] = com
+        table.add_row(pool_name, config["com"], *[ubicados.get(p) or "[dim]·[/dim]" for p in puertos_logicos])
+    console.print(table)
+
+# ==================== MÁQUINA DE ESTADOS POR MÓDEM ====================
+# v2.31.0: Cada módem recorre sus estados por su cuenta; no hay barrera entre fases
+ESTADO_RESET = "reset"
+ESTADO_SIM_LISTA = "sim_lista"
+ESTADO_ICCID = "iccid_verificado"
+ESTADO_REGISTRO = "registrado"
+ESTADO_SENAL = "senal_ok"
+ESTADO_ACTIVACION = "activacion"
+ESTADO_LISTO = "listo"
+ESTADOS_MODEM = (ESTADO_RESET, ESTADO_SIM_LISTA, ESTADO_ICCID, ESTADO_REGISTRO, ESTADO_SENAL, ESTADO_ACTIVACION)
+
+DESENLACE_OK = "ok"
+DESENLACE_FALLO = "fallo"
+DESENLACE_OMITIDO = "omitido"
+
+PasoModem = namedtuple("PasoModem", ["estado", "desenlace", "segundos", "detalle"])
+
+class FlujoModem:
+    """Estado de un módem durante la rotación: reset → SIM lista → ICCID verificado →
+    registrado → señal OK → activado/omitido → listo
+    
+    Cada estado es una corrutina que retorna (desenlace, detalle) y el siguiente estado sale
+    de _TRANSICIONES: con DESENLACE_FALLO el módem termina ahí (queda en 'fallido_en').
+    Cada paso queda en 'pasos' con su duración. v2.33.0: Si se cancela la corrutina (deadline
+    TIMEOUT_FLUJO_MODEM vencido) el estado en curso queda como fallido con "cancelado".
+    """
+    
+    def __init__(self, puerto: str, iccid_previo: str = None):
+        self.puerto = puerto
+        self.iccid_previo = iccid_previo
+        self.estado = ESTADO_RESET
+        self.pasos = []
+        self.iccid = None
+        self.activacion = None
+        self.fallido_en = None
+        self.inicio = None
+        self.fin = None
+    
+    async def _reset(self):
+        if not await revisar_puerto_async(self.puerto):
+            return DESENLACE_FALLO, "no responde AT"
+        inicio = time.time()  # AT+CFUN=1,1 va sin esperar respuesta: acaba de salir
+        if not Settings.REINICIO_POR_SENAL:
+            await asyncio.sleep(espera_adaptativa(ESPERA_CFUN_RESET, Settings.TIEMPO_CFUN_RESET, [self.puerto]))
+            return DESENLACE_OK, None
+        listo, señal = await esperar_modem_reiniciado_async(self.puerto, inicio)
+        if not listo:
+            return DESENLACE_FALLO, f"sin señal de arranque en {Settings.TIEMPO_CFUN_RESET}s"
+        return DESENLACE_OK, señal
+    
+    async def _sim_lista(self):
+        if not await reintentos_swit.esperar_async(self.puerto):
+            return DESENLACE_FALLO, "puerto lógico atascado"
+        if not await esperar_sim_lista_async(self.puerto, max_intentos=20):
+            return DESENLACE_FALLO, "SIM no lista"
+        return DESENLACE_OK, None
+    
+    async def _iccid(self):
+        self.iccid = await obtener_iccid_async(self.puerto, usar_estado=True)
+        if self.iccid and self.iccid == self.iccid_previo:
+            # Lo conocido puede ser de antes de que el SIM Bank aplicara el SWIT: se confirma con el módem
+            self.iccid = await obtener_iccid_async(self.puerto)
+        if not self.iccid:
+            return DESENLACE_FALLO, "sin ICCID"
+        if self.iccid == self.iccid_previo:
+            escribir_log(f"⚠️ [{self.puerto}] ICCID NO CAMBIÓ: {self.iccid}")
+            return DESENLACE_FALLO, "ICCID no cambió"
+        if self.iccid_previo:
+            escribir_log(f"✅ [{self.puerto}] ICCID cambió: {self.iccid_previo} → {self.iccid}")
+        return DESENLACE_OK, self.iccid
+    
+    async def _registro(self):
+        if not await esperar_registro_red_async(self.puerto, max_intentos=15):
+            return DESENLACE_FALLO, "sin registro"
+        return DESENLACE_OK, None
+    
+    async def _senal(self):
+        senal_ok, rssi = await verificar_intensidad_senal_async(self.puerto)
+        return (DESENLACE_OK if senal_ok else DESENLACE_FALLO), f"CSQ {rssi}"
+    
+    async def _activacion(self):
+        operador = obtener_operador(self.iccid)
+        if not Settings.ACTIVAR_SIMS_CLARO or operador != "Claro":
+            return DESENLACE_OMITIDO, operador
+        self.activacion = await procesar_activacion_sim_async(self.puerto, self.iccid_previo, iccid=self.iccid, red_verificada=True)
+        if self.activacion["activado"] and self.activacion["numero"]:
+            return DESENLACE_OK, self.activacion["numero"]
+        return DESENLACE_FALLO, f"{self.activacion['intentos']} intentos"
+    
+    _TRANSICIONES = {
+        ESTADO_RESET: (_reset, ESTADO_SIM_LISTA),
+        ESTADO_SIM_LISTA: (_sim_lista, ESTADO_ICCID),
+        ESTADO_ICCID: (_iccid, ESTADO_REGISTRO),
+        ESTADO_REGISTRO: (_registro, ESTADO_SENAL),
+        ESTADO_SENAL: (_senal, ESTADO_ACTIVACION),
+        ESTADO_ACTIVACION: (_activacion, ESTADO_LISTO),
+    }
+    
+    async def avanzar(self) -> bool:
+        """Ejecuta el estado actual y pasa al siguiente; False cuando el módem terminó"""
+        if self.estado == ESTADO_LISTO:
+            return False
+        paso, siguiente = self._TRANSICIONES[self.estado]
+        inicio = time.time()
+        with traza_rotacion.tramo(self.estado, self.puerto, categoria="estado"):
+            try:
+                desenlace, detalle = await paso(self)
+            except asyncio.CancelledError:
+                self.pasos.append(PasoModem(self.estado, DESENLACE_FALLO, round(time.time() - inicio, 2), "cancelado"))
+                self.fallido_en = self.estado
+                self.estado = ESTADO_LISTO
+                raise
+            except Exception as e:
+                desenlace, detalle = DESENLACE_FALLO, str(e)
+        self.pasos.append(PasoModem(self.estado, desenlace, round(time.time() - inicio, 2), detalle))
+        if desenlace == DESENLACE_FALLO:
+            escribir_log(f"⚠️ [{self.puerto}] Detenido en {self.estado}: {detalle}")
+            self.fallido_en = self.estado
+            siguiente = ESTADO_LISTO
+        self.estado = siguiente
+        return siguiente != ESTADO_LISTO
+    
+    async def ejecutar(self):
+        self.inicio = time.time()
+        try:
+            while await self.avanzar():
+                pass
+        finally:
+            self.fin = time.time()
+    
+    def paso(self, estado: str) -> PasoModem:
+        return next((p for p in self.pasos if p.estado == estado), None)
+    
+    def alcanzo(self, estado: str) -> bool:
+        """True si el módem pasó 'estado' con éxito (u omitido)"""
+        paso = self.paso(estado)
+        return paso is not None and paso.desenlace != DESENLACE_FALLO
+    
+    @property
+    def segundos(self) -> float:
+        return round((self.fin or time.time()) - (self.inicio or time.time()), 2)
+    
+    def a_dict(self) -> dict:
+        return {
+            "iccid_previo": self.iccid_previo,
+            "iccid": self.iccid,
+            "fallido_en": self.fallido_en,
+            "segundos": self.segundos,
+            "pasos": [dict(p._asdict()) for p in self.pasos],
+        }
+
+class PlanificadorModems:
+    """Hace avanzar los FlujoModem de una rotación, cada uno como corrutina de motor_serial
+    
+    v2.31.0: Reemplaza las fases con barrera de cambiar_slot_simbank (revisar todos →
+    esperar TIEMPO_CFUN_RESET → CPIN de todos → CREG de todos → activar todos). Un módem
+    listo en 20 s ya no espera al más lento en cada fase, y el slot dura lo que el módem más lento.
+    Las esperas de cada estado ceden el loop; solo las llamadas bloqueantes cortas (USSD, SMS,
+    BD) ocupan un trabajador de ejecutor_rotacion mientras duran.
+    """
+    
+    @trazar("flujos_modem")
+    def ejecutar(self, modems: list, iccids_previos: dict = None, al_terminar=None, al_crear=None) -> dict:
+        """Corre los flujos y retorna {puerto: FlujoModem}
+        
+        al_crear(flujos) se llama antes de arrancarlos y al_terminar(flujo) cuando termina cada
+        módem (desde el loop del motor). Un flujo que supera TIMEOUT_FLUJO_MODEM se cancela.
+        """
+        iccids_previos = iccids_previos or {}
+        flujos = {puerto: FlujoModem(puerto, iccids_previos.get(puerto)) for puerto in modems}
+        if al_crear:
+            al_crear(flujos)
         
-        if os.path.exists(simclient_path):
-            console.print("[green]🟢 Abriendo HeroSMS-Partners...[/green]")
-            os.startfile(simclient_path)
-            escribir_log("✅ HeroSMS-Partners iniciado")
-            
-            # Verificar que se haya abierto correctamente (esperar hasta 10 segundos)
-            for intento in range(10):
-                time.sleep(1)
-                check_abierto = subprocess.run(
-                    ["tasklist", "/FI", "IMAGENAME eq HeroSMS-Partners.exe"],
-                    capture_output=True,
-                    text=True
-                )
-                if "HeroSMS-Partners.exe" in check_abierto.stdout:
-                    escribir_log(f"✅ HeroSMS-Partners confirmado en ejecución (tras {intento + 1}s)")
-                    time.sleep(4)  # Espera adicional para que cargue completamente
-                    return True
-            
-            escribir_log("⚠️ No se pudo confirmar que HeroSMS-Partners se haya abierto")
-            return True  # Retornar True igual para no bloquear el flujo
-        else:
-            escribir_log(f"❌ No se encontró HeroSMS-Partners en: {simclient_path}")
-            return False
-            
-    except Exception as e:
-        escribir_log(f"❌ Error al abrir HeroSMS-Partners: {e}")
-        return False
+        async def flujo_modem(puerto):
+            try:
+                flujo = asyncio.create_task(flujos[puerto].ejecutar(), name=f"Corrutina-{puerto}")
+                await asyncio.wait_for(flujo, Settings.TIMEOUT_FLUJO_MODEM)
+            except asyncio.TimeoutError:
+                escribir_log(f"⏱️ [{puerto}] Flujo cancelado tras {Settings.TIMEOUT_FLUJO_MODEM}s")
+        
+        motor_serial.ejecutar_en_flota(
+            list(flujos), flujo_modem,
+            al_terminar=(lambda puerto, _: al_terminar(flujos[puerto])) if al_terminar else None
+        )
+        return flujos
+    
+    @staticmethod
+    def en_curso(flujos: dict) -> str:
+        """'reset 3 | sim_lista 12 | ...' con los módems que siguen en cada estado"""
+        conteo = Counter(flujo.estado for flujo in flujos.values() if flujo.estado != ESTADO_LISTO)
+        return " | ".join(f"{estado} {conteo[estado]}" for estado in ESTADOS_MODEM if conteo[estado])
+    
+    @staticmethod
+    def resumen(flujos: dict) -> list:
+        """Por estado: módems que lo alcanzaron, desenlaces y duración p50 / máxima"""
+        filas = []
+        for estado in ESTADOS_MODEM:
+            pasos = [flujo.paso(estado) for flujo in flujos.values()]
+            pasos = [p for p in pasos if p]
+            if not pasos:
+                continue
+            duraciones = sorted(p.segundos for p in pasos)
+            desenlaces = Counter(p.desenlace for p in pasos)
+            filas.append({
+                "estado": estado,
+                "modems": len(pasos),
+                "ok": desenlaces[DESENLACE_OK],
+                "fallo": desenlaces[DESENLACE_FALLO],
+                "omitido": desenlaces[DESENLACE_OMITIDO],
+                "p50": duraciones[len(duraciones) // 2],
+                "max": duraciones[-1],
+            })
+        return filas
+    
+    def mostrar_resumen(self, flujos: dict):
+        table = Table(title="Estados por módem")
+        table.add_column("Estado", style="cyan")
+        for columna in ("Módems", "OK", "Fallo", "Omitido", "p50 (s)", "Máx (s)"):
+            table.add_column(columna, justify="right")
+        for fila in self.resumen(flujos):
+            table.add_row(fila["estado"], str(fila["modems"]), str(fila["ok"]), str(fila["fallo"]),
+                          str(fila["omitido"]), f"{fila['p50']:.1f}", f"{fila['max']:.1f}")
+        console.print(table)
+        if flujos:
+            mas_lento = max(flujos.values(), key=lambda flujo: flujo.segundos)
+            escribir_log(f"⏱️ Módem más lento: {mas_lento.puerto} en {mas_lento.segundos:.1f}s")
+
+planificador_modems = PlanificadorModems()
 
 # ==================== FUNCIÓN PRINCIPAL DE ROTACIÓN ====================
-def cambiar_slot_pool(pool_name: str, pool_config: dict, slot_base: int):
+@trazar(pista=lambda pool_name, pool_config, *_args, **_kwargs: pool_config.get("com"))
+def cambiar_slot_pool(pool_name: str, pool_config: dict, slot_base: int, iccids_previos: dict = None):
     """Cambia todos los puertos lógicos de un pool al slot especificado con offset
     
     v2.5.0: Ahora verifica que el ICCID cambió después del comando SWIT
+    v2.30.0: Si se pasa 'iccids_previos', se completa con los ICCID leídos antes del SWIT
     """
     sim_bank_com = pool_config["com"]
     puertos_logicos = pool_config["puertos"]
     offset_slot = pool_config.get("offset_slot", 0)
     
     # Calcular el slot real para este pool (con offset circular)
-    slot_real = ((slot_base - 1 + offset_slot) % Settings.SLOT_MAX) + 1
-    slot_formateado = f"{slot_real:04d}"
+    slot_real = slot_real_pool(pool_config, slot_base)
     
     console.print(f"[blue]  🔄 {pool_name}: Slot {slot_real:02d} (base {slot_base:02d} + offset {offset_slot}) en {sim_bank_com}[/blue]")
     
-    # PASO 1: Obtener ICCIDs actuales de algunos módems del pool (para verificar cambio)
-    # Nota: puertos_mapeados solo tiene el número lógico, no sabemos qué pool es cada uno
-    # Usamos todos los puertos mapeados que no estén en blacklist
-    modems_pool = [puerto for puerto in puertos_mapeados.keys() if puerto not in Settings.PUERTOS_BLACKLIST]
-    
-    # Tomar muestra de 3 módems para verificar (no todos para ser más rápido)
-    modems_muestra = modems_pool[:3] if len(modems_pool) >= 3 else modems_pool
+    # PASO 1: Obtener ICCIDs actuales de los módems del pool (para verificar cambio)
+    # v2.26.0: Con topología vigente se verifican exactamente los módems de este pool
+    modems_pool = [puerto for puerto in topologia_pools.modems_de_pool(pool_name)
+                   if puerto not in Settings.PUERTOS_BLACKLIST and disyuntores.disponible(puerto)]
+    modems_exactos = bool(modems_pool)
+    if modems_exactos:
+        modems_muestra = modems_pool
+    else:
+        # Sin topología no se sabe qué pool es cada módem: muestra de 3 puertos mapeados
+        modems_pool = [puerto for puerto in puertos_mapeados.keys() if puerto not in Settings.PUERTOS_BLACKLIST]
+        modems_muestra = modems_pool[:3] if len(modems_pool) >= 3 else modems_pool
     iccids_anteriores = {}
     
     if modems_muestra and not Settings.MODO_DRY_RUN:
-        for puerto_modem in modems_muestra:
-            iccid = obtener_iccid_modem_rapido(puerto_modem, timeout=1.5)
-            if iccid:
-                iccids_anteriores[puerto_modem] = iccid
+        with traza_rotacion.tramo("leer_iccids_previos", modems=len(modems_muestra)):
+            for puerto_modem in modems_muestra:
+                iccid = estado_modems.iccid(puerto_modem) or obtener_iccid_modem_rapido(puerto_modem, timeout=1.5)
+                if iccid:
+                    iccids_anteriores[puerto_modem] = iccid
+    if iccids_previos is not None:
+        iccids_previos.update(iccids_anteriores)
     
     # PASO 2: Enviar comandos SWIT
-    comandos_ok = 0
-    comandos_error = 0
-    
-    for puerto_logico in puertos_logicos:
-        # FORMATO JAVA: AT+SWIT%02d-%04d (puerto con 2 dígitos, slot con 4)
-        puerto_formateado = f"{int(puerto_logico):02d}" if isinstance(puerto_logico, str) else f"{puerto_logico:02d}"
-        comando = f"AT+SWIT{puerto_formateado}-{slot_formateado}"
-        respuesta = enviar_comando(sim_bank_com, comando, espera=1.0)
-        
-        # Verificar si el comando fue exitoso
-        if "OK" in respuesta or not respuesta:  # Algunos SIM Banks no responden con OK
-            comandos_ok += 1
-        elif "ERROR" in respuesta:
-            comandos_error += 1
-        
-        time.sleep(0.5)
+    # v2.27.0: En ráfaga sobre una sola sesión del controlador, con acuse por puerto
+    acuses = controladores_simbank.cambiar_puertos(sim_bank_com, {p: slot_real for p in puertos_logicos})
+    comandos_ok = sum(1 for acuse in acuses.values() if swit_aceptado(acuse))
+    comandos_error = len(acuses) - comandos_ok
     
     # PASO 3: Esperar a que se apliquen los cambios mecánicos
-    time.sleep(Settings.TIEMPO_APLICAR_SLOT)
+    # v2.28.0: Termina cuando cambió el ICCID de todos los módems observados. Con topología la
+    # muestra es exactamente este pool y el deadline es el techo; sin ella la muestra puede ser de
+    # otro pool, así que el deadline sigue siendo la espera aprendida
+    if modems_exactos:
+        espera_slot = Settings.TIEMPO_APLICAR_SLOT
+    else:
+        espera_slot = espera_adaptativa(ESPERA_APLICAR_SLOT, Settings.TIEMPO_APLICAR_SLOT, list(iccids_anteriores) or None)
+    iccids_nuevos = esperar_aplicacion_slot(iccids_anteriores, espera_slot)
     
     # PASO 4: Verificar que los ICCIDs cambiaron
-    cambios_verificados = 0
-    sin_cambio = 0
-    
-    if iccids_anteriores and not Settings.MODO_DRY_RUN:
-        for puerto_modem, iccid_anterior in iccids_anteriores.items():
-            iccid_nuevo = obtener_iccid_modem_rapido(puerto_modem, timeout=1.5)
-            
-            if iccid_nuevo:
-                if iccid_nuevo != iccid_anterior:
-                    cambios_verificados += 1
-                else:
-                    sin_cambio += 1
-                    escribir_log(f"⚠️ [{puerto_modem}] ICCID no cambió: {iccid_anterior}")
-    
-    # PASO 5: Reintentar si muchos módems no cambiaron
-    if sin_cambio > 0 and sin_cambio >= cambios_verificados:
+    cambios_verificados = len(iccids_nuevos)
+    sin_cambio = len(iccids_anteriores) - cambios_verificados
+    for puerto_modem, iccid_anterior in iccids_anteriores.items():
+        if puerto_modem not in iccids_nuevos:
+            escribir_log(f"⚠️ [{puerto_modem}] ICCID no cambió: {iccid_anterior}")
+    
+    # PASO 5: Reintentar los puertos que no cambiaron
+    sin_cambiar = {p: iccid for p, iccid in iccids_anteriores.items() if p not in iccids_nuevos}
+    if sin_cambiar and modems_exactos:
+        # v2.29.0: Con topología se reintenta solo cada puerto atascado, en segundo plano
+        for puerto_modem, iccid_anterior in sin_cambiar.items():
+            _, puerto_logico = topologia_pools.ubicacion(puerto_modem)
+            reintentos_swit.iniciar(pool_name, sim_bank_com, puerto_logico, slot_real, puerto_modem, iccid_anterior)
+        escribir_log(f"⚠️ {pool_name}: reintentando SWIT en {len(sin_cambiar)} puertos "
+                     f"({', '.join(topologia_pools.ubicacion(p)[1] for p in sin_cambiar)}); el resto del pool sigue")
+    elif sin_cambio > 0 and sin_cambio >= cambios_verificados:
         escribir_log(f"⚠️ {pool_name}: {sin_cambio}/{len(iccids_anteriores)} módems no cambiaron ICCID, reintentando...")
         
-        # Reenviar comandos SWIT
-        for puerto_logico in puertos_logicos:
-            # FORMATO JAVA: AT+SWIT%02d-%04d
-            puerto_formateado = f"{int(puerto_logico):02d}" if isinstance(puerto_logico, str) else f"{puerto_logico:02d}"
-            comando = f"AT+SWIT{puerto_formateado}-{slot_formateado}"
-            enviar_comando(sim_bank_com, comando, espera=1.0)
-            time.sleep(0.5)
-        
-        # Esperar más tiempo
-        time.sleep(Settings.TIEMPO_APLICAR_SLOT + 3)
+        # Sin topología no se sabe qué puerto lógico es cada módem: se reenvía el pool completo
+        controladores_simbank.cambiar_puertos(sim_bank_com, {p: slot_real for p in puertos_logicos})
         
-        # Verificar de nuevo
-        cambios_verificados_2 = 0
-        for puerto_modem, iccid_anterior in iccids_anteriores.items():
-            iccid_nuevo = obtener_iccid_modem_rapido(puerto_modem, timeout=1.5)
-            if iccid_nuevo and iccid_nuevo != iccid_anterior:
-                cambios_verificados_2 += 1
+        # Esperar de nuevo solo por los que no cambiaron
+        iccids_nuevos.update(esperar_aplicacion_slot(sin_cambiar, Settings.TIEMPO_APLICAR_SLOT + 3))
+        cambios_verificados_2 = len(iccids_nuevos)
         
         if cambios_verificados_2 > cambios_verificados:
             escribir_log(f"✅ {pool_name}: Reintento exitoso, {cambios_verificados_2}/{len(iccids_anteriores)} módems cambiaron")
@@ -1930,37 +5240,52 @@ def cambiar_slot_pool(pool_name: str, pool_config: dict, slot_base: int):
     
     return comandos_ok, comandos_error
 
-def marcar_puerto_inestable(puerto: str):
-    """Marca un puerto como inestable por fallos consecutivos"""
-    if puerto not in puertos_inestables:
-        puertos_inestables[puerto] = {"fallos": 0, "ultima_vez": datetime.now()}
+@trazar()
+def esperar_aplicacion_slot(iccids_anteriores: dict, espera: float) -> dict:
+    """Espera a que cambie el ICCID de los módems observados, o a que venzan 'espera' segundos
     
-    puertos_inestables[puerto]["fallos"] += 1
-    puertos_inestables[puerto]["ultima_vez"] = datetime.now()
+    v2.28.0: Ya no duerme 'espera' completo. El ICCID se lee con backoff (desde
+    APLICAR_SLOT_SONDEO_INICIAL hasta ADAPTATIVO_INTERVALO_SONDEO) y un URC de SIM lista
+    adelanta la lectura; retorna en cuanto todos cambiaron. Sin módems que observar
+    (o en DRY RUN) no hay cómo detectar el fin y se duerme 'espera'.
+    Cada módem cuyo ICCID cambia aporta una muestra de APLICAR_SLOT a tiempos_adaptativos.
     
-    if puertos_inestables[puerto]["fallos"] >= Settings.UMBRAL_PUERTO_INESTABLE:
-        escribir_log(f"⚠️ Puerto {puerto} marcado como INESTABLE ({puertos_inestables[puerto]['fallos']} fallos)")
-        return True
-    return False
-
-def es_puerto_inestable(puerto: str) -> bool:
-    """Verifica si un puerto está actualmente marcado como inestable"""
-    if puerto not in puertos_inestables:
-        return False
-    
-    # Si ya pasó 1 hora, rehabilitar el puerto
-    delta = datetime.now() - puertos_inestables[puerto]["ultima_vez"]
-    if delta.total_seconds() > 3600:  # 1 hora
-        escribir_log(f"✅ Puerto {puerto} rehabilitado (pasó 1 hora)")
-        del puertos_inestables[puerto]
-        return False
+    Returns:
+        dict: {puerto: iccid_nuevo} de los módems cuyo ICCID cambió
+    """
+    if Settings.MODO_DRY_RUN or not iccids_anteriores:
+        time.sleep(espera)
+        return {}
     
-    return puertos_inestables[puerto]["fallos"] >= Settings.UMBRAL_PUERTO_INESTABLE
-
-def limpiar_puerto_inestable(puerto: str):
-    """Limpia el marcador de puerto inestable (cuando funciona OK)"""
-    if puerto in puertos_inestables:
-        del puertos_inestables[puerto]
+    inicio = time.time()
+    limite = time.monotonic() + espera
+    pendientes = dict(iccids_anteriores)
+    cambiados = {}
+    if Settings.TIEMPOS_ADAPTATIVOS:
+        for puerto in pendientes:
+            tiempos_adaptativos.iniciar(ESPERA_APLICAR_SLOT, puerto)
+    
+    intervalo = Settings.APLICAR_SLOT_SONDEO_INICIAL
+    ultima_lectura = inicio
+    while pendientes:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            break
+        bus_urc.esperar_alguno(list(pendientes), (URC_SIM_LISTA,), min(intervalo, restante), desde=ultima_lectura)
+        intervalo = min(intervalo * 2, Settings.ADAPTATIVO_INTERVALO_SONDEO)
+        ultima_lectura = time.time()
+        for puerto, iccid_anterior in list(pendientes.items()):
+            iccid = obtener_iccid_modem_rapido(puerto, timeout=1.5)
+            if iccid and iccid != iccid_anterior:
+                cambiados[puerto] = iccid
+                del pendientes[puerto]
+                if Settings.TIEMPOS_ADAPTATIVOS:
+                    tiempos_adaptativos.completar(ESPERA_APLICAR_SLOT, puerto)
+    
+    tiempos_adaptativos.descartar(ESPERA_APLICAR_SLOT, list(pendientes))
+    escribir_log(f"🔁 Slot aplicado en {len(cambiados)}/{len(iccids_anteriores)} módems en {time.time() - inicio:.1f}s"
+                 + (f" (sin cambio: {', '.join(pendientes)})" if pendientes else ""))
+    return cambiados
 
 def obtener_modems_activos():
     """Obtiene lista de puertos COM disponibles (excluyendo blacklist e inestables)"""
@@ -1982,10 +5307,10 @@ def obtener_modems_activos():
     if blacklist_count > 0:
         escribir_log(f"🚫 {blacklist_count} puertos excluidos por blacklist: {', '.join(Settings.PUERTOS_BLACKLIST)}")
     
-    # Filtrar puertos inestables
-    modems_activos = [p for p in modems_activos if not es_puerto_inestable(p)]
+    # Filtrar puertos inestables (disyuntor abierto y enfriamiento sin vencer)
+    modems_activos = [p for p in modems_activos if disyuntores.disponible(p)]
     
-    inestables_count = len([p for p in puertos_disponibles if es_puerto_inestable(p)])
+    inestables_count = len([p for p in puertos_disponibles if not disyuntores.disponible(p)])
     if inestables_count > 0:
         escribir_log(f"⚠️ {inestables_count} puertos excluidos por inestabilidad")
     
@@ -2063,28 +5388,45 @@ def cambiar_slot_simbank(slot: int, iteracion: int, abrir_programa_al_final: boo
     if not Settings.MODO_ACTIVACION_MASIVA or slot == Settings.SLOT_MIN:
         cerrar_simclient()
     
-    # 2. Cerrar puertos serial
-    cerrar_puertos_serial()
+    # 2. v2.23.0: Los puertos ajenos no se tocan y las sesiones propias del pool se mantienen abiertas
+    registro_latencias.reiniciar()
+    reintentos_swit.reiniciar()
+    estado_modems.reiniciar()
+    traza_rotacion.abrir()
     
     # 3. Cargar mapeo de puertos desde SimClient
     console.print("[cyan]📂 Cargando configuración de puertos...[/cyan]")
     cargar_mapeo_puertos()
     
-    # 4. Enviar comandos de cambio de slot a todos los SIM Banks en paralelo
+    # 4. v2.26.0: Si la topología guardada no es vigente, se redescubre cambiando puerto por puerto
+    # (esos pools ya quedan en el slot nuevo y no se vuelven a cambiar)
+    pools_descubiertos = {}
+    if Settings.TOPOLOGIA_AUTO and not Settings.MODO_DRY_RUN and not topologia_pools.vigente():
+        pools_descubiertos = topologia_pools.descubrir(slot)
+    
+    # 4.1 Enviar comandos de cambio de slot a todos los SIM Banks en paralelo
     console.print(f"[bold blue]📡 Enviando comandos de cambio a slot {slot:02d} en todos los pools...[/bold blue]")
     
-    hilos_cambio = []
-    for pool_name, pool_config in SIM_BANKS.items():
-        hilo = threading.Thread(
-            target=cambiar_slot_pool,
-            args=(pool_name, pool_config, slot)
-        )
-        hilo.start()
-        hilos_cambio.append(hilo)
+    # v2.31.0: Se junta el ICCID de cada módem antes del SWIT (lo lee cambiar_slot_pool)
+    def cambiar_pool(pool_name):
+        previos = {}
+        cambiar_slot_pool(pool_name, SIM_BANKS[pool_name], slot, previos)
+        return previos
     
-    # Esperar a que todos los cambios se completen
-    for hilo in hilos_cambio:
-        hilo.join()
+    with traza_rotacion.tramo("cambio_de_slot", slot=slot):
+        leidos_por_pool = ejecutor_rotacion.mapear(
+            cambiar_pool, [pool_name for pool_name in SIM_BANKS if pool_name not in pools_descubiertos],
+            timeout=Settings.TIMEOUT_CAMBIO_POOL
+        )
+    iccids_previos = {}
+    ambiguos = set()
+    for previos in leidos_por_pool.values():
+        for puerto, iccid in (previos or {}).items():
+            # Sin topología los pools comparten la muestra: si dos lecturas difieren, una ya fue posterior a un SWIT
+            if iccids_previos.setdefault(puerto, iccid) != iccid:
+                ambiguos.add(puerto)
+    for puerto in ambiguos:
+        del iccids_previos[puerto]
     
     console.print("[green]✅ Comandos enviados y verificados en todos los pools[/green]")
     
@@ -2103,115 +5445,43 @@ def cambiar_slot_simbank(slot: int, iteracion: int, abrir_programa_al_final: boo
         console.print("[yellow]   Se continuará solo con cambio de slots...[/yellow]")
         escribir_log("⚠️ No hay módems para verificar - Continuando sin verificación")
     
-    # 7. Revisar y reiniciar todos los módems en paralelo
-    console.print("[bold blue]🔍 Paso 1/3: Verificando y reiniciando módems...[/bold blue]")
-    
-    modems_ok = 0
-    modems_lock = threading.Lock()
-    
-    def revisar_y_contar(puerto):
-        nonlocal modems_ok
-        if revisar_puerto(puerto):
-            with modems_lock:
-                modems_ok += 1
+    # 7. v2.31.0: Cada módem recorre por su cuenta reset → SIM lista → ICCID verificado →
+    # registrado → señal OK → activación, sin esperar a los demás entre fases. El ICCID previo
+    # es el leído por cambiar_slot_pool antes del SWIT
+    console.print("[bold blue]🔍 Paso 1/3: Reinicio, SIM, ICCID, registro y activación por módem...[/bold blue]")
+    if Settings.ACTIVAR_SIMS_CLARO:
+        log_activacion(f"\n{'='*80}")
+        log_activacion(f"🔄 INICIANDO ACTIVACIÓN - SLOT {slot:02d} - ITERACIÓN #{iteracion}")
+        log_activacion(f"{'='*80}")
     
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
         console=console
     ) as progress:
-        task = progress.add_task("[cyan]Reiniciando módems...", total=len(modems_activos))
+        task = progress.add_task("[cyan]Módems...", total=len(modems_activos))
+        flujos_en_curso = {}
         
-        hilos_revision = []
-        for puerto_modem in modems_activos:
-            hilo = threading.Thread(target=revisar_y_contar, args=(puerto_modem,))
-            hilo.start()
-            hilos_revision.append(hilo)
+        def al_terminar_flujo(flujo):
+            progress.update(task, advance=1,
+                            description=f"[cyan]Módems... {planificador_modems.en_curso(flujos_en_curso)}")
         
-        for hilo in hilos_revision:
-            hilo.join()
-            progress.update(task, advance=1)
-    
-    console.print(f"[green]✅ Módems reiniciados: {modems_ok}/{len(modems_activos)}[/green]")
-    
-    # 7.5 NUEVO: Esperar tiempo adicional después de AT+CFUN=1,1 (como test_capturas_rapido.py)
-    console.print(f"[bold blue]⏳ Esperando {Settings.TIEMPO_CFUN_RESET}s para reinicio completo (UC20)...[/bold blue]")
-    escribir_log(f"Esperando {Settings.TIEMPO_CFUN_RESET}s para:")
-    escribir_log("  - Reinicio del módulo")
-    escribir_log("  - Detección de nueva SIM (ICCID)")
-    escribir_log("  - Inicialización de stack GSM")
-    escribir_log("  - Búsqueda de red")
-    time.sleep(Settings.TIEMPO_CFUN_RESET)
-    escribir_log("✅ Reinicio completado")
-    
-    # 8. NUEVO: Leer ICCIDs ANTES del cambio (para verificar que cambien después)
-    console.print("[bold blue]🔍 Paso 2/3a: Leyendo ICCIDs ANTES del cambio de slot...[/bold blue]")
-    iccids_antes_cambio = {}
-    
-    def leer_iccid_previo(puerto):
-        iccid = obtener_iccid_modem_rapido(puerto, timeout=1.5)
-        if iccid:
-            iccids_antes_cambio[puerto] = iccid
-    
-    hilos_lectura_previa = []
-    for puerto_modem in modems_activos[:10]:  # Muestra de 10 módems
-        hilo = threading.Thread(target=leer_iccid_previo, args=(puerto_modem,))
-        hilo.start()
-        hilos_lectura_previa.append(hilo)
-    
-    for hilo in hilos_lectura_previa:
-        hilo.join()
-    
-    escribir_log(f"📋 ICCIDs leídos ANTES del cambio: {len(iccids_antes_cambio)}")
+        flujos = planificador_modems.ejecutar(modems_activos, iccids_previos, al_terminar=al_terminar_flujo,
+                                              al_crear=flujos_en_curso.update)
     
-    # 9. Esperar a que los módems detecten las nuevas SIM
-    console.print("[bold blue]🔍 Paso 2/3b: Esperando detección de SIM en todos los módems...[/bold blue]")
-    console.print("[yellow]⏳ Esto puede tomar 20-40 segundos...[/yellow]")
-    
-    sims_listas = 0
-    iccids_verificados = {}
-    iccids_sin_cambio = 0
-    
-    def esperar_sim_y_verificar(puerto):
-        nonlocal sims_listas, iccids_sin_cambio
-        # Esperar a que la SIM esté lista (OPTIMIZADO UC20: 20 intentos)
-        if esperar_sim_lista(puerto, max_intentos=20):
-            # Obtener ICCID para confirmar cambio
-            iccid = obtener_iccid_modem(puerto)
-            if iccid:
-                # Verificar si cambió respecto al anterior
-                if puerto in iccids_antes_cambio:
-                    if iccid == iccids_antes_cambio[puerto]:
-                        escribir_log(f"⚠️ [{puerto}] ICCID NO CAMBIÓ: {iccid}")
-                        with modems_lock:
-                            iccids_sin_cambio += 1
-                        return False
-                    else:
-                        escribir_log(f"✅ [{puerto}] ICCID cambió: {iccids_antes_cambio[puerto]} → {iccid}")
-                
-                iccids_verificados[puerto] = iccid
-                with modems_lock:
-                    sims_listas += 1
-                return True
-        return False
+    planificador_modems.mostrar_resumen(flujos)
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("[cyan]Verificando SIMs...", total=len(modems_activos))
-        
-        hilos_sim = []
-        for puerto_modem in modems_activos:
-            hilo = threading.Thread(target=esperar_sim_y_verificar, args=(puerto_modem,))
-            hilo.start()
-            hilos_sim.append(hilo)
-        
-        for hilo in hilos_sim:
-            hilo.join()
-            progress.update(task, advance=1)
+    modems_ok = sum(1 for flujo in flujos.values() if flujo.alcanzo(ESTADO_RESET))
+    iccids_verificados = {puerto: flujo.iccid for puerto, flujo in flujos.items() if flujo.alcanzo(ESTADO_ICCID)}
+    sims_listas = len(iccids_verificados)
+    puertos_sin_cambio = [puerto for puerto, flujo in flujos.items()
+                          if flujo.fallido_en == ESTADO_ICCID and flujo.iccid and flujo.iccid == flujo.iccid_previo]
+    iccids_sin_cambio = len(puertos_sin_cambio)
+    registrados = sum(1 for flujo in flujos.values() if flujo.alcanzo(ESTADO_REGISTRO))
     
+    console.print(f"[green]✅ Módems reiniciados: {modems_ok}/{len(modems_activos)}[/green]")
     console.print(f"[green]✅ SIMs listas y verificadas: {sims_listas}/{len(modems_activos)}[/green]")
     
     # Mostrar estadísticas de cambios de ICCID
@@ -2225,118 +5495,60 @@ def cambiar_slot_simbank(slot: int, iteracion: int, abrir_programa_al_final: boo
             console.print(f"[bold red]   → Verificar SIM Banks físicamente (switches mecánicos)[/bold red]")
             console.print(f"[bold red]   → Posible problema hardware en controladores de pools[/bold red]")
             escribir_log(f"🚨 ALERTA CRÍTICA: {iccids_sin_cambio} ICCIDs duplicados > umbral {Settings.UMBRAL_ICCIDS_DUPLICADOS}")
-            
-            # Listar todos los puertos con ICCID sin cambio
-            puertos_sin_cambio = [puerto for puerto in modems_activos 
-                                  if puerto in iccids_antes_cambio and 
-                                  puerto in iccids_verificados and 
-                                  iccids_antes_cambio[puerto] == iccids_verificados[puerto]]
-            if puertos_sin_cambio:
-                console.print(f"[red]   Puertos problemáticos: {', '.join(puertos_sin_cambio[:10])}{'...' if len(puertos_sin_cambio) > 10 else ''}[/red]")
-                escribir_log(f"   Puertos sin cambio de ICCID: {', '.join(puertos_sin_cambio)}")
+            console.print(f"[red]   Puertos problemáticos: {', '.join(puertos_sin_cambio[:10])}{'...' if len(puertos_sin_cambio) > 10 else ''}[/red]")
+            escribir_log(f"   Puertos sin cambio de ICCID: {', '.join(puertos_sin_cambio)}")
     
     # Mostrar algunos ICCIDs como confirmación
     if iccids_verificados:
         console.print("[dim]📋 Muestra de ICCIDs detectados:[/dim]")
-        for i, (puerto, iccid) in enumerate(list(iccids_verificados.items())[:5]):
-            # Mostrar si cambió
-            if puerto in iccids_antes_cambio:
-                cambio = "✅" if iccid != iccids_antes_cambio[puerto] else "⚠️"
-                console.print(f"[dim]   {cambio} {puerto}: {iccid}[/dim]")
+        for puerto, iccid in list(iccids_verificados.items())[:5]:
+            if flujos[puerto].iccid_previo:
+                console.print(f"[dim]   ✅ {puerto}: {iccid}[/dim]")
             else:
                 console.print(f"[dim]   {puerto}: {iccid}[/dim]")
         if len(iccids_verificados) > 5:
             console.print(f"[dim]   ... y {len(iccids_verificados) - 5} más[/dim]")
     
-    # 8.5 NUEVO: Verificar registro en red (compatible con HeroSMS Java dv.java)
-    console.print("[bold blue]🔍 Paso 2.5/3: Verificando registro en red...[/bold blue]")
-    registrados, sin_registrar = verificar_registro_modems_global(modems_activos)
-    
     porcentaje_actual = (registrados / len(modems_activos)) * 100 if len(modems_activos) > 0 else 0
-    console.print(f"[cyan]📊 {registrados} registrados | {sin_registrar} sin registrar ({porcentaje_actual:.0f}%)[/cyan]")
+    console.print(f"[cyan]📊 {registrados} registrados | {sims_listas - registrados} sin registrar ({porcentaje_actual:.0f}%)[/cyan]")
     escribir_log(f"📊 Registro en red: {registrados}/{len(modems_activos)} registrados ({porcentaje_actual:.0f}%)")
-    
-    # Mostrar advertencia si el porcentaje es bajo, pero CONTINUAR (no esperar)
     if porcentaje_actual < 70:
-        console.print(f"[yellow]⚠️  Registro limitado ({porcentaje_actual:.0f}%), pero continuando con activación[/yellow]")
-        escribir_log(f"⚠️  Registro limitado ({porcentaje_actual:.0f}%), continuando de todas formas")
+        console.print(f"[yellow]⚠️  Registro limitado ({porcentaje_actual:.0f}%)[/yellow]")
+        escribir_log(f"⚠️  Registro limitado ({porcentaje_actual:.0f}%)")
     
-    # 9. ACTIVACIÓN DE SIMS CLARO (si está habilitada)
+    # 9. Resumen de la activación de SIMs Claro (hecha dentro de cada flujo)
     if Settings.ACTIVAR_SIMS_CLARO and iccids_verificados:
-        console.print("\n[bold magenta]{'='*80}[/bold magenta]")
-        console.print("[bold magenta]📞 ACTIVACIÓN DE SIMS CLARO[/bold magenta]")
-        console.print("[bold magenta]{'='*80}[/bold magenta]\n")
-        
-        log_activacion(f"\n{'='*80}")
-        log_activacion(f"🔄 INICIANDO ACTIVACIÓN - SLOT {slot:02d} - ITERACIÓN #{iteracion}")
-        log_activacion(f"{'='*80}")
-        
-        activaciones_exitosas = 0
-        activaciones_fallidas = 0
-        sims_claro = 0
-        numeros_obtenidos = []
-        
-        # Procesar activación en paralelo
-        resultados_activacion = []
-        
-        def activar_y_guardar(puerto):
-            # Pasar el ICCID anterior si lo tenemos
-            iccid_anterior = iccids_antes_cambio.get(puerto, None)
-            resultado = procesar_activacion_sim(puerto, iccid_anterior=iccid_anterior)
-            resultados_activacion.append(resultado)
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console
-        ) as progress:
-            task = progress.add_task("[magenta]Activando SIMs Claro...", total=len(iccids_verificados))
-            
-            hilos_activacion = []
-            for puerto_modem in iccids_verificados.keys():
-                hilo = threading.Thread(target=activar_y_guardar, args=(puerto_modem,))
-                hilo.start()
-                hilos_activacion.append(hilo)
-            
-            for hilo in hilos_activacion:
-                hilo.join()
-                progress.update(task, advance=1)
-        
-        # Procesar resultados
-        for resultado in resultados_activacion:
-            if obtener_operador(resultado.get("iccid", "")) == "Claro":
-                sims_claro += 1
-                if resultado["activado"] and resultado["numero"]:
-                    activaciones_exitosas += 1
-                    numeros_obtenidos.append(resultado["numero"])
-                else:
-                    activaciones_fallidas += 1
+        claro = [flujo for flujo in flujos.values() if flujo.iccid and obtener_operador(flujo.iccid) == "Claro"]
+        activaciones_exitosas = sum(1 for flujo in claro if flujo.paso(ESTADO_ACTIVACION)
+                                    and flujo.paso(ESTADO_ACTIVACION).desenlace == DESENLACE_OK)
+        activaciones_fallidas = len(claro) - activaciones_exitosas
+        numeros_obtenidos = [flujo.activacion["numero"] for flujo in claro
+                             if flujo.activacion and flujo.activacion["numero"]]
         
-        # Mostrar resumen
         console.print(f"\n[bold magenta]📊 RESUMEN DE ACTIVACIÓN:[/bold magenta]")
-        console.print(f"[magenta]  • SIMs Claro detectadas: {sims_claro}[/magenta]")
+        console.print(f"[magenta]  • SIMs Claro detectadas: {len(claro)}[/magenta]")
         console.print(f"[green]  • Activaciones exitosas: {activaciones_exitosas}[/green]")
         console.print(f"[red]  • Activaciones fallidas: {activaciones_fallidas}[/red]")
         
         if numeros_obtenidos:
             console.print(f"\n[dim]📱 Muestra de números obtenidos:[/dim]")
-            for i, num in enumerate(numeros_obtenidos[:5]):
+            for num in numeros_obtenidos[:5]:
                 console.print(f"[dim]   {num}[/dim]")
             if len(numeros_obtenidos) > 5:
                 console.print(f"[dim]   ... y {len(numeros_obtenidos) - 5} más[/dim]")
         
         log_activacion(f"\n📊 RESUMEN FINAL:")
-        log_activacion(f"  • SIMs Claro: {sims_claro}")
+        log_activacion(f"  • SIMs Claro: {len(claro)}")
         log_activacion(f"  • Exitosas: {activaciones_exitosas}")
         log_activacion(f"  • Fallidas: {activaciones_fallidas}")
         log_activacion(f"{'='*80}\n")
-        
-        console.print(f"[bold magenta]{'='*80}[/bold magenta]\n")
     
     # 10. Esperar tiempo adicional para estabilización completa (registro en red)
-    console.print("[bold blue]🔍 Paso 3/4: Estabilización final y registro en red...[/bold blue]")
-    console.print(f"[yellow]⏳ Esperando {Settings.TIEMPO_ESTABILIZACION_FINAL} segundos para registro completo en red...[/yellow]")
-    time.sleep(Settings.TIEMPO_ESTABILIZACION_FINAL)
+    # v2.31.0: Cada flujo ya esperó su registro; solo se espera si alguno quedó sin registrarse
+    if any(flujo.fallido_en == ESTADO_REGISTRO for flujo in flujos.values()):
+        console.print("[bold blue]🔍 Paso 3/4: Estabilización final y registro en red...[/bold blue]")
+        console.print(f"[yellow]⏳ Esperando {Settings.TIEMPO_ESTABILIZACION_FINAL} segundos para registro completo en red...[/yellow]")
+        time.sleep(Settings.TIEMPO_ESTABILIZACION_FINAL)
     
     # 11. Cerrar puertos serial nuevamente antes de abrir programa (solo si no es modo masivo)
     if not Settings.MODO_ACTIVACION_MASIVA:
@@ -2344,9 +5556,7 @@ def cambiar_slot_simbank(slot: int, iteracion: int, abrir_programa_al_final: boo
     
     # 12. Abrir programa solo si NO estamos en modo masivo O si se especifica explícitamente
     if abrir_programa_al_final and not Settings.MODO_ACTIVACION_MASIVA:
-        # 12.1 Esperar antes de abrir
-        console.print("[yellow]⏳ Esperando 3 segundos antes de abrir HeroSMS-Partners...[/yellow]")
-        time.sleep(3)
+        # 12.1 v2.23.0: Sin espera previa: los handles del rotador ya se cerraron en el paso 11
         
         # 12.2 Abrir SimClient
         abrir_simclient()
@@ -2389,10 +5599,16 @@ def cambiar_slot_simbank(slot: int, iteracion: int, abrir_programa_al_final: boo
         "iccids_verificados": iccids_verificados,
         "slots_activos": {pool: f"slot{((slot-1+config.get('offset_slot',0))%Settings.SLOT_MAX)+1:02d}" 
                          for pool, config in SIM_BANKS.items()},
-        "puertos_inestables": list(puertos_inestables.keys()),
-        "fallos_por_pool": dict(contador_fallos_pool)
+        "puertos_inestables": disyuntores.abiertos(),
+        "fallos_por_pool": dict(contador_fallos_pool),
+        "tiempos_por_estado": planificador_modems.resumen(flujos),
+        "estados_por_modem": {puerto: flujo.a_dict() for puerto, flujo in flujos.items()},
+        "lecturas_evitadas": dict(estado_modems.aciertos)
     }
     guardar_snapshot(slot, iteracion, snapshot_data)
+    registro_latencias.guardar(slot, iteracion)
+    traza_rotacion.cerrar(PISTA_ROTACION, slot, iteracion)
+    tiempos_adaptativos.guardar()
     
     escribir_log(f"✅ ROTACIÓN COMPLETADA - Slot {slot:02d}/{Settings.SLOT_MAX} ({porcentaje_final:.1f}%) - Iteración #{iteracion}")
     escribir_log(f"   Módems reiniciados: {modems_ok}/{len(modems_activos)}")
@@ -2439,7 +5655,13 @@ Ejemplos de uso:
   python RotadorSimBank.py --intervalo 15           # Cambiar intervalo (solo con --modo-continuo)
   python RotadorSimBank.py --dry-run                # Modo prueba sin hardware
   python RotadorSimBank.py --slot-start 10          # Comenzar desde slot 10
-  python RotadorSimBank.py --self-test              # Probar COM ports y salir
+  python RotadorSimBank.py --self-test              # Sondear toda la flota (matriz de salud) y salir
+  python RotadorSimBank.py --descubrir-topologia     # Aprender qué módem está en cada pool/puerto lógico
+  python RotadorSimBank.py --pools-independientes   # Activación masiva con cada pool a su propio ritmo
+  python RotadorSimBank.py --latencias              # Ver p50/p95/p99 por puerto y comando AT
+  python RotadorSimBank.py --latencias AT+CPIN --latencias-ultimas 5
+  python RotadorSimBank.py --verificar-parser       # Casos, fuzzing y benchmark del parser AT
+  python RotadorSimBank.py --verificar-disyuntor    # Recorrido del disyuntor por puerto (sin hardware)
   python RotadorSimBank.py --export-db              # Exportar PostgreSQL a archivo local
   python RotadorSimBank.py --clean-duplicates       # Limpiar duplicados del archivo
   python RotadorSimBank.py --update                 # Forzar actualización desde GitHub
@@ -2469,7 +5691,34 @@ Ejemplos de uso:
     parser.add_argument(
         "--self-test",
         action="store_true",
-        help="Probar COM ports de SIM Banks y salir"
+        help="Sondear en paralelo controladores y módems, mostrar la matriz de salud pool × puerto y salir"
+    )
+    
+    parser.add_argument(
+        "--descubrir-topologia",
+        action="store_true",
+        help="Cambiar un puerto lógico a la vez para aprender qué módem está en cada pool y salir"
+    )
+    
+    parser.add_argument(
+        "--pools-independientes",
+        action="store_true",
+        help="Activación masiva con un pipeline por pool: cada pool recorre sus slots sin esperar a los demás"
+    )
+    
+    parser.add_argument(
+        "--latencias",
+        nargs="?",
+        const="",
+        metavar="FILTRO",
+        help="Mostrar histogramas de latencia AT guardados y salir (FILTRO: puerto, verbo o 'global')"
+    )
+    
+    parser.add_argument(
+        "--latencias-ultimas",
+        type=int,
+        metavar="N",
+        help="Con --latencias: considerar solo las últimas N rotaciones"
     )
     
     parser.add_argument(
@@ -2526,6 +5775,18 @@ Ejemplos de uso:
         help="Instalar el agente como servicio de Windows"
     )
     
+    parser.add_argument(
+        "--verificar-parser",
+        action="store_true",
+        help="Verificar el parser de respuestas AT (casos conocidos, fuzzing y benchmark) y salir"
+    )
+    
+    parser.add_argument(
+        "--verificar-disyuntor",
+        action="store_true",
+        help="Verificar el disyuntor por puerto (abierto → semiabierto → rehabilitado) sin hardware y salir"
+    )
+    
     parser.add_argument(
         "--detectar-simbanks",
         action="store_true",
@@ -2535,45 +5796,613 @@ Ejemplos de uso:
     return parser.parse_args()
 
 # ==================== SELF TEST ====================
-def self_test():
-    """Prueba rápida de conectividad con SIM Banks"""
-    console.print("\n[bold cyan]🧪 AUTO-TEST DE SIM BANKS[/bold cyan]")
+SALUD_OK = "ok"
+SALUD_DEGRADADO = "degradado"
+SALUD_CAIDO = "caido"
+SALUD_FUERA_DE_SERVICIO = "fuera_de_servicio"
+SALUD_SIN_TIEMPO = "sin_tiempo"
+
+ICONOS_SALUD = {
+    SALUD_OK: "[green]✅",
+    SALUD_DEGRADADO: "[yellow]⚠️",
+    SALUD_CAIDO: "[red]❌",
+    SALUD_FUERA_DE_SERVICIO: "[red]⛔",
+    SALUD_SIN_TIEMPO: "[dim]⏱️",
+}
+
+async def _sondear_comandos(puerto: str, comandos: list, limite: float) -> dict:
+    """Envía los comandos en orden y mide cada uno: {comando: (respuesta, ms)}
+    
+    Se corta en el primer comando sin respuesta (el puerto no contesta y seguir solo
+    gasta presupuesto) o cuando se acaba el presupuesto (respuesta None).
+    """
+    resultados = {}
+    for comando in comandos:
+        restante = limite - time.monotonic()
+        if restante <= 0.05:
+            resultados[comando] = (None, None)
+            break
+        inicio = time.perf_counter()
+        respuesta = await motor_serial.comando(puerto, comando, timeout=min(Settings.SELF_TEST_TIMEOUT_COMANDO, restante),
+                                               log=False, prioridad=PRIORIDAD_RESET)
+        resultados[comando] = (respuesta, round((time.perf_counter() - inicio) * 1000, 1))
+        if not respuesta.strip():
+            break
+    return resultados
+
+def _salud_base(puerto: str, resultados: dict) -> dict:
+    respuesta_at, ms_at = resultados.get("AT", (None, None))
+    if respuesta_at is None:
+        estado = SALUD_SIN_TIEMPO
+    elif "OK" not in respuesta_at:
+        estado = SALUD_CAIDO
+    else:
+        estado = SALUD_OK
+    return {
+        "puerto": puerto,
+        "estado": estado,
+        "ms": ms_at,
+        "latencias_ms": {comando: ms for comando, (_, ms) in resultados.items() if ms is not None},
+        "problemas": [],
+    }
+
+async def sondear_controlador(puerto: str, limite: float) -> dict:
+    """AT al controlador de un SIM Bank (sin SWIT: el auto-test no cambia slots)"""
+    if disyuntores.abierto(puerto):
+        return {"puerto": puerto, "estado": SALUD_FUERA_DE_SERVICIO, "ms": None, "latencias_ms": {}, "problemas": ["disyuntor abierto"]}
+    salud = _salud_base(puerto, await _sondear_comandos(puerto, ["AT"], limite))
+    if salud["estado"] == SALUD_CAIDO:
+        salud["problemas"].append("no responde a AT")
+    return salud
+
+async def sondear_modem(puerto: str, limite: float) -> dict:
+    """AT, ICCID, CPIN, CSQ y CREG a un módem; clasifica el puerto y explica lo que falló"""
+    if disyuntores.abierto(puerto):
+        return {"puerto": puerto, "estado": SALUD_FUERA_DE_SERVICIO, "ms": None, "latencias_ms": {}, "problemas": ["disyuntor abierto"]}
+    
+    # Solo capacidades ya cacheadas: sondear GMM/GMR aquí se comería el presupuesto
+    capacidades = capacidades_modem.cacheadas(puerto)
+    comando_iccid = capacidades["comando_iccid"] if capacidades else COMANDOS_ICCID[0]
+    comandos = ["AT", comando_iccid, "AT+CPIN?", "AT+CSQ", "AT+CREG?"]
+    resultados = await _sondear_comandos(puerto, comandos, limite)
+    salud = _salud_base(puerto, resultados)
+    if salud["estado"] == SALUD_CAIDO:
+        salud["problemas"].append("no responde a AT")
+    if salud["estado"] != SALUD_OK:
+        return salud
+    
+    respuesta_iccid = resultados.get(comando_iccid, (None, None))[0]
+    respuesta_cpin = resultados.get("AT+CPIN?", (None, None))[0]
+    respuesta_csq = resultados.get("AT+CSQ", (None, None))[0]
+    respuesta_creg = resultados.get("AT+CREG?", (None, None))[0]
+    
+    iccid = parsear_iccid(respuesta_iccid or "")
+    csq = parsear_csq(respuesta_csq or "")
+    creg = parsear_creg(respuesta_creg or "")
+    salud.update({
+        "iccid": iccid.valor if iccid else None,
+        "luhn_valido": iccid.luhn_valido if iccid else None,
+        "sim_lista": bool(respuesta_cpin and "+CPIN: READY" in respuesta_cpin),
+        "csq": csq.rssi if csq else None,
+        "dbm": csq.dbm if csq else None,
+        "creg": creg.stat if creg else None,
+        "registrado": creg.registrado if creg else False,
+    })
+    
+    problemas = salud["problemas"]
+    if any(respuesta is None for respuesta, _ in resultados.values()) or len(resultados) < len(comandos):
+        problemas.append("presupuesto agotado")
+    else:
+        if not salud["sim_lista"]:
+            problemas.append("SIM no lista")
+        if not iccid:
+            problemas.append("sin ICCID")
+        if not csq or csq.desconocida or csq.rssi < Settings.CSQ_MINIMO:
+            problemas.append(f"señal insuficiente ({csq.rssi if csq else '?'}/31)")
+        if not salud["registrado"]:
+            problemas.append(f"no registrado (CREG {creg.stat if creg else '?'})")
+    if problemas:
+        salud["estado"] = SALUD_DEGRADADO
+    return salud
+
+def _celda_salud(salud: dict) -> str:
+    if not salud:
+        return "[dim]·[/dim]"
+    icono = ICONOS_SALUD[salud["estado"]]
+    latencia = f" {salud['ms']:.0f}" if salud.get("ms") is not None else ""
+    return f"{icono}{latencia}[/]"
+
+def self_test() -> dict:
+    """Auto-test en paralelo de controladores y módems con matriz de salud pool × puerto lógico
+    
+    v2.25.0: Todos los puertos se sondean a la vez en el motor asíncrono, con un presupuesto
+    total de SELF_TEST_PRESUPUESTO segundos. El resultado se imprime y se guarda en SELF_TEST_FILE.
+    """
+    console.print("\n[bold cyan]🧪 AUTO-TEST DE LA FLOTA[/bold cyan]")
     console.print("="*70)
     
-    puertos_disponibles = listar_puertos_disponibles()
+    if not SIM_BANKS:
+        inicializar_simbanks()
+    cargar_mapeo_puertos()
     
+    puertos_disponibles = listar_puertos_disponibles()
+    controladores = {config["com"]: pool_name for pool_name, config in SIM_BANKS.items()}
+    modems = obtener_modems_activos()
+    ubicacion = ubicar_modems(modems)
+    
+    faltantes = [puerto for puerto in controladores if puerto not in puertos_disponibles]
+    presentes = [puerto for puerto in controladores if puerto in puertos_disponibles]
+    
+    console.print(f"[cyan]Sondeando {len(presentes)} controladores y {len(modems)} módems "
+                  f"(presupuesto {Settings.SELF_TEST_PRESUPUESTO:.1f}s)...[/cyan]")
+    
+    inicio = time.monotonic()
+    limite = inicio + Settings.SELF_TEST_PRESUPUESTO
+    
+    async def sondear(puerto):
+        if puerto in controladores:
+            return await sondear_controlador(puerto, limite)
+        return await sondear_modem(puerto, limite)
+    
+    resultados = motor_serial.ejecutar_en_flota(presentes + modems, sondear)
+    duracion = time.monotonic() - inicio
+    
+    salud_controladores = {}
+    for puerto, pool_name in controladores.items():
+        salud = resultados.get(puerto)
+        if puerto in faltantes:
+            salud = {"puerto": puerto, "estado": SALUD_CAIDO, "ms": None, "latencias_ms": {}, "problemas": ["puerto no detectado"]}
+        elif salud is None:
+            salud = {"puerto": puerto, "estado": SALUD_CAIDO, "ms": None, "latencias_ms": {}, "problemas": ["error en el sondeo"]}
+        salud_controladores[pool_name] = salud
+    
+    salud_modems = {}
+    for puerto in modems:
+        salud = resultados.get(puerto) or {"puerto": puerto, "estado": SALUD_CAIDO, "ms": None, "latencias_ms": {}, "problemas": ["error en el sondeo"]}
+        pool_name, puerto_logico = ubicacion.get(puerto, (None, None))
+        salud.update({"numero_logico": puertos_mapeados.get(puerto), "pool": pool_name, "puerto_logico": puerto_logico})
+        salud_modems[puerto] = salud
+    
+    matriz = {pool_name: {} for pool_name in SIM_BANKS}
+    for puerto, salud in salud_modems.items():
+        if salud["pool"]:
+            matriz[salud["pool"]][salud["puerto_logico"]] = puerto
+    
+    # Matriz pool × puerto lógico
+    puertos_logicos = sorted({p for config in SIM_BANKS.values() for p in config["puertos"]})
+    table = Table(title=f"Salud de la flota ({duracion:.1f}s)", caption="Estado y latencia de AT en ms")
+    table.add_column("Pool", style="cyan")
+    table.add_column("Controlador")
+    for puerto_logico in puertos_logicos:
+        table.add_column(puerto_logico, justify="center")
     for pool_name, config in SIM_BANKS.items():
-        puerto = config["com"]
-        console.print(f"\n[bold]{pool_name} ({puerto}):[/bold]")
-        
-        if puerto not in puertos_disponibles:
-            console.print(f"  [red]❌ Puerto no detectado[/red]")
+        celdas = [_celda_salud(salud_modems.get(matriz[pool_name].get(p))) if p in config["puertos"] else ""
+                  for p in puertos_logicos]
+        table.add_row(pool_name, f"{config['com']} {_celda_salud(salud_controladores[pool_name])}", *celdas)
+    console.print(table)
+    
+    # Detalle de lo que no está OK (incluye módems que no se pudieron ubicar en un pool)
+    con_problemas = [(f"{pool_name} (controlador)", salud) for pool_name, salud in salud_controladores.items()
+                     if salud["estado"] != SALUD_OK]
+    con_problemas += [(f"{salud['pool']}/{salud['puerto_logico']}" if salud["pool"] else "sin ubicar", salud)
+                      for salud in salud_modems.values() if salud["estado"] != SALUD_OK]
+    if con_problemas:
+        detalle = Table(title="Puertos con problemas")
+        detalle.add_column("Ubicación", style="cyan")
+        detalle.add_column("Puerto")
+        detalle.add_column("Estado")
+        detalle.add_column("Problemas")
+        for ubicacion_txt, salud in con_problemas:
+            detalle.add_row(ubicacion_txt, salud["puerto"], f"{ICONOS_SALUD[salud['estado']]} {salud['estado']}[/]",
+                            ", ".join(salud["problemas"]))
+        console.print(detalle)
+    
+    conteo = defaultdict(int)
+    for salud in list(salud_controladores.values()) + list(salud_modems.values()):
+        conteo[salud["estado"]] += 1
+    console.print("  ".join(f"{ICONOS_SALUD[estado]} {estado}: {conteo[estado]}[/]" for estado in ICONOS_SALUD if conteo[estado]))
+    
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": Settings.VERSION,
+        "presupuesto_segundos": Settings.SELF_TEST_PRESUPUESTO,
+        "duracion_segundos": round(duracion, 2),
+        "resumen": dict(conteo),
+        "controladores": salud_controladores,
+        "modems": salud_modems,
+        "matriz": matriz,
+    }
+    try:
+        with open(Settings.SELF_TEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        console.print(f"[dim]💾 Matriz guardada en {Settings.SELF_TEST_FILE}[/dim]")
+    except Exception as e:
+        escribir_log(f"⚠️ Error al guardar auto-test: {e}")
+    
+    console.print("\n" + "="*70)
+    console.print("[bold green]✅ Auto-test completado[/bold green]\n")
+    return reporte
+
+def verificar_parser_at(iteraciones_fuzz: int = 20000, repeticiones_benchmark: int = 20000) -> bool:
+    """Casos conocidos, fuzzing y benchmark del parser de respuestas AT (--verificar-parser)
+    
+    El fuzzing corta, ensucia y mezcla respuestas reales con URC y ruido del puerto, y
+    verifica que ningún parser lance excepción y que nunca se acepte un ICCID fuera de regla.
+    """
+    import random
+    console.print("\n[bold cyan]🧪 VERIFICACIÓN DEL PARSER AT[/bold cyan]")
+    console.print("="*70)
+    
+    iccid = "8956030101000100000"
+    casos = [
+        (parsear_iccid, f"AT+QCCID\r\r\n+QCCID: {iccid}\r\n\r\nOK\r\n", Iccid(iccid, luhn_valido(iccid))),
+        (parsear_iccid, f"\r\n{iccid}\r\n\r\nOK\r\n", Iccid(iccid, luhn_valido(iccid))),  # M35
+        (parsear_iccid, f'\r\n+CCID: "{iccid}F"\r\n\r\nOK\r\n', Iccid(iccid, luhn_valido(iccid))),
+        (parsear_iccid, "\r\n860000000000000123456\r\nOK\r\n", None),  # IMEI largo / basura numérica
+        (parsear_iccid, f"+CMGL: 1,\"REC READ\",\"{iccid}\",,\"24/01/01\"\r\nOK", None),
+        (parsear_iccid, "\r\n+CME ERROR: 10\r\n", None),
+        (parsear_creg, "AT+CREG?\r\r\n+CREG: 0,1\r\n\r\nOK\r\n", EstadoCreg(0, 1, None, None)),
+        (parsear_creg, '\r\n+CREG: 2,5,"1A2B","00C3"\r\nOK', EstadoCreg(2, 5, "1A2B", "00C3")),
+        (parsear_creg, "\r\n+CREG: 1\r\n", None),  # URC, no respuesta
+        (parsear_csq, "\r\n+CSQ: 23,99\r\n\r\nOK\r\n", Csq(23, 99)),
+        (parsear_csq, "\r\n+CSQ: 99,99\r\nOK", Csq(99, 99)),
+        (parsear_cpbr, '\r\n+CPBR: 1,"56912345678",129,"myphone"\r\nOK',
+         [EntradaAgenda(1, "56912345678", 129, "myphone")]),
+        (parsear_cmgl, '\r\n+CMGL: 3,"REC UNREAD","+56955550000",,"24/01/01,12:00:00-12"\r\nTu numero es 56987654321\r\nOK',
+         [MensajeSms(3, "REC UNREAD", "+56955550000", "24/01/01,12:00:00-12", "Tu numero es 56987654321")]),
+        (parsear_cusd, '\r\n+CUSD: 0,"Saldo $0",15\r\n', RespuestaUssd(0, "Saldo $0", 15)),
+        (parsear_cusd, "\r\n+CUSD: 2\r\n", RespuestaUssd(2, "", None)),
+        (extraer_numero_sms, "Tu numero es 56987654321", "56987654321"),
+        (extraer_numero_sms, "Activa en https://fif.clarovtrcloud.com/aod/form?t=56911112222", "56911112222"),
+    ]
+    fallidos = 0
+    for parser, respuesta, esperado in casos:
+        obtenido = parser(respuesta)
+        if obtenido != esperado:
+            fallidos += 1
+            console.print(f"  [red]❌ {parser.__name__}({respuesta!r}) → {obtenido!r}, se esperaba {esperado!r}[/red]")
+    console.print(f"  {'✅' if not fallidos else '❌'} Casos conocidos: {len(casos) - fallidos}/{len(casos)}")
+    
+    # Fuzzing: cortes, ruido y URC intercalados sobre respuestas reales
+    azar = random.Random(1)
+    parsers = (parsear_iccid, parsear_creg, parsear_csq, parsear_cpbr, parsear_cmgl, parsear_cusd, extraer_numero_sms)
+    ruido = ["\x00", "\xff", "+CMTI: \"SM\",1", "RDY", "+CREG: 1", "+QIND: SMS DONE", "ERROR", "\r", "\n", ",", '"']
+    errores_fuzz = 0
+    for _ in range(iteraciones_fuzz):
+        base = azar.choice(casos)[1]
+        partes = list(base)
+        for _ in range(azar.randint(0, 4)):
+            accion = azar.random()
+            posicion = azar.randint(0, len(partes))
+            if accion < 0.4:
+                partes.insert(posicion, "\r\n" + azar.choice(ruido) + "\r\n")
+            elif accion < 0.7:
+                partes.insert(posicion, "".join(azar.choice("0123456789F") for _ in range(azar.randint(1, 25))))
+            else:
+                partes = partes[:posicion]
+        texto = "".join(partes)
+        for parser in parsers:
+            try:
+                resultado = parser(texto)
+            except Exception as e:
+                errores_fuzz += 1
+                console.print(f"  [red]❌ {parser.__name__} lanzó {e!r} con {texto!r}[/red]")
+                continue
+            if parser is parsear_iccid and resultado is not None:
+                if not (resultado.valor.startswith("89") and len(resultado.valor) in (19, 20) and resultado.valor.isdigit()):
+                    errores_fuzz += 1
+                    console.print(f"  [red]❌ ICCID fuera de regla {resultado.valor!r} en {texto!r}[/red]")
+    console.print(f"  {'✅' if not errores_fuzz else '❌'} Fuzzing: {iteraciones_fuzz} respuestas × {len(parsers)} parsers, {errores_fuzz} errores")
+    
+    # Benchmark: microsegundos por respuesta
+    tabla = Table(title="Parser AT (µs por respuesta)")
+    tabla.add_column("Parser")
+    tabla.add_column("µs", justify="right")
+    medidos = set()
+    for parser, respuesta, _ in casos:
+        if parser in medidos:
             continue
-        
-        # Test 1: AT básico
+        medidos.add(parser)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones_benchmark):
+            parser(respuesta)
+        tabla.add_row(parser.__name__, f"{(time.perf_counter() - inicio) / repeticiones_benchmark * 1e6:.2f}")
+    console.print(tabla)
+    
+    exito = not fallidos and not errores_fuzz
+    console.print("="*70)
+    console.print("[bold green]✅ Parser verificado[/bold green]\n" if exito else "[bold red]❌ El parser tiene errores[/bold red]\n")
+    return exito
+
+def verificar_disyuntor(enfriamiento: float = 0.2) -> bool:
+    """Recorrido del disyuntor con un sondeo simulado, sin hardware (--verificar-disyuntor)
+    
+    abierto → semiabierto → sondeo fallido dentro de la gracia de reinicio → vuelve a abierto
+    con un enfriamiento nuevo → vencido, el sondeo responde y el puerto se rehabilita.
+    """
+    console.print("\n[bold cyan]🧪 VERIFICACIÓN DEL DISYUNTOR[/bold cyan]")
+    console.print("="*70)
+    
+    puerto = "COM_VERIFICACION"
+    sondeos = []
+    responde = False
+    
+    def sondeo(p):
+        sondeos.append(p)
+        disyuntor.registrar(p, RESULTADO_OK if responde else RESULTADO_SIN_RESPUESTA)
+    
+    def permitido() -> bool:
         try:
-            respuesta = enviar_comando(puerto, "AT", espera=0.5)
-            if "OK" in respuesta:
-                console.print(f"  [green]✅ Responde a AT[/green]")
-            else:
-                console.print(f"  [yellow]⚠️ Respuesta inesperada: {respuesta[:50]}[/yellow]")
+            disyuntor.permitir(puerto)
+            return True
+        except PuertoFueraDeServicio:
+            return False
+    
+    disyuntor = DisyuntoresPuerto(sondeo=sondeo)
+    originales = (Settings.DISYUNTOR_PUERTOS, Settings.DISYUNTOR_ENFRIAMIENTO_BASE)
+    Settings.DISYUNTOR_PUERTOS, Settings.DISYUNTOR_ENFRIAMIENTO_BASE = True, enfriamiento
+    casos = []
+    try:
+        disyuntor.en_reinicio(puerto, 60)
+        for _ in range(Settings.UMBRAL_PUERTO_INESTABLE):
+            disyuntor.registrar(puerto, RESULTADO_SIN_RESPUESTA)
+        casos.append(("Silencio durante el reinicio no abre el puerto", permitido()))
+        
+        disyuntor = DisyuntoresPuerto(sondeo=sondeo)
+        for _ in range(Settings.UMBRAL_PUERTO_INESTABLE):
+            disyuntor.registrar(puerto, RESULTADO_SIN_RESPUESTA)
+        casos.append(("Abre tras UMBRAL_PUERTO_INESTABLE fallos", not permitido() and not sondeos))
+        
+        time.sleep(enfriamiento * 1.2)
+        disyuntor.en_reinicio(puerto, 60)
+        casos.append(("Sondeo semiabierto fallido dentro de la gracia", not permitido() and len(sondeos) == 1))
+        casos.append(("Vuelve a abierto (no queda semiabierto)",
+                      disyuntor._estados[puerto].estado == DISYUNTOR_ABIERTO and not disyuntor.disponible(puerto)))
+        casos.append(("Sin sondeo antes del nuevo enfriamiento", not permitido() and len(sondeos) == 1))
+        
+        time.sleep(enfriamiento * 2 * 1.2)
+        responde = True
+        casos.append(("Vencido el enfriamiento, el sondeo lo rehabilita", permitido() and len(sondeos) == 2))
+        casos.append(("Queda cerrado", not disyuntor.abierto(puerto) and permitido()))
+    finally:
+        Settings.DISYUNTOR_PUERTOS, Settings.DISYUNTOR_ENFRIAMIENTO_BASE = originales
+    
+    for descripcion, ok in casos:
+        console.print(f"  {'✅' if ok else '❌'} {descripcion}")
+    exito = all(ok for _, ok in casos)
+    console.print("="*70)
+    console.print("[bold green]✅ Disyuntor verificado[/bold green]\n" if exito else "[bold red]❌ El disyuntor tiene errores[/bold red]\n")
+    return exito
+
+# ==================== PIPELINES POR POOL ====================
+class PipelinesPool:
+    """Activación masiva con un pipeline independiente por pool (--pools-independientes)
+    
+    v2.30.0: En la activación masiva secuencial cada slot espera a que terminen los 4 pools,
+    así que el pool más lento de cada slot marca el ritmo de todos. Aquí cada pool recorre sus
+    slots en su propio trabajador de ejecutor_rotacion: SWIT a sus 8 puertos, y luego sus módems (conocidos por la
+    topología) pasan por su FlujoModem sin esperar a los de otros pools. El avance de
+    cada pool se guarda en ESTADO_POOLS_FILE después de cada slot, así que una corrida
+    interrumpida se retoma en el slot pendiente de cada pool.
+    """
+    
+    def __init__(self):
+        self._estado = {}  # pool → {"slots_completados": [...], "slot_actual", "sims_listas", ...}
+        self._lock = threading.Lock()
+        self._lock_archivos = threading.Lock()  # métricas e historial son leer-modificar-escribir
+        self._cargado = False
+    
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+        try:
+            if os.path.exists(Settings.ESTADO_POOLS_FILE):
+                with open(Settings.ESTADO_POOLS_FILE, "r", encoding="utf-8") as f:
+                    self._estado = json.load(f).get("pools", {})
         except Exception as e:
-            console.print(f"  [red]❌ Error: {e}[/red]")
-            continue
-        
-        # Test 2: Comando SWIT de prueba
+            escribir_log(f"⚠️ Error al cargar estado de pools: {e}")
+    
+    def _guardar(self):
         try:
-            comando_test = f"AT+SWIT01-0001"
-            respuesta = enviar_comando(puerto, comando_test, espera=0.5)
-            if "OK" in respuesta or not respuesta:
-                console.print(f"  [green]✅ Comando AT+SWIT funcional[/green]")
-            else:
-                console.print(f"  [yellow]⚠️ Respuesta a SWIT: {respuesta[:50]}[/yellow]")
+            with open(Settings.ESTADO_POOLS_FILE, "w", encoding="utf-8") as f:
+                json.dump({
+                    "ultima_actualizacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "version": Settings.VERSION,
+                    "pools": self._estado,
+                }, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            console.print(f"  [red]❌ Error en SWIT: {e}[/red]")
+            escribir_log(f"⚠️ Error al guardar estado de pools: {e}")
+    
+    def _estado_pool(self, pool_name: str) -> dict:
+        return self._estado.setdefault(pool_name, {
+            "slots_completados": [],
+            "slot_actual": None,
+            "sims_listas": 0,
+            "activadas": 0,
+            "segundos": 0.0,
+        })
+    
+    def preparar(self):
+        """Retoma la corrida guardada; si todos los pools la terminaron, empieza una nueva"""
+        with self._lock:
+            self._cargar()
+            self._estado = {pool_name: estado for pool_name, estado in self._estado.items() if pool_name in SIM_BANKS}
+            if SIM_BANKS and all(self._pendientes(pool_name) == [] for pool_name in SIM_BANKS):
+                self._estado = {}
+            for pool_name in SIM_BANKS:
+                self._estado_pool(pool_name)
+            self._guardar()
+    
+    def _pendientes(self, pool_name: str) -> list:
+        completados = set(self._estado_pool(pool_name)["slots_completados"])
+        return [slot for slot in range(Settings.SLOT_MIN, Settings.SLOT_MAX + 1) if slot not in completados]
+    
+    def pendientes(self, pool_name: str) -> list:
+        with self._lock:
+            return self._pendientes(pool_name)
+    
+    def completar_slot(self, pool_name: str, slot: int, resumen: dict):
+        with self._lock:
+            estado = self._estado_pool(pool_name)
+            if slot not in estado["slots_completados"]:
+                estado["slots_completados"].append(slot)
+            estado["slot_actual"] = slot
+            estado["sims_listas"] += resumen["sims_listas"]
+            estado["activadas"] += resumen["activadas"]
+            estado["segundos"] = round(estado["segundos"] + resumen["segundos"], 1)
+            self._guardar()
+    
+    def resumen(self) -> dict:
+        with self._lock:
+            return {pool_name: dict(estado) for pool_name, estado in self._estado.items()}
+    
+    @trazar("slot", pista=lambda self, pool_name, *_args, **_kwargs: SIM_BANKS[pool_name].get("com"))
+    def procesar_slot(self, pool_name: str, slot_base: int, iteracion: int, cambiar: bool = True) -> dict:
+        """Un slot de un pool: SWIT (salvo que el descubrimiento ya lo dejó ahí) y sus módems en paralelo"""
+        inicio = time.time()
+        pool_config = SIM_BANKS[pool_name]
+        slot_real = slot_real_pool(pool_config, slot_base)
+        modems = topologia_pools.modems_de_pool(pool_name)
+        reintentos_swit.reiniciar(modems)
+        estado_modems.reiniciar(modems)
+        
+        iccids_previos = {}
+        if cambiar:
+            cambiar_slot_pool(pool_name, pool_config, slot_base, iccids_previos)
+        
+        modems = [puerto for puerto in modems if puerto not in Settings.PUERTOS_BLACKLIST and disyuntores.disponible(puerto)]
+        flujos = planificador_modems.ejecutar(modems, iccids_previos)
+        
+        iccids_verificados = {puerto: flujo.iccid for puerto, flujo in flujos.items() if flujo.alcanzo(ESTADO_ICCID)}
+        activadas = sum(1 for flujo in flujos.values()
+                        if flujo.paso(ESTADO_ACTIVACION) and flujo.paso(ESTADO_ACTIVACION).desenlace == DESENLACE_OK)
+        reiniciados = sum(1 for flujo in flujos.values() if flujo.alcanzo(ESTADO_RESET))
+        resumen = {
+            "sims_listas": len(iccids_verificados),
+            "activadas": activadas,
+            "segundos": time.time() - inicio,
+        }
+        
+        with self._lock_archivos:
+            actualizar_metricas(slot_real, iteracion, len(iccids_verificados), len(modems),
+                                len(set(iccids_verificados.values())),
+                                reiniciados, len(modems) - reiniciados)
+            if iccids_verificados:
+                guardar_historial_iccids(slot_real, iteracion, iccids_verificados, pool=pool_name)
+        tiempos_adaptativos.guardar()
+        
+        escribir_log(f"✅ {pool_name}: slot {slot_real:02d} (base {slot_base:02d}) en {resumen['segundos']:.0f}s | "
+                     f"SIMs {len(iccids_verificados)}/{len(modems)} | registradas "
+                     f"{sum(1 for flujo in flujos.values() if flujo.alcanzo(ESTADO_REGISTRO))} | activadas {activadas}")
+        return resumen
+    
+    def recorrer(self, pool_name: str, iteracion: int, slot_ya_cambiado: int = None, al_completar=None):
+        """Hilo de un pool: procesa sus slots pendientes en orden hasta terminar"""
+        for slot in self.pendientes(pool_name):
+            # v2.34.0: Una traza por slot del pool, con solo su controlador y sus módems
+            traza_rotacion.abrir(pool_name)
+            try:
+                resumen = self.procesar_slot(pool_name, slot, iteracion, cambiar=slot != slot_ya_cambiado)
+            except Exception as e:
+                escribir_log(f"❌ {pool_name}: error en slot {slot:02d}, se deja pendiente: {e}")
+                registrar_fallo_pool(pool_name)
+                continue
+            finally:
+                pistas = set(topologia_pools.modems_de_pool(pool_name)) | {SIM_BANKS[pool_name].get("com")}
+                traza_rotacion.cerrar(pool_name, slot_real_pool(SIM_BANKS[pool_name], slot), iteracion, pistas)
+            limpiar_fallos_pool(pool_name)
+            self.completar_slot(pool_name, slot, resumen)
+            if al_completar:
+                al_completar(pool_name, slot)
+
+pipelines_pool = PipelinesPool()
+
+@medir_tiempo
+def activacion_masiva_por_pool():
+    """Activación masiva con cada pool avanzando por sus slots de forma independiente
     
-    console.print("\n" + "="*70)
-    console.print("[bold green]✅ Auto-test completado[/bold green]\n")
+    v2.30.0: Requiere topología (qué módem es de qué pool); si no es vigente se descubre antes
+    de empezar, y si no se logra se vuelve a la activación masiva secuencial. El tiempo total
+    queda acotado por el pool más lento, no por la suma de los peores pools de cada slot.
+    """
+    console.print("\n[bold magenta]" + "="*80 + "[/bold magenta]")
+    console.print("[bold magenta]🚀 MODO ACTIVACIÓN MASIVA - PIPELINES INDEPENDIENTES POR POOL[/bold magenta]")
+    console.print("[bold magenta]" + "="*80 + "[/bold magenta]\n")
+    escribir_log("="*80)
+    escribir_log("🚀 INICIANDO ACTIVACIÓN MASIVA CON PIPELINES POR POOL")
+    escribir_log("="*80)
+    
+    cerrar_simclient()
+    cerrar_puertos_serial()
+    cargar_mapeo_puertos()
+    registro_latencias.reiniciar()
+    reintentos_swit.reiniciar()
+    pipelines_pool.preparar()
+    
+    # Los pools que se descubren quedan ya en su primer slot pendiente
+    slots_ya_cambiados = {}
+    if not topologia_pools.vigente() and not Settings.MODO_DRY_RUN:
+        for pool_name in SIM_BANKS:
+            pendientes = pipelines_pool.pendientes(pool_name)
+            if pendientes and topologia_pools.descubrir(pendientes[0], [pool_name]).get(pool_name):
+                slots_ya_cambiados[pool_name] = pendientes[0]
+    
+    pools = [pool_name for pool_name in SIM_BANKS if topologia_pools.modems_de_pool(pool_name)]
+    if not pools:
+        console.print("[yellow]⚠️ Sin topología de pools: se usa la activación masiva secuencial[/yellow]")
+        escribir_log("⚠️ Pipelines por pool sin topología, se vuelve a la activación masiva secuencial")
+        Settings.MODO_POOLS_INDEPENDIENTES = False
+        activacion_masiva_todas_las_sims()
+        return
+    sin_topologia = [pool_name for pool_name in SIM_BANKS if pool_name not in pools]
+    if sin_topologia:
+        escribir_log(f"⚠️ Pools sin módems conocidos, no se procesan: {', '.join(sin_topologia)}")
+    
+    tiempo_inicio = time.time()
+    with Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console
+    ) as progress:
+        total = Settings.SLOT_MAX - Settings.SLOT_MIN + 1
+        tareas = {pool_name: progress.add_task(f"[cyan]{pool_name}", total=total,
+                                               completed=total - len(pipelines_pool.pendientes(pool_name)))
+                  for pool_name in pools}
+        
+        def al_completar(pool_name, slot):
+            progress.update(tareas[pool_name], advance=1,
+                            description=f"[cyan]{pool_name} (slot {slot:02d})")
+        
+        def recorrer(pool_name):
+            pipelines_pool.recorrer(pool_name, 1, slots_ya_cambiados.get(pool_name), al_completar)
+        
+        ejecutor_rotacion.mapear(recorrer, pools)
+    duracion_total = time.time() - tiempo_inicio
+    
+    registro_latencias.guardar(Settings.SLOT_MAX, 1)
+    cerrar_puertos_serial()
+    abrir_simclient()
+    time.sleep(8)
+    
+    table = Table(title="Pipelines por pool")
+    table.add_column("Pool", style="cyan")
+    table.add_column("Slots", justify="right")
+    table.add_column("SIMs listas", justify="right")
+    table.add_column("Activadas", justify="right")
+    table.add_column("Minutos", justify="right")
+    for pool_name, estado in pipelines_pool.resumen().items():
+        table.add_row(pool_name, f"{len(estado['slots_completados'])}/{total}", str(estado["sims_listas"]),
+                      str(estado["activadas"]), f"{estado['segundos']/60:.1f}")
+    console.print(table)
+    console.print(f"[green]⏱️  Tiempo total: {duracion_total/60:.1f} minutos ({duracion_total/3600:.2f} horas)[/green]")
+    console.print(f"[green]💾 Avance por pool: {Settings.ESTADO_POOLS_FILE}[/green]")
+    
+    escribir_log("="*80)
+    escribir_log("✅ ACTIVACIÓN MASIVA POR POOL COMPLETADA")
+    escribir_log(f"   Tiempo total: {duracion_total/60:.1f} minutos")
+    escribir_log("="*80)
 
 # ==================== MODO ACTIVACIÓN MASIVA ====================
 @medir_tiempo
@@ -2586,7 +6415,13 @@ def activacion_masiva_todas_las_sims():
     - Activa todas las SIMs y guarda myphone
     - Solo abre HeroSMS-Partners al final
     - NO espera 30 minutos entre slots
+    
+    v2.30.0: Con MODO_POOLS_INDEPENDIENTES cada pool avanza por su cuenta (activacion_masiva_por_pool)
     """
+    if Settings.MODO_POOLS_INDEPENDIENTES:
+        activacion_masiva_por_pool()
+        return
+    
     console.print("\n[bold magenta]" + "="*80 + "[/bold magenta]")
     console.print("[bold magenta]🚀 MODO ACTIVACIÓN MASIVA - 1024 SIMS TOTALES[/bold magenta]")
     console.print("[bold magenta]" + "="*80 + "[/bold magenta]\n")
@@ -2639,7 +6474,6 @@ def activacion_masiva_todas_las_sims():
     # 4. Abrir HeroSMS-Partners al finalizar todo
     console.print("\n[bold green]📌 Paso 4/4: Abriendo HeroSMS-Partners (finalizando proceso)...[/bold green]")
     cerrar_puertos_serial()
-    time.sleep(3)
     abrir_simclient()
     time.sleep(8)
     
@@ -2876,6 +6710,17 @@ def main():
         actualizar_script()
         return
     
+    # Mostrar latencias AT registradas y salir
+    if args.latencias is not None:
+        mostrar_latencias(args.latencias_ultimas, args.latencias or None)
+        return
+    
+    if args.verificar_parser:
+        sys.exit(0 if verificar_parser_at() else 1)
+    
+    if args.verificar_disyuntor:
+        sys.exit(0 if verificar_disyuntor() else 1)
+    
     # Verificar actualizaciones al inicio (si no se desactiva)
     if not args.no_update_check and Settings.CHECK_UPDATES:
         verificar_y_actualizar()
@@ -2942,6 +6787,14 @@ def main():
         self_test()
         return
     
+    if args.descubrir_topologia:
+        descubrir_topologia_cli()
+        return
+    
+    if args.pools_independientes:
+        Settings.MODO_POOLS_INDEPENDIENTES = True
+        console.print("[yellow]⚙️  Override: Pipelines independientes por pool[/yellow]")
+    
     # Si es activación masiva (modo por defecto), ejecutar y salir
     if Settings.MODO_ACTIVACION_MASIVA:
         console.print(f"\n[bold cyan]{'='*80}[/bold cyan]")
@@ -0,0 +1,744 @@
+"""
+Simulador de Módems y SIM Banks - Rotador SimBank
+==================================================
+Expone pseudo-terminales (PTY) que se comportan como:
+- Módems Quectel M35 / UC20 (QCCID, CPIN, CREG, CSQ, CUSD, CMGL, CPBR/CPBW...)
+- Controladores de SIM Bank (AT+SWITxx-yyyy cambia el ICCID que ven los módems)
+
+Permite correr los flujos reales de RotadorSimBank.py (cambiar_slot_simbank,
+activacion_masiva_todas_las_sims) en Linux sin hardware, con latencias, tasas
+de falla y retardo de SMS configurables, para perfilar y ajustar tiempos.
+
+Solo Linux/macOS (usa el módulo pty). Ver SIMULADOR_README.md.
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import select
+import argparse
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    import pty
+    import tty
+except ImportError:
+    print("Error: el simulador necesita pseudo-terminales (pty), solo disponible en Linux/macOS")
+    sys.exit(1)
+
+# ==================== CONFIGURACIÓN ====================
+class ConfigSimulador:
+    """Parámetros del simulador (segundos reales; 'escala' los multiplica)"""
+    POOLS = 4
+    MODEMS_POR_POOL = 8
+    SLOT_MAX = 32
+    MODELO = "mixto"  # "M35", "UC20" o "mixto" (alterna por módem)
+    ECO = True  # Los módems reales arrancan con ATE1
+    ESCALA = 1.0  # Multiplica todos los tiempos de proceso (reinicio, slot, registro, SMS)
+
+    # Latencia de cada comando (uniforme entre min y max)
+    LATENCIA_MIN = 0.03
+    LATENCIA_MAX = 0.25
+    LATENCIA_CONTROLADOR = 0.05
+
+    # Tiempos de proceso
+    TIEMPO_REINICIO = {"M35": 8.0, "UC20": 15.0}  # AT+CFUN=1,1 → RDY
+    TIEMPO_APLICAR_SLOT = 4.0  # Switch mecánico del SIM Bank
+    TIEMPO_DETECCION_SIM = 2.0  # SIM presente → +CPIN: READY
+    TIEMPO_REGISTRO = 6.0  # +CPIN: READY → +CREG: 1
+    RETARDO_USSD = 2.0  # AT+CUSD → +CUSD
+    RETARDO_SMS = 10.0  # AT+CUSD → SMS con el número (+CMTI)
+
+    # Fallas
+    TASA_ERROR = 0.0  # Probabilidad de responder ERROR a cualquier comando
+    TASA_SIN_RESPUESTA = 0.0  # Probabilidad de no responder
+    MODEMS_MUERTOS = 0  # Los últimos N módems nunca responden (puerto presente, módem colgado)
+    CONTROLADORES_MUDOS = False  # Controladores que aplican el SWIT sin responder OK
+    TASA_SWIT_IGNORADO = 0.0  # Probabilidad de que el switch acuse un SWIT pero no lo aplique
+    TASA_SIM_OCUPADA = 0.0  # Probabilidad de +CME ERROR: 14 en comandos que tocan la SIM
+    TASA_SIN_REGISTRO = 0.05  # SIMs que nunca se registran en red
+    TASA_EXITO_ACTIVACION = 0.9  # SIMs Claro que reciben el SMS tras *103#
+    FRACCION_CLARO = 0.9  # SIMs Claro (el resto, otro operador)
+
+    # Nombres de dispositivo (el rotador usa nombres COMxx)
+    PRIMER_COM_MODEM = 101
+    COM_CONTROLADORES = [38, 37, 36, 35]  # Igual que SIM_BANKS_DEFAULT
+
+REVISIONES = {"M35": "M35FAR01A01", "UC20": "UC20GQBR03A12E1G"}
+
+# Comandos que necesitan la SIM lista
+COMANDOS_SIM = ("AT+QCCID", "AT+CCID", "AT+CPBS", "AT+CPBR", "AT+CPBW", "AT+CMGL",
+                "AT+CPMS", "AT+CMGD", "AT+CMGR", "AT+CUSD")
+
+# ==================== MODELO DEL SIM BANK ====================
+class TarjetaSim:
+    """SIM física: ICCID, agenda y SMS viajan con ella entre módems"""
+
+    def __init__(self, iccid: str, claro: bool, numero: str, registra: bool, rssi: int):
+        self.iccid = iccid
+        self.claro = claro
+        self.numero = numero
+        self.registra = registra
+        self.rssi = rssi
+        self.agenda = {}  # índice → (número, tipo, nombre)
+        self.sms = []  # [(índice, estado, remitente, texto)]
+        self.activaciones = 0
+
+class BancoSimulado:
+    """Estado compartido: qué slot tiene cada puerto lógico y las SIM de cada slot"""
+
+    def __init__(self, config=ConfigSimulador, semilla: int = None):
+        self.config = config
+        self.random = random.Random(semilla)
+        self.slots = {}  # (pool, puerto_lógico) → slot
+        self.presente_desde = {}  # (pool, puerto_lógico) → momento en que la SIM queda conectada
+        self.tarjetas = {}  # (pool, puerto_lógico, slot) → TarjetaSim
+        self.lock = threading.Lock()
+        self.detenido = threading.Event()
+        self.contadores = {}  # verbo → cantidad de comandos recibidos
+        self.modems = []
+        self.controladores = []
+
+    def t(self, segundos: float) -> float:
+        """Aplica la escala de tiempo"""
+        return segundos * self.config.ESCALA
+
+    def tarjeta(self, pool: int, puerto_logico: int):
+        """SIM conectada al puerto lógico (None mientras el switch está cambiando)"""
+        with self.lock:
+            clave = (pool, puerto_logico)
+            if time.time() < self.presente_desde.get(clave, 0):
+                return None
+            slot = self.slots.get(clave, 1)
+            llave = (pool, puerto_logico, slot)
+            if llave not in self.tarjetas:
+                self.tarjetas[llave] = self._crear_tarjeta(pool, puerto_logico, slot)
+            return self.tarjetas[llave]
+
+    def _crear_tarjeta(self, pool: int, puerto_logico: int, slot: int) -> TarjetaSim:
+        claro = self.random.random() < self.config.FRACCION_CLARO
+        prefijo = "895603" if claro else "895601"
+        iccid = f"{prefijo}{pool:02d}{puerto_logico:02d}{slot:04d}00000"  # 19 dígitos
+        numero = f"569{zlib.crc32(iccid.encode()) % 100000000:08d}"
+        return TarjetaSim(iccid, claro, numero,
+                          registra=self.random.random() >= self.config.TASA_SIN_REGISTRO,
+                          rssi=self.random.randint(8, 28))
+
+    def cambiar_slot(self, pool: int, puerto_logico: int, slot: int):
+        with self.lock:
+            self.slots[(pool, puerto_logico)] = slot
+            self.presente_desde[(pool, puerto_logico)] = time.time() + self.t(self.config.TIEMPO_APLICAR_SLOT)
+
+    def sim_presente_desde(self, pool: int, puerto_logico: int) -> float:
+        with self.lock:
+            return self.presente_desde.get((pool, puerto_logico), 0)
+
+    def contar(self, comando: str):
+        verbo = comando.upper().split("=")[0].rstrip("?")
+        if verbo.startswith("AT+SWIT"):
+            verbo = "AT+SWIT"
+        with self.lock:
+            self.contadores[verbo] = self.contadores.get(verbo, 0) + 1
+
+# ==================== DISPOSITIVOS PTY ====================
+class DispositivoPTY:
+    """Pseudo-terminal con un enlace simbólico COMxx en el directorio de trabajo"""
+
+    def __init__(self, banco: BancoSimulado, nombre: str):
+        self.banco = banco
+        self.nombre = nombre
+        self.maestro, self.esclavo = pty.openpty()
+        tty.setraw(self.esclavo)  # El esclavo queda abierto para que el maestro no reciba EIO
+        if os.path.lexists(nombre):
+            os.remove(nombre)
+        os.symlink(os.ttyname(self.esclavo), nombre)
+        self.eco = banco.config.ECO
+        self._hilo = threading.Thread(target=self._ciclo, name=f"Sim-{nombre}", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def escribir(self, texto: str):
+        try:
+            os.write(self.maestro, texto.encode())
+        except OSError:
+            pass
+
+    def responder(self, lineas: list, final: str):
+        cuerpo = "".join(f"\r\n{linea}" for linea in lineas)
+        if lineas:
+            cuerpo += "\r\n"
+        self.escribir(f"{cuerpo}\r\n{final}\r\n")
+
+    def urc(self, linea: str):
+        self.escribir(f"\r\n{linea}\r\n")
+
+    def _ciclo(self):
+        buffer = b""
+        while not self.banco.detenido.is_set():
+            listos, _, _ = select.select([self.maestro], [], [], 0.05)
+            self.tick()
+            if not listos:
+                continue
+            try:
+                buffer += os.read(self.maestro, 4096)
+            except OSError:
+                continue
+            while b"\r" in buffer:
+                linea, buffer = buffer.split(b"\r", 1)
+                comando = linea.decode(errors="ignore").strip()
+                if comando:
+                    self.atender(comando)
+
+    def tick(self):
+        """Eventos asíncronos (URC); lo implementan las subclases"""
+
+    def atender(self, comando: str):
+        raise NotImplementedError
+
+    def cerrar(self):
+        for fd in (self.maestro, self.esclavo):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if os.path.islink(self.nombre):
+            os.remove(self.nombre)
+
+class ControladorSimulado(DispositivoPTY):
+    """Controlador de un pool: AT+SWITxx-yyyy conecta el slot yyyy al puerto lógico xx"""
+
+    def __init__(self, banco: BancoSimulado, nombre: str, pool: int):
+        super().__init__(banco, nombre)
+        self.pool = pool
+        self.eco = False
+
+    def atender(self, comando: str):
+        config = self.banco.config
+        self.banco.contar(comando)
+        time.sleep(config.LATENCIA_CONTROLADOR)
+        if self.banco.random.random() < config.TASA_SIN_RESPUESTA:
+            return
+        if self.banco.random.random() < config.TASA_ERROR:
+            self.responder([], "ERROR")
+            return
+
+        comando_mayus = comando.upper()
+        if comando_mayus.startswith("AT+SWIT"):
+            try:
+                puerto_txt, slot_txt = comando_mayus[len("AT+SWIT"):].split("-")
+                puerto_logico, slot = int(puerto_txt), int(slot_txt)
+            except ValueError:
+                self.responder([], "ERROR")
+                return
+            if not (1 <= puerto_logico <= config.MODEMS_POR_POOL and 1 <= slot <= config.SLOT_MAX):
+                self.responder([], "ERROR")
+                return
+            if self.banco.random.random() >= config.TASA_SWIT_IGNORADO:
+                self.banco.cambiar_slot(self.pool, puerto_logico, slot)
+            if not config.CONTROLADORES_MUDOS:
+                self.responder([], "OK")
+        elif comando_mayus in ("AT", "AT+CFUN=1,1"):
+            self.responder([], "OK")
+        else:
+            self.responder([], "ERROR")
+
+class ModemSimulado(DispositivoPTY):
+    """Módem Quectel M35/UC20 conectado al puerto lógico 'puerto_logico' del pool"""
+
+    def __init__(self, banco: BancoSimulado, nombre: str, pool: int, puerto_logico: int,
+                 modelo: str, numero_serie: str):
+        super().__init__(banco, nombre)
+        self.pool = pool
+        self.puerto_logico = puerto_logico
+        self.modelo = modelo
+        self.numero_serie = numero_serie
+        self.pendientes = []  # [(momento, función)] URC diferidos (USSD, SMS)
+        self.muerto = False
+        self.comandos_ignorados = 0
+        self._encender(0)  # Ya encendido al iniciar la simulación
+
+    def _encender(self, inicio: float):
+        """Estado tras un arranque (AT+CFUN=1,1 restaura la configuración)"""
+        self.listo_desde = inicio + self.banco.t(self.banco.config.TIEMPO_REINICIO[self.modelo])
+        self.creg_n = 0
+        self.cnmi = False
+        self.cmgf = 0
+        self.memoria_sms = "SM"
+        self._rdy_anunciado = inicio == 0
+        self._sim_anunciada = None
+        self._registro_anunciado = None
+
+    # ----- Estado derivado -----
+    def reiniciando(self) -> bool:
+        return time.time() < self.listo_desde
+
+    def momento_sim_lista(self) -> float:
+        presente = self.banco.sim_presente_desde(self.pool, self.puerto_logico)
+        return max(self.listo_desde, presente) + self.banco.t(self.banco.config.TIEMPO_DETECCION_SIM)
+
+    def sim_lista(self):
+        """TarjetaSim si la SIM está detectada y lista, si no None"""
+        tarjeta = self.banco.tarjeta(self.pool, self.puerto_logico)
+        if tarjeta is None or time.time() < self.momento_sim_lista():
+            return None
+        return tarjeta
+
+    def estado_registro(self) -> int:
+        tarjeta = self.sim_lista()
+        if tarjeta is None:
+            return 0
+        if not tarjeta.registra:
+            return 2
+        momento = self.momento_sim_lista() + self.banco.t(self.banco.config.TIEMPO_REGISTRO)
+        return 1 if time.time() >= momento else 2
+
+    def clave_sesion_sim(self):
+        return (self.banco.slots.get((self.pool, self.puerto_logico), 1), self.listo_desde,
+                self.banco.sim_presente_desde(self.pool, self.puerto_logico))
+
+    # ----- URC -----
+    def tick(self):
+        ahora = time.time()
+        if self.reiniciando():
+            return
+        if not self._rdy_anunciado:
+            self._rdy_anunciado = True
+            self.urc("RDY")
+
+        clave = self.clave_sesion_sim()
+        if self._sim_anunciada != clave and self.sim_lista() is not None:
+            self._sim_anunciada = clave
+            self.urc("+CPIN: READY")
+            if self.modelo == "UC20":
+                self.urc("+QIND: PB DONE")
+                self.urc("+QIND: SMS DONE")
+            else:
+                self.urc("Call Ready")
+                self.urc("SMS Ready")
+
+        if self._registro_anunciado != clave and self.estado_registro() == 1:
+            self._registro_anunciado = clave
+            if self.creg_n:
+                self.urc("+CREG: 1")
+
+        for pendiente in [p for p in self.pendientes if p[0] <= ahora]:
+            self.pendientes.remove(pendiente)
+            pendiente[1]()
+
+    # ----- Comandos -----
+    def atender(self, comando: str):
+        config = self.banco.config
+        if self.muerto:
+            self.comandos_ignorados += 1
+            return  # Módem colgado: el puerto existe pero nunca contesta
+        if self.reiniciando():
+            return  # Un módem reiniciándose no contesta
+        if self.eco:
+            self.escribir(comando + "\r\n")
+
+        time.sleep(self.banco.random.uniform(config.LATENCIA_MIN, config.LATENCIA_MAX))
+        if self.banco.random.random() < config.TASA_SIN_RESPUESTA:
+            return
+        if self.banco.random.random() < config.TASA_ERROR:
+            self.responder([], "ERROR")
+            return
+
+        # Comandos concatenados (V.250): AT+A;+B;+C → se ejecutan en orden hasta el primer error
+        partes = comando.split(";")
+        subcomandos = [partes[0]] + ["AT" + parte.strip() for parte in partes[1:]]
+        lineas = []
+        final = "OK"
+        for subcomando in subcomandos:
+            self.banco.contar(subcomando)
+            salida, final = self.ejecutar(subcomando.strip())
+            lineas.extend(salida)
+            if final != "OK":
+                break
+        self.responder(lineas, final)
+
+    def ejecutar(self, comando: str) -> tuple:
+        """Ejecuta un comando simple. Retorna (líneas de información, resultado final)"""
+        config = self.banco.config
+        mayus = comando.upper()
+        argumento = comando.split("=", 1)[1] if "=" in comando else ""
+
+        if mayus.startswith(COMANDOS_SIM):
+            tarjeta = self.sim_lista()
+            if self.banco.tarjeta(self.pool, self.puerto_logico) is None:
+                return [], "+CME ERROR: 10"  # SIM not inserted
+            if tarjeta is None or self.banco.random.random() < config.TASA_SIM_OCUPADA:
+                return [], "+CME ERROR: 14"  # SIM busy
+
+        if mayus in ("AT", "ATZ"):
+            return [], "OK"
+        if mayus in ("ATE0", "ATE1"):
+            self.eco = mayus == "ATE1"
+            return [], "OK"
+        if mayus == "ATI":
+            return ["Quectel", self.modelo, f"Revision: {REVISIONES[self.modelo]}"], "OK"
+        if mayus in ("AT+GMM", "AT+CGMM"):
+            return [self.modelo], "OK"
+        if mayus in ("AT+GMR", "AT+CGMR"):
+            return [f"Revision: {REVISIONES[self.modelo]}"], "OK"
+        if mayus in ("AT+GMI", "AT+CGMI"):
+            return ["Quectel"], "OK"
+        if mayus in ("AT+GSN", "AT+CGSN"):
+            return [f"86{zlib.crc32(self.numero_serie.encode()):013d}"], "OK"
+        if mayus == "AT+CFUN=1,1":
+            self.pendientes = []
+            self._encender(time.time())
+            return [], "OK"
+        if mayus == "AT+CFUN?":
+            return ["+CFUN: 1"], "OK"
+
+        if mayus == "AT+CPIN?":
+            if self.banco.tarjeta(self.pool, self.puerto_logico) is None:
+                return [], "+CME ERROR: 10"
+            if self.sim_lista() is None:
+                return [], "+CME ERROR: 14"
+            return ["+CPIN: READY"], "OK"
+
+        if mayus == "AT+QCCID":
+            iccid = self.sim_lista().iccid
+            return ([iccid] if self.modelo == "M35" else [f"+QCCID: {iccid}"]), "OK"
+        if mayus == "AT+CCID":
+            if self.modelo != "M35":
+                return [], "ERROR"
+            return [f'+CCID: "{self.sim_lista().iccid}"'], "OK"
+
+        if mayus.startswith("AT+CREG="):
+            self.creg_n = int(argumento or 0)
+            return [], "OK"
+        if mayus == "AT+CREG?":
+            return [f"+CREG: {self.creg_n},{self.estado_registro()}"], "OK"
+        if mayus == "AT+CSQ":
+            tarjeta = self.sim_lista()
+            rssi = tarjeta.rssi if tarjeta and self.estado_registro() == 1 else 99
+            return [f"+CSQ: {rssi},0"], "OK"
+        if mayus == "AT+COPS?":
+            tarjeta = self.sim_lista()
+            if self.estado_registro() != 1:
+                return ["+COPS: 0"], "OK"
+            return [f'+COPS: 0,0,"{"CLARO CL" if tarjeta.claro else "ENTEL PCS"}"'], "OK"
+
+        if mayus.startswith("AT+CNMI="):
+            self.cnmi = argumento.replace(" ", "").startswith("2,1")
+            return [], "OK"
+        if mayus.startswith("AT+CMGF="):
+            self.cmgf = int(argumento or 0)
+            return [], "OK"
+        if mayus.startswith("AT+CPMS="):
+            self.memoria_sms = argumento.strip('"').split('"')[0].upper() or "SM"
+            usados = len(self.sim_lista().sms) if self.memoria_sms == "SM" else 0
+            return [f"+CPMS: {usados},30,{usados},30,{usados},30"], "OK"
+        if mayus.startswith("AT+CMGL"):
+            if self.cmgf != 1:
+                return [], "+CMS ERROR: 302"
+            if self.memoria_sms != "SM":
+                return [], "OK"
+            lineas = []
+            for indice, estado, remitente, texto in self.sim_lista().sms:
+                lineas.append(f'+CMGL: {indice},"{estado}","{remitente}",,"24/01/01,12:00:00-12"')
+                lineas.append(texto)
+            return lineas, "OK"
+        if mayus.startswith("AT+CMGD="):
+            tarjeta = self.sim_lista()
+            valores = argumento.split(",")
+            if len(valores) > 1 and valores[1].strip() == "4":
+                tarjeta.sms = []
+            else:
+                tarjeta.sms = [sms for sms in tarjeta.sms if str(sms[0]) != valores[0].strip()]
+            return [], "OK"
+
+        if mayus.startswith("AT+CPBS="):
+            return [], "OK"
+        if mayus.startswith("AT+CPBR="):
+            entrada = self.sim_lista().agenda.get(int(argumento.split(",")[0]))
+            if entrada is None:
+                return [], "OK"
+            numero, tipo, nombre = entrada
+            return [f'+CPBR: {argumento.split(",")[0]},"{numero}",{tipo},"{nombre}"'], "OK"
+        if mayus.startswith("AT+CPBW="):
+            valores = [v.strip().strip('"') for v in argumento.split(",")]
+            tarjeta = self.sim_lista()
+            if len(valores) == 1:
+                tarjeta.agenda.pop(int(valores[0]), None)
+            elif len(valores) >= 4:
+                tarjeta.agenda[int(valores[0])] = (valores[1], int(valores[2]), valores[3])
+            else:
+                return [], "ERROR"
+            return [], "OK"
+
+        if mayus.startswith("AT+CUSD="):
+            valores = argumento.split(",")
+            if valores[0].strip() == "2":
+                return [], "OK"
+            if self.estado_registro() != 1:
+                return [], "+CME ERROR: 30"  # No network service
+            self._programar_ussd(self.sim_lista(), argumento)
+            return [], "OK"
+
+        return [], "ERROR"
+
+    def _programar_ussd(self, tarjeta: TarjetaSim, argumento: str):
+        config = self.banco.config
+        ahora = time.time()
+        self.pendientes.append((ahora + self.banco.t(config.RETARDO_USSD),
+                                lambda: self.urc('+CUSD: 0,"Tu solicitud esta siendo procesada",15')))
+
+        if not (tarjeta.claro and "*103#" in argumento):
+            return
+        if self.banco.random.random() >= config.TASA_EXITO_ACTIVACION:
+            return
+
+        def entregar_sms():
+            if self.banco.tarjeta(self.pool, self.puerto_logico) is not tarjeta:
+                return  # La SIM ya no está en este módem
+            indice = max([sms[0] for sms in tarjeta.sms], default=0) + 1
+            tarjeta.sms.append((indice, "REC UNREAD", "Claro", f"Tu numero es {tarjeta.numero}"))
+            tarjeta.activaciones += 1
+            if self.cnmi:
+                self.urc(f'+CMTI: "SM",{indice}')
+
+        self.pendientes.append((ahora + self.banco.t(config.RETARDO_SMS), entregar_sms))
+
+# ==================== ARMADO DE LA FLOTA ====================
+class PuertoListado:
+    """Imita serial.tools.list_ports_common.ListPortInfo para los PTY simulados"""
+
+    def __init__(self, device: str, description: str, serial_number: str = None):
+        self.device = device
+        self.name = device
+        self.description = description
+        self.serial_number = serial_number
+        self.vid = 0x2C7C if serial_number else None  # Quectel
+        self.pid = 0x0125 if serial_number else None
+        self.hwid = f"USB VID:PID=2C7C:0125 SER={serial_number}" if serial_number else "n/a"
+        self.location = None
+        self.manufacturer = "Quectel" if serial_number else None
+        self.product = description
+        self.interface = None
+
+def crear_flota(config=ConfigSimulador, semilla: int = None) -> BancoSimulado:
+    """Crea los PTY de controladores y módems en el directorio actual y arranca sus hilos"""
+    banco = BancoSimulado(config, semilla)
+
+    for pool in range(1, config.POOLS + 1):
+        com = config.COM_CONTROLADORES[pool - 1] if pool <= len(config.COM_CONTROLADORES) else 40 + pool
+        banco.controladores.append(ControladorSimulado(banco, f"COM{com}", pool))
+
+    numero = config.PRIMER_COM_MODEM
+    for pool in range(1, config.POOLS + 1):
+        for puerto_logico in range(1, config.MODEMS_POR_POOL + 1):
+            if config.MODELO == "mixto":
+                modelo = "M35" if (numero % 2) else "UC20"
+            else:
+                modelo = config.MODELO
+            serie = f"SIM{pool:02d}{puerto_logico:02d}{numero:04d}"
+            banco.modems.append(ModemSimulado(banco, f"COM{numero}", pool, puerto_logico, modelo, serie))
+            banco.slots[(pool, puerto_logico)] = 1
+            numero += 1
+
+    for modem in banco.modems[len(banco.modems) - config.MODEMS_MUERTOS:] if config.MODEMS_MUERTOS else []:
+        modem.muerto = True
+
+    for dispositivo in banco.controladores + banco.modems:
+        dispositivo.iniciar()
+    return banco
+
+def listar_puertos(banco: BancoSimulado) -> list:
+    """Reemplazo de serial.tools.list_ports.comports() con los dispositivos simulados"""
+    puertos = [PuertoListado(c.nombre, f"SIM Bank Pool{c.pool}") for c in banco.controladores]
+    puertos += [PuertoListado(m.nombre, f"Quectel {m.modelo}", m.numero_serie) for m in banco.modems]
+    return puertos
+
+def mapeo_ports_txt(banco: BancoSimulado) -> dict:
+    """Equivalente a ports.txt de HeroSMS-Partners: {COMxx: número lógico}"""
+    return {modem.nombre: str(indice) for indice, modem in enumerate(banco.modems, start=1)}
+
+def simbanks_simulados(banco: BancoSimulado) -> dict:
+    puertos = [f"{n:02d}" for n in range(1, banco.config.MODEMS_POR_POOL + 1)]
+    return {
+        f"Pool{c.pool}": {"com": c.nombre, "puertos": list(puertos),
+                          "offset_slot": (c.pool - 1) * banco.config.MODEMS_POR_POOL}
+        for c in banco.controladores
+    }
+
+def detener_flota(banco: BancoSimulado):
+    banco.detenido.set()
+    time.sleep(0.1)
+    for dispositivo in banco.controladores + banco.modems:
+        dispositivo.cerrar()
+
+def resumen_flota(banco: BancoSimulado) -> dict:
+    tarjetas = list(banco.tarjetas.values())
+    return {
+        "comandos": dict(sorted(banco.contadores.items(), key=lambda kv: -kv[1])),
+        "sims_vistas": len(tarjetas),
+        "sims_claro": sum(1 for t in tarjetas if t.claro),
+        "sms_entregados": sum(t.activaciones for t in tarjetas),
+        "sims_con_myphone": sum(1 for t in tarjetas if t.agenda.get(1)),
+        "comandos_a_modems_muertos": {m.nombre: m.comandos_ignorados for m in banco.modems if m.muerto},
+    }
+
+# ==================== CONEXIÓN CON EL ROTADOR ====================
+# Esperas de Settings que se escalan junto con el simulador
+ESPERAS_ESCALABLES = ("TIEMPO_APLICAR_SLOT", "TIEMPO_CFUN_RESET", "TIEMPO_ESTABILIZACION_FINAL",
+                      "TIEMPO_ANTES_SIMCLIENT", "TIEMPO_SIMCLIENT_DETECTAR", "ESPERA_ENTRE_INTENTOS",
+                      "ESPERA_DESPUES_ACTIVACION", "ESPERA_TRAS_CMTI")
+
+def preparar_rotador(rotador, banco: BancoSimulado, escalar_esperas: bool = True):
+    """Apunta el módulo RotadorSimBank a la flota simulada
+
+    Reemplaza solo lo que depende de Windows/HeroSMS (ports.txt, taskkill, listado de
+    COM) y desactiva la base de datos; el transporte serial es el real.
+    """
+    import serial.tools.list_ports
+
+    serial.tools.list_ports.comports = lambda *args, **kwargs: listar_puertos(banco)
+    rotador.SIM_BANKS = simbanks_simulados(banco)
+
+    def cargar_mapeo_simulado():
+        rotador.puertos_mapeados = mapeo_ports_txt(banco)
+        return rotador.puertos_mapeados
+
+    rotador.cargar_mapeo_puertos = cargar_mapeo_simulado
+    rotador.cerrar_simclient = lambda: True
+    rotador.abrir_simclient = lambda: True
+
+    rotador.Settings.DB_ENABLED = False
+    rotador.Settings.CHECK_UPDATES = False
+    rotador.Settings.MODO_DRY_RUN = False
+    rotador.Settings.SLOT_MAX = banco.config.SLOT_MAX
+    if escalar_esperas:
+        for nombre in ESPERAS_ESCALABLES:
+            setattr(rotador.Settings, nombre, getattr(rotador.Settings, nombre) * banco.config.ESCALA)
+
+# ==================== CLI ====================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Simulador PTY de módems M35/UC20 y SIM Banks para RotadorSimBank",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python simulador_simbank.py --modo slot --slot 3 --escala 0.1     # Un cambio de slot real
+  python simulador_simbank.py --modo masivo --slot-max 4 --escala 0.1
+  python simulador_simbank.py --modo masivo --slot-max 4 --pools-independientes  # Un pipeline por pool
+  python simulador_simbank.py --modo self-test --modems-muertos 2      # Matriz de salud de la flota
+  python simulador_simbank.py --modo solo                            # Solo exponer los PTY (Ctrl+C para salir)
+  python simulador_simbank.py --modo slot --tasa-sim-ocupada 0.1 --tasa-error 0.02
+        """
+    )
+    c = ConfigSimulador
+    parser.add_argument("--modo", choices=["slot", "masivo", "self-test", "topologia", "solo"], default="slot",
+                        help="slot: cambiar_slot_simbank | masivo: activacion_masiva_todas_las_sims | "
+                             "self-test: matriz de salud | topologia: descubrir pool/puerto de cada módem | "
+                             "solo: exponer PTY")
+    parser.add_argument("--slot", type=int, default=1, help="Slot a aplicar en --modo slot")
+    parser.add_argument("--dir", default="simulacion", help="Directorio de trabajo (PTY, logs, snapshots)")
+    parser.add_argument("--pools", type=int, default=c.POOLS)
+    parser.add_argument("--modems-por-pool", type=int, default=c.MODEMS_POR_POOL)
+    parser.add_argument("--slot-max", type=int, default=c.SLOT_MAX)
+    parser.add_argument("--modelo", choices=["M35", "UC20", "mixto"], default=c.MODELO)
+    parser.add_argument("--sin-eco", action="store_true", help="Módems con ATE0")
+    parser.add_argument("--escala", type=float, default=c.ESCALA,
+                        help="Factor de tiempo para el simulador y las esperas de Settings (0.1 = 10x más rápido)")
+    parser.add_argument("--no-escalar-settings", action="store_true",
+                        help="Escalar solo el simulador, no las esperas de Settings")
+    parser.add_argument("--latencia", type=float, nargs=2, metavar=("MIN", "MAX"),
+                        default=[c.LATENCIA_MIN, c.LATENCIA_MAX])
+    parser.add_argument("--retardo-sms", type=float, default=c.RETARDO_SMS)
+    parser.add_argument("--tasa-error", type=float, default=c.TASA_ERROR)
+    parser.add_argument("--tasa-sin-respuesta", type=float, default=c.TASA_SIN_RESPUESTA)
+    parser.add_argument("--modems-muertos", type=int, default=c.MODEMS_MUERTOS,
+                        help="Cantidad de módems que nunca responden (prueba del disyuntor)")
+    parser.add_argument("--controladores-mudos", action="store_true",
+                        help="Los controladores aplican el SWIT sin responder OK")
+    parser.add_argument("--tasa-swit-ignorado", type=float, default=c.TASA_SWIT_IGNORADO,
+                        help="Probabilidad de que un SWIT se acuse pero el switch no se mueva")
+    parser.add_argument("--tasa-sim-ocupada", type=float, default=c.TASA_SIM_OCUPADA)
+    parser.add_argument("--tasa-sin-registro", type=float, default=c.TASA_SIN_REGISTRO)
+    parser.add_argument("--tasa-exito-activacion", type=float, default=c.TASA_EXITO_ACTIVACION)
+    parser.add_argument("--pools-independientes", action="store_true",
+                        help="En --modo masivo: cada pool recorre sus slots por su cuenta")
+    parser.add_argument("--semilla", type=int, help="Semilla aleatoria (corridas reproducibles)")
+    return parser.parse_args()
+
+def aplicar_args(args):
+    c = ConfigSimulador
+    c.POOLS = args.pools
+    c.MODEMS_POR_POOL = args.modems_por_pool
+    c.SLOT_MAX = args.slot_max
+    c.MODELO = args.modelo
+    c.ECO = not args.sin_eco
+    c.ESCALA = args.escala
+    c.LATENCIA_MIN, c.LATENCIA_MAX = args.latencia
+    c.RETARDO_SMS = args.retardo_sms
+    c.TASA_ERROR = args.tasa_error
+    c.TASA_SIN_RESPUESTA = args.tasa_sin_respuesta
+    c.TASA_SIM_OCUPADA = args.tasa_sim_ocupada
+    c.MODEMS_MUERTOS = args.modems_muertos
+    c.CONTROLADORES_MUDOS = args.controladores_mudos
+    c.TASA_SWIT_IGNORADO = args.tasa_swit_ignorado
+    c.TASA_SIN_REGISTRO = args.tasa_sin_registro
+    c.TASA_EXITO_ACTIVACION = args.tasa_exito_activacion
+
+def main():
+    args = parse_args()
+    aplicar_args(args)
+
+    # El rotador se importa antes del chdir (queda en el mismo directorio que este script)
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import RotadorSimBank as rotador
+
+    Path(args.dir).mkdir(parents=True, exist_ok=True)
+    os.chdir(args.dir)
+    banco = crear_flota(ConfigSimulador, args.semilla)
+
+    print("=" * 80)
+    print(f"🧪 SIMULADOR SIM BANK: {len(banco.controladores)} pools × {ConfigSimulador.MODEMS_POR_POOL} módems "
+          f"(modelo {ConfigSimulador.MODELO}, escala {ConfigSimulador.ESCALA})")
+    print(f"   Controladores: {', '.join(c.nombre for c in banco.controladores)}")
+    print(f"   Módems: {banco.modems[0].nombre} … {banco.modems[-1].nombre} (en {os.getcwd()})")
+    print("=" * 80)
+
+    inicio = time.time()
+    try:
+        if args.modo == "solo":
+            print("PTY activos. Ctrl+C para terminar.")
+            while True:
+                time.sleep(1)
+
+        preparar_rotador(rotador, banco, escalar_esperas=not args.no_escalar_settings)
+        rotador.Settings.MODO_POOLS_INDEPENDIENTES = args.pools_independientes
+        if args.modo == "slot":
+            rotador.cambiar_slot_simbank(args.slot, iteracion=1, abrir_programa_al_final=False)
+        elif args.modo == "self-test":
+            rotador.self_test()
+        elif args.modo == "topologia":
+            rotador.cargar_mapeo_puertos()
+            rotador.topologia_pools.descubrir(args.slot)
+        else:
+            rotador.activacion_masiva_todas_las_sims()
+    except KeyboardInterrupt:
+        print("\n🛑 Simulación interrumpida")
+    finally:
+        try:
+            rotador.cerrar_puertos_serial()
+        except Exception:
+            pass
+        resumen = resumen_flota(banco)
+        resumen["duracion_segundos"] = round(time.time() - inicio, 2)
+        detener_flota(banco)
+        with open("simulacion_resumen.json", "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+        print("\n📊 Resumen de la simulación:")
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -112,48 +112,23 @@ def obtener_iccid_puerto(com_port: str) -> dict:
     }
     
     try:
-        # Intentar con AT+QCCID (Quectel)
-        respuesta = enviar_comando_at(com_port, "AT+QCCID", timeout=2.0)
-        resultado["respuesta_at"] = respuesta
-        
-        # Parsear ICCID
-        if "+QCCID:" in respuesta or "QCCID:" in respuesta:
-            lineas = respuesta.split('\n')
-            for linea in lineas:
-                if "QCCID:" in linea:
-                    iccid = linea.split("QCCID:")[-1].strip().replace("OK", "").strip()
-                    # Limpiar caracteres no numéricos al final
-                    iccid_limpio = ""
-                    for char in iccid:
-                        if char.isdigit() or char in ['F', 'f']:
-                            iccid_limpio += char
-                        else:
-                            break
-                    
-                    if len(iccid_limpio) >= 15:
-                        resultado["iccid"] = iccid_limpio
-                        return resultado
-        
-        # Si no funciona, intentar AT+CCID
-        if not resultado["iccid"]:
-            respuesta = enviar_comando_at(com_port, "AT+CCID", timeout=2.0)
+        # El dialecto que ya se sabe que usa este módem (caché de RotadorSimBank) va primero,
+        # así un M35/UC20 no paga un intento fallido con el comando equivocado
+        capacidades = RotadorSimBank.capacidades_modem.cacheadas(com_port)
+        comandos = list(RotadorSimBank.COMANDOS_ICCID)
+        if capacidades and capacidades.get("comando_iccid") in comandos:
+            comandos.remove(capacidades["comando_iccid"])
+            comandos.insert(0, capacidades["comando_iccid"])
+        
+        for comando in comandos:
+            respuesta = enviar_comando_at(com_port, comando, timeout=2.0)
             resultado["respuesta_at"] = respuesta
             
-            if "+CCID:" in respuesta or "CCID:" in respuesta:
-                lineas = respuesta.split('\n')
-                for linea in lineas:
-                    if "CCID:" in linea:
-                        iccid = linea.split("CCID:")[-1].strip().replace("OK", "").strip()
-                        iccid_limpio = ""
-                        for char in iccid:
-                            if char.isdigit() or char in ['F', 'f']:
-                                iccid_limpio += char
-                            else:
-                                break
-                        
-                        if len(iccid_limpio) >= 15:
-                            resultado["iccid"] = iccid_limpio
-                            return resultado
+            # Acepta '+QCCID: x', '+CCID: "x"' y el ICCID solo (M35 con AT+QCCID)
+            iccid = RotadorSimBank.extraer_iccid(respuesta)
+            if iccid:
+                resultado["iccid"] = iccid
+                return resultado
         
         return resultado
         